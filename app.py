@@ -1,13 +1,21 @@
 """Product Service."""
 import os
-import yaml
 from flask import Flask
-from flask_migrate import Migrate
-from flasgger import Swagger
-from config import Config, DevelopmentConfig, ProductionConfig
-from database.db import db
+from config import Config, config_for_env
+from database.db import configure_engine_options, db
+from database.replicas import replica_router
+from shared.cache import product_cache
+from shared.compression import response_compression
+from shared.idempotency import idempotency_store
+from shared.instrumentation import request_instrumentation
+from shared.json_provider import configure_json
+from shared.load_shedding import load_shedder
+from shared.metrics import metrics
+from shared.rate_limit import rate_limiter
+from shared.swagger import init_swagger
 from views.product_views import product_blueprint
 from views.healthprobe_views import healthprobe_blueprint
+from views.metrics_views import metrics_blueprint
 
 def create_app(config_class=Config):
     """
@@ -24,30 +32,50 @@ def create_app(config_class=Config):
         The Flask application instance.
     """
     app = Flask(__name__)
-    if os.environ.get('FLASK_ENV') == 'development':
-        app.config.from_object(DevelopmentConfig)
-    elif os.environ.get('FLASK_ENV') == 'production':
-        app.config.from_object(ProductionConfig)
-    else:
-        app.config.from_object(config_class)
+    app.config.from_object(config_for_env(config_class))
+    configure_json(app)
+
+    # Initialize response compression, registered first so it runs after
+    # every other after-request hook
+    response_compression.init_app(app)
 
     # Initialize database
+    configure_engine_options(app)
     db.init_app(app)
-    with app.app_context():
-        db.create_all()
+    replica_router.init_app(app)
+    if app.config['DB_CREATE_ALL']:
+        with app.app_context():
+            db.create_all()
+
+    # Initialize the product cache
+    product_cache.init_app(app)
+
+    # Initialize the store of idempotent request responses
+    idempotency_store.init_app(app)
+
+    # Initialize request timing and SQL instrumentation
+    request_instrumentation.init_app(app)
+
+    # Initialize Prometheus metrics
+    metrics.init_app(app)
+
+    # Initialize load shedding and rate limiting, after the hooks above so
+    # rejected requests are still timed and counted
+    load_shedder.init_app(app)
+    rate_limiter.init_app(app)
 
-    # Initialize Migrate
-    Migrate(app, db)
+    # Initialize Migrate, only needed by the `flask db` commands
+    if app.config['MIGRATE_ENABLED'] or os.environ.get('FLASK_RUN_FROM_CLI') == 'true':
+        from flask_migrate import Migrate  # pylint: disable=import-outside-toplevel
+        Migrate(app, db)
 
     # Register routes
     app.register_blueprint(product_blueprint, url_prefix='/api')
     app.register_blueprint(healthprobe_blueprint, url_prefix='/probes')
+    app.register_blueprint(metrics_blueprint)
 
-    # Load Swagger YAML file
-    with open('swagger/swagger_definitions.yaml', 'r', encoding='utf8') as f:
-        swagger_template = yaml.safe_load(f.read())
-    
     # Initialize Swagger
-    Swagger(app, template=swagger_template)
+    if app.config['SWAGGER_ENABLED']:
+        init_swagger(app)
 
     return app
\ No newline at end of file
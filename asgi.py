@@ -0,0 +1,55 @@
+"""
+Product Service, async mode.
+
+ASGI counterpart of `app.create_app`: the same product routes and `Product`
+model, served by Quart with an async SQLAlchemy engine. Run it with any ASGI
+server, e.g.:
+
+    hypercorn "asgi:create_asgi_app()" --bind 0.0.0.0:5000 --workers 2
+"""
+from quart import Quart
+from config import Config, config_for_env
+from database.async_db import async_db
+from database.db import db
+from shared.cache import product_cache
+from shared.json_provider import configure_json
+from views.async_product_views import async_product_blueprint
+
+def create_asgi_app(config_class=Config):
+    """
+    Create a Quart application.
+
+    Parameters
+    ----------
+    config_class : Config, optional
+        The configuration class for the application. Defaults to `Config`.
+
+    Returns
+    -------
+    Quart
+        The ASGI application instance.
+    """
+    app = Quart(__name__)
+    app.config.from_object(config_for_env(config_class))
+    # Serialize like the WSGI application
+    configure_json(app)
+
+    # Initialize the async database
+    async_db.init_app(app)
+
+    # Invalidate the product cache shared with the WSGI application on writes
+    product_cache.init_app(app)
+
+    @app.before_serving
+    async def create_tables():
+        async with async_db.engine.begin() as connection:
+            await connection.run_sync(db.metadata.create_all)
+
+    @app.after_serving
+    async def dispose_engine():
+        await async_db.engine.dispose()
+
+    # Register routes
+    app.register_blueprint(async_product_blueprint, url_prefix='/api')
+
+    return app
@@ -0,0 +1,427 @@
+"""
+Load-testing harness for the product API.
+
+Replays a JSON-lines workload against an in-process `create_app` (backed by a
+temporary SQLite file) or against a running server, either at a fixed
+concurrency (closed loop) or at a fixed request rate (open loop), and reports
+latency percentiles and throughput per endpoint.
+
+Usage:
+
+    python -m benchmarks.loadtest --duration 10 --concurrency 8
+    python -m benchmarks.loadtest --url http://localhost:5000 --rate 200 --duration 30
+    python -m benchmarks.loadtest --output current.json --compare baseline.json
+
+Workload lines are JSON objects:
+
+    {"name": "get_product", "method": "GET", "path": "/api/product/{product_id}",
+     "weight": 50}
+    {"name": "create_product", "method": "POST", "path": "/api/product",
+     "json": {"name": "bench-{uuid}", ...}, "weight": 1}
+
+`{product_id}` is replaced by a random seeded product id and `{uuid}` by a
+unique string. GET requests are reads, everything else is a write; use
+`--read-ratio` to rescale the weights to a different read/write mix.
+"""
+
+import argparse
+import http.client
+import json
+import math
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+DEFAULT_WORKLOAD = os.path.join(os.path.dirname(__file__), 'workload.jsonl')
+PERCENTILES = (50, 95, 99)
+
+def load_workload(path, read_ratio=None):
+    """
+    Load a workload file and normalize the weights of its entries.
+
+    Args:
+        path (str): Path of the JSON-lines workload.
+        read_ratio (float): If given, share of reads in the resulting mix.
+
+    Returns:
+        list: Workload entries with a `probability` key, summing to 1.
+    """
+    with open(path, 'r', encoding='utf8') as f:
+        entries = [json.loads(line) for line in f if line.strip()]
+    for entry in entries:
+        entry['method'] = entry.get('method', 'GET').upper()
+        entry.setdefault('name', f"{entry['method']} {entry['path']}")
+        entry['weight'] = float(entry.get('weight', 1))
+    reads = [entry for entry in entries if entry['method'] == 'GET']
+    writes = [entry for entry in entries if entry['method'] != 'GET']
+    if read_ratio is None or not reads or not writes:
+        total = sum(entry['weight'] for entry in entries)
+        for entry in entries:
+            entry['probability'] = entry['weight'] / total
+        return entries
+    for group, share in ((reads, read_ratio), (writes, 1 - read_ratio)):
+        total = sum(entry['weight'] for entry in group)
+        for entry in group:
+            entry['probability'] = share * entry['weight'] / total
+    return entries
+
+def _render(value, product_ids, rng):
+    """Replace the workload placeholders in `value`, recursively."""
+    if isinstance(value, str):
+        if '{product_id}' in value:
+            value = value.replace('{product_id}', str(rng.choice(product_ids)))
+        if '{uuid}' in value:
+            value = value.replace('{uuid}', uuid.uuid4().hex)
+        return value
+    if isinstance(value, dict):
+        return {key: _render(item, product_ids, rng) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_render(item, product_ids, rng) for item in value]
+    return value
+
+def _sample_products(count):
+    """Build `count` product payloads used to seed the target."""
+    return [{
+        'name': f'bench-seed-{index}-{uuid.uuid4().hex[:8]}',
+        'description': 'Seeded by benchmarks.loadtest ' * 4,
+        'price': round(1 + (index % 500) * 0.37, 2),
+        'inventory': index % 1000
+    } for index in range(count)]
+
+class InProcessTarget:
+    """
+    Target running `create_app` in this process with the Flask test client.
+
+    A temporary SQLite file is used instead of an in-memory database so that
+    concurrent workers get their own pooled connections.
+    """
+
+    def __init__(self, seed_products):
+        # pylint: disable=import-outside-toplevel
+        from app import create_app
+        from config import TestConfig
+        from services.product_service import ProductService
+
+        self.tmpdir = tempfile.mkdtemp(prefix='loadtest-')
+
+        class BenchmarkConfig(TestConfig):
+            """Configuration of the in-process benchmark target."""
+            SQLALCHEMY_DATABASE_URI = f'sqlite:///{self.tmpdir}/loadtest.db'
+
+        self.app = create_app(BenchmarkConfig)
+        self._local = threading.local()
+        with self.app.app_context():
+            results = ProductService.bulk_add_products(_sample_products(seed_products))
+            self.product_ids = [result['id'] for result in results if result['id']]
+
+    def request(self, method, path, body=None):
+        """
+        Send a request and return its status code.
+        """
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        response = client.open(path, method=method, json=body)
+        response.close()
+        return response.status_code
+
+    def close(self):
+        """
+        Remove the temporary database.
+        """
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+class HttpTarget:
+    """
+    Target reached over HTTP, with one keep-alive connection per worker thread.
+    """
+
+    def __init__(self, base_url, seed_products, timeout=30):
+        parts = urlsplit(base_url)
+        self.scheme = parts.scheme
+        self.netloc = parts.netloc
+        self.prefix = parts.path.rstrip('/')
+        self.timeout = timeout
+        self._local = threading.local()
+        if seed_products:
+            _, body = self._send('POST', '/api/products/bulk', _sample_products(seed_products))
+            self.product_ids = [result['id'] for result in json.loads(body)['results']
+                                if result['id']]
+        else:
+            _, body = self._send('GET', '/api/products?limit=1000')
+            self.product_ids = [product['id'] for product in json.loads(body)]
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            cls = http.client.HTTPSConnection if self.scheme == 'https' \
+                else http.client.HTTPConnection
+            connection = self._local.connection = cls(self.netloc, timeout=self.timeout)
+        return connection
+
+    def _send(self, method, path, body=None):
+        headers = {}
+        payload = None
+        if body is not None:
+            payload = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+        connection = self._connection()
+        try:
+            connection.request(method, self.prefix + path, body=payload, headers=headers)
+            response = connection.getresponse()
+            return response.status, response.read()
+        except (OSError, http.client.HTTPException):
+            connection.close()
+            self._local.connection = None
+            raise
+
+    def request(self, method, path, body=None):
+        """
+        Send a request and return its status code.
+        """
+        return self._send(method, path, body)[0]
+
+    def close(self):
+        """
+        Nothing to clean up: connections are closed with their threads.
+        """
+
+class Recorder:
+    """
+    Thread-safe collection of request latencies per workload entry.
+    """
+
+    def __init__(self):
+        self.samples = {}
+        self.errors = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, latency, ok):
+        """
+        Record one request of the entry `name` that took `latency` seconds.
+        """
+        with self._lock:
+            self.samples.setdefault(name, []).append(latency)
+            if not ok:
+                self.errors[name] = self.errors.get(name, 0) + 1
+
+def percentile(sorted_values, pct):
+    """
+    Return the nearest-rank percentile of an already sorted list.
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+def summarize(latencies, errors, elapsed):
+    """
+    Summarize the latencies (seconds) of one endpoint, in milliseconds.
+    """
+    latencies = sorted(latencies)
+    summary = {
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        'mean_ms': round(1000 * sum(latencies) / len(latencies), 3) if latencies else 0.0,
+        'max_ms': round(1000 * latencies[-1], 3) if latencies else 0.0
+    }
+    for pct in PERCENTILES:
+        summary[f'p{pct}_ms'] = round(1000 * percentile(latencies, pct), 3)
+    return summary
+
+def run(target, workload, concurrency=8, duration=None, requests=None, rate=None,
+        random_seed=None):
+    """
+    Replay `workload` against `target` and return the results.
+
+    Without `rate` the run is a closed loop: `concurrency` workers send
+    requests back to back. With `rate` requests are started on a fixed
+    schedule and their latency is measured from the scheduled time, so a
+    slow server cannot hide queueing delay.
+
+    Args:
+        target: An `InProcessTarget` or `HttpTarget`.
+        workload (list): Entries returned by `load_workload`.
+        concurrency (int): Number of worker threads.
+        duration (float): Seconds to run for.
+        requests (int): Total number of requests to send, instead of `duration`.
+        rate (float): Requests per second for an open-loop run.
+        random_seed (int): Seed for the request mix, for repeatable runs.
+
+    Returns:
+        dict: Run parameters, a summary per endpoint and a total.
+    """
+    if duration is None and requests is None:
+        duration = 10
+    rng = random.Random(random_seed)
+    weights = [entry['probability'] for entry in workload]
+    plan_lock = threading.Lock()
+    issued = [0]
+    recorder = Recorder()
+
+    def next_entry():
+        with plan_lock:
+            if requests is not None and issued[0] >= requests:
+                return None
+            issued[0] += 1
+            entry = rng.choices(workload, weights)[0]
+            return entry, _render(entry['path'], target.product_ids, rng), \
+                _render(entry.get('json'), target.product_ids, rng)
+
+    def execute(planned, scheduled_at):
+        entry, path, body = planned
+        try:
+            status = target.request(entry['method'], path, body)
+            ok = status < 500
+        except (OSError, http.client.HTTPException):
+            ok = False
+        recorder.record(entry['name'], time.perf_counter() - scheduled_at, ok)
+
+    start = time.perf_counter()
+    deadline = start + duration if duration is not None else None
+
+    if rate:
+        interval = 1.0 / rate
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            tick = 0
+            while True:
+                scheduled_at = start + tick * interval
+                if deadline is not None and scheduled_at >= deadline:
+                    break
+                planned = next_entry()
+                if planned is None:
+                    break
+                delay = scheduled_at - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                executor.submit(execute, planned, scheduled_at)
+                tick += 1
+    else:
+        def worker():
+            while deadline is None or time.perf_counter() < deadline:
+                planned = next_entry()
+                if planned is None:
+                    return
+                execute(planned, time.perf_counter())
+
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    elapsed = time.perf_counter() - start
+    all_latencies = [latency for samples in recorder.samples.values() for latency in samples]
+    return {
+        'meta': {
+            'concurrency': concurrency,
+            'rate': rate,
+            'duration_s': round(elapsed, 3),
+            'started_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'python': sys.version.split()[0]
+        },
+        'endpoints': {
+            name: summarize(samples, recorder.errors.get(name, 0), elapsed)
+            for name, samples in sorted(recorder.samples.items())
+        },
+        'total': summarize(all_latencies, sum(recorder.errors.values()), elapsed)
+    }
+
+def compare(baseline, current, max_regression=None):
+    """
+    Compare two result files.
+
+    Args:
+        baseline (dict): Results of the reference run.
+        current (dict): Results of the new run.
+        max_regression (float): Percentage above which a slower p95 or a lower
+            throughput counts as a regression.
+
+    Returns:
+        tuple: Lines of the report and the list of regressed endpoints.
+    """
+    lines = [f"{'endpoint':<24}{'metric':<10}{'baseline':>12}{'current':>12}{'change':>10}"]
+    regressions = []
+    names = ['total'] + sorted(set(baseline['endpoints']) & set(current['endpoints']))
+    for name in names:
+        before = baseline['total'] if name == 'total' else baseline['endpoints'][name]
+        after = current['total'] if name == 'total' else current['endpoints'][name]
+        for metric in ('rps', 'p50_ms', 'p95_ms', 'p99_ms'):
+            change = (after[metric] - before[metric]) / before[metric] * 100 \
+                if before[metric] else 0.0
+            lines.append(f'{name:<24}{metric:<10}{before[metric]:>12.3f}'
+                         f'{after[metric]:>12.3f}{change:>+9.1f}%')
+            worse = -change if metric == 'rps' else change
+            if max_regression is not None and metric in ('rps', 'p95_ms') \
+                    and worse > max_regression:
+                regressions.append(f'{name} {metric}')
+    return lines, regressions
+
+def print_results(results):
+    """
+    Print a table of the per-endpoint results.
+    """
+    print(f"{'endpoint':<24}{'requests':>9}{'errors':>8}{'rps':>10}"
+          f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    rows = list(results['endpoints'].items()) + [('total', results['total'])]
+    for name, summary in rows:
+        print(f"{name:<24}{summary['requests']:>9}{summary['errors']:>8}{summary['rps']:>10.1f}"
+              f"{summary['p50_ms']:>10.2f}{summary['p95_ms']:>10.2f}{summary['p99_ms']:>10.2f}")
+
+def main(argv=None):
+    """
+    Command line entry point.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n', maxsplit=1)[0])
+    parser.add_argument('--url', help='Base URL of a running server (default: in-process app)')
+    parser.add_argument('--workload', default=DEFAULT_WORKLOAD, help='JSON-lines workload file')
+    parser.add_argument('--read-ratio', type=float, help='Share of reads in the mix, 0 to 1')
+    parser.add_argument('--concurrency', type=int, default=8, help='Worker threads')
+    parser.add_argument('--rate', type=float, help='Requests per second (open loop)')
+    parser.add_argument('--duration', type=float, help='Seconds to run (default: 10)')
+    parser.add_argument('--requests', type=int, help='Total requests to send instead of --duration')
+    parser.add_argument('--seed-products', type=int, default=1000,
+                        help='Products created before the run')
+    parser.add_argument('--random-seed', type=int, help='Seed of the request mix')
+    parser.add_argument('--output', help='Write the results as JSON to this file')
+    parser.add_argument('--compare', help='Compare with the JSON results of a previous run')
+    parser.add_argument('--max-regression', type=float,
+                        help='Exit with status 1 if p95 or rps regress by more than this %%')
+    args = parser.parse_args(argv)
+
+    workload = load_workload(args.workload, args.read_ratio)
+    if args.url:
+        target = HttpTarget(args.url, args.seed_products)
+    else:
+        target = InProcessTarget(args.seed_products)
+    try:
+        results = run(target, workload, concurrency=args.concurrency, duration=args.duration,
+                      requests=args.requests, rate=args.rate, random_seed=args.random_seed)
+    finally:
+        target.close()
+    results['meta']['target'] = args.url or 'in-process'
+    results['meta']['workload'] = os.path.basename(args.workload)
+    print_results(results)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf8') as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf8') as f:
+            lines, regressions = compare(json.load(f), results, args.max_regression)
+        print('\n'.join(lines))
+        if regressions:
+            print('Regressions: ' + ', '.join(regressions))
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,85 @@
+"""
+Micro-benchmark of the product listing serialization paths.
+
+Fetches and serializes the same listing from an in-memory SQLite database
+through each path and reports the best time per listing:
+
+- orm+stdlib: `Product` objects converted with `to_dict`, stdlib json (the
+  previous listing path),
+- columns+stdlib: column tuples zipped into dictionaries, stdlib json,
+- columns+orjson: column tuples zipped into dictionaries, orjson (the
+  current listing path, when orjson is installed).
+
+Usage:
+
+    python -m benchmarks.serialization --rows 5000 --repeat 20
+"""
+
+import argparse
+import timeit
+from sqlalchemy import select
+from flask.json.provider import DefaultJSONProvider
+from app import create_app
+from config import TestConfig
+from database.db import db
+from models.product import Product
+from services.product_service import ProductService
+from shared.json_provider import OrjsonProvider, orjson
+from benchmarks.loadtest import _sample_products
+
+def _orm_rows():
+    products = db.session.scalars(select(Product).order_by(Product.id))
+    return [product.to_dict() for product in products]
+
+def _column_rows():
+    return list(ProductService.iter_products())
+
+def run(rows=5000, repeat=20):
+    """
+    Time every serialization path.
+
+    Args:
+        rows (int): Products in the listing.
+        repeat (int): Timed listings per path; the best one is reported.
+
+    Returns:
+        dict: Best milliseconds per listing, keyed by path name.
+    """
+    app = create_app(TestConfig)
+    paths = {
+        'orm+stdlib': (_orm_rows, DefaultJSONProvider(app)),
+        'columns+stdlib': (_column_rows, DefaultJSONProvider(app))
+    }
+    if orjson is not None:
+        paths['columns+orjson'] = (_column_rows, OrjsonProvider(app))
+
+    results = {}
+    with app.app_context():
+        ProductService.bulk_add_products(_sample_products(rows))
+        for name, (fetch, provider) in paths.items():
+            def listing(fetch=fetch, provider=provider):
+                provider.dumps(fetch())
+                # Do not let the identity map of one listing speed up the next
+                db.session.expunge_all()
+            best = min(timeit.repeat(listing, number=1, repeat=repeat))
+            results[name] = round(best * 1000, 3)
+        db.session.remove()
+    return results
+
+def main(argv=None):
+    """
+    Command line entry point.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n', maxsplit=1)[0])
+    parser.add_argument('--rows', type=int, default=5000, help='Products in the listing')
+    parser.add_argument('--repeat', type=int, default=20, help='Timed listings per path')
+    args = parser.parse_args(argv)
+
+    results = run(rows=args.rows, repeat=args.repeat)
+    baseline = results['orm+stdlib']
+    print(f'{"path":<16} {"ms/listing":>12} {"speedup":>8}')
+    for name, best_ms in results.items():
+        print(f'{name:<16} {best_ms:>12.3f} {baseline / best_ms:>7.2f}x')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""
+Startup-time benchmark of the product API.
+
+Starts fresh Python interpreters that import the application, build it with
+`create_app` and serve a first request with the test client, and reports the
+median of each phase over the runs:
+
+- import_ms: importing the `app` module and its dependencies,
+- create_app_ms: building the application,
+- first_request_ms: serving the first request,
+- process_ms: wall time of the whole interpreter, start to exit.
+
+Usage:
+
+    python -m benchmarks.startup --runs 5
+    DB_CREATE_ALL=false SWAGGER_ENABLED=false python -m benchmarks.startup
+    python -m benchmarks.startup --output current.json --compare baseline.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PHASES = ('import_ms', 'create_app_ms', 'first_request_ms', 'process_ms')
+
+# Runs in the child interpreter and prints its measurements as JSON
+CHILD = """
+import json, sys, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+application = app.create_app()
+created = time.perf_counter()
+status = application.test_client().get(sys.argv[1]).status_code
+served = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - start) * 1000,
+    'create_app_ms': (created - imported) * 1000,
+    'first_request_ms': (served - created) * 1000,
+    'status': status
+}))
+"""
+
+def measure(path='/probes/health', env=None):
+    """
+    Start one interpreter and measure its startup phases.
+
+    Args:
+        path (str): Path of the first request.
+        env (dict): Extra environment variables of the interpreter.
+
+    Returns:
+        dict: Milliseconds per phase and the status of the first request.
+    """
+    child_env = dict(os.environ, LOG_LEVEL='WARNING', **(env or {}))
+    start = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, '-c', CHILD, path],
+        cwd=ROOT, env=child_env, capture_output=True, text=True, check=True
+    ).stdout
+    process_ms = (time.perf_counter() - start) * 1000
+    result = json.loads(output.strip().splitlines()[-1])
+    result['process_ms'] = process_ms
+    return result
+
+def run(runs=5, path='/probes/health', env=None):
+    """
+    Measure `runs` interpreters and summarize every phase by its median.
+
+    Returns:
+        dict: Median milliseconds per phase, the runs and the first request status.
+    """
+    samples = [measure(path, env) for _ in range(runs)]
+    results = {phase: round(statistics.median(sample[phase] for sample in samples), 3)
+               for phase in PHASES}
+    results['runs'] = runs
+    results['status'] = samples[-1]['status']
+    return results
+
+def compare(baseline, current, max_regression=None):
+    """
+    Compare two results phase by phase.
+
+    Returns:
+        tuple: Printable lines and the phases that regressed by more than
+            `max_regression` percent.
+    """
+    lines = []
+    regressions = []
+    for phase in PHASES:
+        before, after = baseline[phase], current[phase]
+        change = (after - before) / before * 100 if before else 0.0
+        lines.append(f'{phase:<18} {before:>10.1f} -> {after:>10.1f} ms  ({change:+.1f}%)')
+        if max_regression is not None and change > max_regression:
+            regressions.append(phase)
+    return lines, regressions
+
+def main(argv=None):
+    """
+    Command line entry point.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n', maxsplit=1)[0])
+    parser.add_argument('--runs', type=int, default=5, help='Interpreters to start')
+    parser.add_argument('--path', default='/probes/health', help='Path of the first request')
+    parser.add_argument('--output', help='Write the results as JSON to this file')
+    parser.add_argument('--compare', help='Compare with the JSON results of a previous run')
+    parser.add_argument('--max-regression', type=float,
+                        help='Exit with status 1 if a phase regresses by more than this %%')
+    args = parser.parse_args(argv)
+
+    results = run(runs=args.runs, path=args.path)
+    for phase in PHASES:
+        print(f'{phase:<18} {results[phase]:>10.1f} ms')
+    print(f'first request status {results["status"]}, median of {results["runs"]} runs')
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf8') as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf8') as f:
+            lines, regressions = compare(json.load(f), results, args.max_regression)
+        print('\n'.join(lines))
+        if regressions:
+            print('regressed: ' + ', '.join(regressions))
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,30 @@
 import os
 
+def _env_int(name, default):
+    """Read an integer from the environment."""
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+def _env_bool(name, default):
+    """Read a boolean from the environment."""
+    value = os.environ.get(name)
+    return value.lower() in ('1', 'true', 'yes', 'on') if value else default
+
+def _engine_options(pool_size, max_overflow, pool_timeout, pool_recycle, pool_pre_ping):
+    """
+    Build SQLALCHEMY_ENGINE_OPTIONS from the given defaults.
+
+    Each option can be overridden with the environment variables DB_POOL_SIZE,
+    DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE and DB_POOL_PRE_PING.
+    """
+    return {
+        'pool_size': _env_int('DB_POOL_SIZE', pool_size),
+        'max_overflow': _env_int('DB_MAX_OVERFLOW', max_overflow),
+        'pool_timeout': _env_int('DB_POOL_TIMEOUT', pool_timeout),
+        'pool_recycle': _env_int('DB_POOL_RECYCLE', pool_recycle),
+        'pool_pre_ping': _env_bool('DB_POOL_PRE_PING', pool_pre_ping)
+    }
+
 class Config(object):
     """Base configuration class."""
 
@@ -7,12 +32,103 @@ class Config(object):
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
                               'sqlite:///:memory:'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Read replicas (comma separated URLs) serving the product reads
+    SQLALCHEMY_REPLICA_URLS = [url.strip() for url in
+                               (os.environ.get('DATABASE_REPLICA_URLS') or '').split(',')
+                               if url.strip()]
+    REPLICA_EJECT_SECONDS = _env_int('REPLICA_EJECT_SECONDS', 30)
+    # Startup: set DB_CREATE_ALL=false when the schema is managed with migrations
+    DB_CREATE_ALL = _env_bool('DB_CREATE_ALL', True)
+    # Flask-Migrate is initialized for the `flask` CLI, or always when enabled
+    MIGRATE_ENABLED = _env_bool('MIGRATE_ENABLED', False)
+    SWAGGER_ENABLED = _env_bool('SWAGGER_ENABLED', True)
+    SQLALCHEMY_ENGINE_OPTIONS = _engine_options(
+        pool_size=5, max_overflow=10, pool_timeout=30, pool_recycle=1800, pool_pre_ping=True)
+    # Async driver URI for the ASGI app, derived from the URI above when unset
+    ASYNC_DATABASE_URL = os.environ.get('ASYNC_DATABASE_URL')
+    # Per-request timing: Server-Timing header, slow-query log and N+1 warning
+    REQUEST_TIMING_ENABLED = _env_bool('REQUEST_TIMING_ENABLED', True)
+    SERVER_TIMING_HEADER = _env_bool('SERVER_TIMING_HEADER', True)
+    SLOW_QUERY_THRESHOLD_MS = _env_int('SLOW_QUERY_THRESHOLD_MS', None)
+    REQUEST_QUERY_WARN_THRESHOLD = _env_int('REQUEST_QUERY_WARN_THRESHOLD', 50)
+    # Prometheus metrics at /metrics
+    METRICS_ENABLED = _env_bool('METRICS_ENABLED', True)
+    METRICS_SYNC_INTERVAL = 1.0
+    # JSON serializer: 'orjson' (falls back to 'default' when not installed) or 'default'
+    JSON_PROVIDER = os.environ.get('JSON_PROVIDER') or 'orjson'
+    # Response compression: encodings offered (most preferred first) and their
+    # levels, smallest body compressed, flush interval of streamed bodies, and
+    # the per-process cache of compressed bodies of responses with an ETag
+    COMPRESSION_ENABLED = _env_bool('COMPRESSION_ENABLED', True)
+    COMPRESSION_ENCODINGS = ('zstd', 'br', 'gzip')
+    COMPRESSION_LEVELS = {'zstd': 3, 'br': 4, 'gzip': 6}
+    COMPRESSION_MIN_SIZE = _env_int('COMPRESSION_MIN_SIZE', 500)
+    COMPRESSION_STREAM_FLUSH_SIZE = 16384
+    COMPRESSION_CACHE_MAX_ENTRIES = _env_int('COMPRESSION_CACHE_MAX_ENTRIES', 256)
+    COMPRESSION_CACHE_TTL = 300
+    # Responses of writes sent with an Idempotency-Key: 'local' (per process)
+    # or 'redis' (shared, at CACHE_REDIS_URL)
+    IDEMPOTENCY_ENABLED = _env_bool('IDEMPOTENCY_ENABLED', True)
+    IDEMPOTENCY_BACKEND = os.environ.get('IDEMPOTENCY_BACKEND') or 'local'
+    IDEMPOTENCY_TTL = _env_int('IDEMPOTENCY_TTL', 86400)
+    IDEMPOTENCY_LOCK_TTL = 60
+    IDEMPOTENCY_WAIT = 10
+    IDEMPOTENCY_POLL_INTERVAL = 0.05
+    IDEMPOTENCY_MAX_ENTRIES = 10000
+    # Service reads whose concurrent identical calls share one query
+    SINGLE_FLIGHT_METHODS = tuple(
+        method.strip() for method in (os.environ.get('SINGLE_FLIGHT_METHODS') or
+                                      'get_product,get_product_version,get_catalog_version,'
+                                      'get_catalog_stats')
+        .split(',') if method.strip())
+    # Per-client token bucket on the product API: 'local' (per process) or
+    # 'redis' (shared by every worker)
+    RATE_LIMIT_ENABLED = _env_bool('RATE_LIMIT_ENABLED', False)
+    RATE_LIMIT_RATE = _env_int('RATE_LIMIT_RATE', 50)
+    RATE_LIMIT_BURST = _env_int('RATE_LIMIT_BURST', 100)
+    RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND') or 'local'
+    RATE_LIMIT_REDIS_URL = os.environ.get('RATE_LIMIT_REDIS_URL') or \
+                           os.environ.get('CACHE_REDIS_URL') or 'redis://localhost:6379/0'
+    RATE_LIMIT_CLIENT_HEADER = os.environ.get('RATE_LIMIT_CLIENT_HEADER')
+    # Load shedding: answer 503 (and fail readiness) while a worker has too
+    # many requests in flight or waits too long for database connections
+    LOAD_SHEDDING_ENABLED = _env_bool('LOAD_SHEDDING_ENABLED', True)
+    LOAD_SHED_MAX_IN_FLIGHT = _env_int('LOAD_SHED_MAX_IN_FLIGHT', None)
+    LOAD_SHED_MAX_POOL_WAIT_MS = _env_int('LOAD_SHED_MAX_POOL_WAIT_MS', 1000)
+    LOAD_SHED_RETRY_AFTER = 1
+    # Upper bound for the `limit` query parameter of paginated listings
+    PRODUCTS_MAX_PAGE_SIZE = 1000
+    # Rows fetched per round trip when streaming listings
+    PRODUCTS_STREAM_BATCH_SIZE = 500
+    # Most products retrieved by one batch get
+    PRODUCTS_BATCH_GET_MAX_IDS = 500
+    # Default page size of product searches
+    PRODUCTS_SEARCH_PAGE_SIZE = 50
+    # Change feed: changes per response, longest long-poll (or SSE stream) in
+    # seconds, outbox polling interval and SSE keepalive interval
+    CHANGES_PAGE_SIZE = 500
+    CHANGES_MAX_WAIT = 30
+    CHANGES_POLL_INTERVAL = 0.5
+    CHANGES_HEARTBEAT_INTERVAL = 15
+    # Products written per transaction by the bulk endpoints
+    BULK_BATCH_SIZE = 500
+    BULK_MAX_BATCH_SIZE = 5000
+    # Rows encoded per chunk of a catalog export
+    EXPORT_CHUNK_SIZE = 1000
+    # Apply concurrent inventory adjustments of the same product together
+    INVENTORY_COALESCING = _env_bool('INVENTORY_COALESCING', False)
+    # Read-through product cache: 'none', 'local' (per process) or 'redis' (shared)
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND') or 'none'
+    CACHE_TTL = _env_int('CACHE_TTL', 60)
+    CACHE_MAX_ENTRIES = _env_int('CACHE_MAX_ENTRIES', 1024)
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL') or 'redis://localhost:6379/0'
 
 class TestConfig(Config):
     """Configuration class for testing."""
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ENGINE_OPTIONS = {}
 
 class DevelopmentConfig(Config):
     """
@@ -24,6 +140,8 @@ class DevelopmentConfig(Config):
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
                               'sqlite:///:memory:'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ENGINE_OPTIONS = _engine_options(
+        pool_size=2, max_overflow=5, pool_timeout=10, pool_recycle=1800, pool_pre_ping=True)
 
 class ProductionConfig(Config):
     """
@@ -34,4 +152,21 @@ class ProductionConfig(Config):
 
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
                               'sqlite:///:memory:'
-    SQLALCHEMY_TRACK_MODIFICATIONS = False
\ No newline at end of file
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # MySQL closes idle connections after wait_timeout, recycle well before it
+    SQLALCHEMY_ENGINE_OPTIONS = _engine_options(
+        pool_size=10, max_overflow=20, pool_timeout=10, pool_recycle=1800, pool_pre_ping=True)
+
+def config_for_env(config_class=Config):
+    """
+    Select the configuration class for the FLASK_ENV environment variable.
+
+    Returns `DevelopmentConfig` or `ProductionConfig` when FLASK_ENV is set to
+    'development' or 'production', else `config_class`.
+    """
+    env = os.environ.get('FLASK_ENV')
+    if env == 'development':
+        return DevelopmentConfig
+    if env == 'production':
+        return ProductionConfig
+    return config_class
@@ -0,0 +1,93 @@
+"""
+Module for the asynchronous database engine.
+
+This module contains the `AsyncDatabase` extension used by the ASGI
+application (see `asgi.py`). It shares the models and metadata of the
+synchronous `db`, but executes queries through an `AsyncSession` on an async
+driver: aiosqlite for SQLite and aiomysql for MySQL.
+"""
+
+from quart import current_app, g
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+from database.db import QUEUE_POOL_OPTIONS
+
+# Async driver used for each database backend
+ASYNC_DRIVERS = {
+    'sqlite': 'sqlite+aiosqlite',
+    'mysql': 'mysql+aiomysql',
+}
+
+def to_async_url(uri):
+    """
+    Return `uri` with its driver replaced by the matching async driver.
+
+    Args:
+        uri (str): A synchronous SQLAlchemy database URI.
+
+    Returns:
+        sqlalchemy.engine.URL: The URL using an async driver.
+    """
+    url = make_url(uri)
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    return url.set(drivername=driver) if driver else url
+
+class AsyncDatabase:
+    """
+    Async counterpart of the Flask-SQLAlchemy `db` object.
+
+    Configured with:
+        ASYNC_DATABASE_URL: Async database URI, derived from
+            SQLALCHEMY_DATABASE_URI when not set.
+        SQLALCHEMY_ENGINE_OPTIONS: Shared with the synchronous engine.
+
+    A session is opened lazily per request and closed on teardown.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """
+        Create the async engine and session factory of `app`.
+        """
+        url = app.config.get('ASYNC_DATABASE_URL') or \
+              to_async_url(app.config['SQLALCHEMY_DATABASE_URI'])
+        url = make_url(url)
+        options = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+        options.pop('poolclass', None)
+        if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+            # Every aiosqlite connection would open a new, empty database
+            for option in QUEUE_POOL_OPTIONS:
+                options.pop(option, None)
+            options['poolclass'] = StaticPool
+        engine = create_async_engine(url, **options)
+        app.extensions['async_db'] = (engine, async_sessionmaker(engine, expire_on_commit=False))
+        app.teardown_appcontext(self._close_session)
+
+    @property
+    def engine(self):
+        """
+        The async engine of the current application.
+        """
+        return current_app.extensions['async_db'][0]
+
+    @property
+    def session(self):
+        """
+        The `AsyncSession` of the current request, opened on first use.
+        """
+        if 'async_db_session' not in g:
+            g.async_db_session = current_app.extensions['async_db'][1]()
+        return g.async_db_session
+
+    @staticmethod
+    async def _close_session(exception=None):
+        session = g.pop('async_db_session', None)
+        if session is not None:
+            await session.close()
+
+async_db = AsyncDatabase()
+"""The async database object used by the ASGI application."""
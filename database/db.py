@@ -1,11 +1,54 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.engine import make_url
+from database.pool import InstrumentedQueuePool
+from database.replicas import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 """The SQLAlchemy object for database management."""
 
+# Engine options only understood by QueuePool
+QUEUE_POOL_OPTIONS = ('pool_size', 'max_overflow', 'pool_timeout')
+
 def reset_database():
     """
     Reset the database by dropping all tables and recreating them.
     """
     db.drop_all()
     db.create_all()
+
+def configure_engine_options(app):
+    """
+    Adapt `SQLALCHEMY_ENGINE_OPTIONS` to the configured database.
+
+    In-memory SQLite uses a single static connection, so the QueuePool sizing
+    options are dropped. Every other database gets an `InstrumentedQueuePool`
+    so pool statistics can be reported.
+
+    Args:
+        app (Flask): The application whose config is updated before `db.init_app`.
+    """
+    options = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    url = make_url(app.config['SQLALCHEMY_DATABASE_URI'])
+    if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+        for option in QUEUE_POOL_OPTIONS:
+            options.pop(option, None)
+    else:
+        options.setdefault('poolclass', InstrumentedQueuePool)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+def dispose_engines(app):
+    """
+    Discard the pooled connections of every engine of `app`, read replicas
+    included, after a fork.
+
+    The connections are dropped without being closed (`close=False`), so the
+    parent process that owns them can keep using them.
+
+    Args:
+        app (Flask): The application whose engines are disposed.
+    """
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+    for replica in getattr(app.extensions.get('replicas'), 'replicas', ()):
+        replica.engine.dispose(close=False)
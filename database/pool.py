@@ -0,0 +1,136 @@
+"""
+Module for connection pool instrumentation.
+
+This module contains a `QueuePool` that records how long connection checkouts
+take and how often they have to wait for a connection to be returned, and a
+helper to report live pool statistics.
+"""
+
+import math
+import threading
+import time
+from sqlalchemy.pool import QueuePool
+
+# Seconds over which the recent checkout latency decays
+RECENT_WINDOW = 5.0
+
+class PoolMetrics:
+    """
+    Checkout counters of a connection pool.
+    """
+
+    def __init__(self):
+        self.checkouts = 0
+        self.waits = 0
+        self.failures = 0
+        self.total_checkout_time = 0.0
+        self.max_checkout_time = 0.0
+        self._recent_checkout_time = 0.0
+        self._recent_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _decay(self, now):
+        return math.exp(-max(0.0, now - self._recent_at) / RECENT_WINDOW)
+
+    def record(self, duration, waited, failed=False):
+        """
+        Record a checkout that took `duration` seconds.
+
+        A failed checkout is one that timed out waiting for the pool or could
+        not open a new connection.
+        """
+        with self._lock:
+            self.checkouts += 1
+            self.waits += waited
+            self.failures += failed
+            self.total_checkout_time += duration
+            self.max_checkout_time = max(self.max_checkout_time, duration)
+            now = time.monotonic()
+            recent = self._recent_checkout_time * self._decay(now)
+            self._recent_checkout_time = recent + 0.2 * (duration - recent)
+            self._recent_at = now
+
+    def recent_checkout_time(self):
+        """
+        Return the moving average of the recent checkout latencies, in seconds.
+
+        The average decays towards zero while no checkout happens, so an idle
+        pool does not keep reporting the latency of its last busy period.
+        """
+        with self._lock:
+            return self._recent_checkout_time * self._decay(time.monotonic())
+
+    def to_dict(self):
+        """
+        Return the counters, with latencies in milliseconds.
+        """
+        return {
+            'checkouts': self.checkouts,
+            'waits': self.waits,
+            'failures': self.failures,
+            'avg_checkout_ms': round(1000 * self.total_checkout_time / self.checkouts, 3)
+                               if self.checkouts else 0.0,
+            'max_checkout_ms': round(1000 * self.max_checkout_time, 3),
+            'recent_checkout_ms': round(1000 * self.recent_checkout_time(), 3)
+        }
+
+class InstrumentedQueuePool(QueuePool):
+    """
+    `QueuePool` recording checkout latency and pool exhaustion.
+
+    A checkout counts as a wait when every pooled and overflow connection was
+    in use at the time it was requested.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def connect(self):
+        """
+        Check out a connection, recording how long it took.
+        """
+        waited = (self._max_overflow > -1 and self._overflow >= self._max_overflow
+                  and self._pool.empty())
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except Exception:
+            self.metrics.record(time.perf_counter() - start, waited, failed=True)
+            raise
+        self.metrics.record(time.perf_counter() - start, waited)
+        return connection
+
+    def recreate(self):
+        """
+        Recreate the pool, keeping the counters across `Engine.dispose`.
+        """
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+def pool_status(engine):
+    """
+    Return live statistics of the connection pool of `engine`.
+
+    Args:
+        engine (sqlalchemy.engine.Engine): The engine to inspect.
+
+    Returns:
+        dict: Pool class, occupancy and, when instrumented, checkout metrics.
+    """
+    pool = engine.pool
+    status = {'pool': type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update({
+            'size': pool.size(),
+            'checked_in': pool.checkedin(),
+            'checked_out': pool.checkedout(),
+            'overflow': max(0, pool.overflow()),
+            'max_overflow': pool._max_overflow,
+            'timeout': pool.timeout()
+        })
+    metrics = getattr(pool, 'metrics', None)
+    if metrics is not None:
+        status.update(metrics.to_dict())
+    return status
@@ -0,0 +1,160 @@
+"""
+Module for read replicas.
+
+This module routes reads of the application to read replicas of the database.
+Replicas are configured with SQLALCHEMY_REPLICA_URLS and get their own
+engines (`replica_1`, `replica_2`, ...) with the SQLALCHEMY_ENGINE_OPTIONS of
+the primary.
+
+A read only goes to a replica when it asks for it, by executing with
+`bind_arguments=READ_REPLICA`, and only until the session writes: writes and
+every later read of the same request use the primary, so a request always
+reads its own writes. Replicas are chosen round robin; a replica raising a
+connection or operational error is ejected for REPLICA_EJECT_SECONDS.
+"""
+
+import itertools
+import threading
+import time
+from flask import current_app
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import OperationalError
+from shared.logging_utils import get_logger
+
+# Get an instance of a logger
+logger = get_logger(__name__)
+
+# Bind arguments of a read that may be served by a replica
+READ_REPLICA = {'replica': True}
+
+# Session info key set once the session wrote, pinning it to the primary
+PRIMARY_ONLY = 'primary_only'
+
+class RoutingSession(Session):
+    """
+    Session sending the reads that allow it to a healthy read replica.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, replica=False, **kwargs):
+        if self._flushing or getattr(clause, 'is_dml', False):
+            self.info[PRIMARY_ONLY] = True
+        elif (bind is None and replica and not self.info.get(PRIMARY_ONLY)
+              and getattr(clause, 'is_select', False)
+              and getattr(clause, '_for_update_arg', None) is None):
+            replicas = current_app.extensions.get('replicas')
+            engine = replicas.choose() if replicas is not None else None
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+class Replica:
+    """
+    A read replica and its health.
+
+    Attributes:
+        name (str): The bind key of the replica.
+        engine (Engine): The engine connected to the replica.
+        reads (int): Statements routed to the replica.
+        failures (int): Errors raised by the replica.
+        ejected_until (float): Monotonic time until which the replica is skipped.
+    """
+
+    def __init__(self, name, engine):
+        self.name = name
+        self.engine = engine
+        self.reads = 0
+        self.failures = 0
+        self.ejected_until = 0.0
+
+    def to_dict(self):
+        """
+        Convert the replica state to a dictionary.
+
+        Returns:
+            dict: The name, masked URL, health and counters of the replica.
+        """
+        return {
+            'name': self.name,
+            'url': self.engine.url.render_as_string(hide_password=True),
+            'healthy': self.ejected_until <= time.monotonic(),
+            'reads': self.reads,
+            'failures': self.failures
+        }
+
+class ReplicaSet:
+    """
+    Round-robin choice among the healthy replicas of an application.
+    """
+
+    def __init__(self, replicas, eject_seconds):
+        self.replicas = replicas
+        self.eject_seconds = eject_seconds
+        self._next = itertools.count()
+        self._lock = threading.Lock()
+
+    def choose(self):
+        """
+        Return the engine of the next healthy replica, or None if there is none.
+        """
+        now = time.monotonic()
+        for _ in range(len(self.replicas)):
+            replica = self.replicas[next(self._next) % len(self.replicas)]
+            if replica.ejected_until <= now:
+                replica.reads += 1
+                return replica.engine
+        return None
+
+    def eject(self, replica, reason):
+        """
+        Skip `replica` for `eject_seconds`.
+        """
+        with self._lock:
+            replica.failures += 1
+            replica.ejected_until = time.monotonic() + self.eject_seconds
+        logger.warning('ejected read replica %s for %ss: %s',
+                       replica.name, self.eject_seconds, reason)
+
+class ReplicaRouter:
+    """
+    Read replica routing.
+
+    Configured with:
+        SQLALCHEMY_REPLICA_URLS: URLs of the read replicas, none disables routing.
+        REPLICA_EJECT_SECONDS: How long a failing replica is skipped.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """
+        Create the replica engines of `app`.
+        """
+        options = app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {}
+        replicas = [Replica(f'replica_{position}', create_engine(url, **options))
+                    for position, url in enumerate(
+                        app.config.get('SQLALCHEMY_REPLICA_URLS') or [], start=1)]
+        replica_set = ReplicaSet(replicas, app.config.get('REPLICA_EJECT_SECONDS', 30))
+        app.extensions['replicas'] = replica_set
+        for replica in replicas:
+            event.listen(replica.engine, 'handle_error',
+                         self._error_listener(replica_set, replica))
+        if replicas:
+            app.before_request(self._start_request)
+
+    @staticmethod
+    def _error_listener(replica_set, replica):
+        def handle_error(context):
+            if context.is_disconnect or isinstance(context.sqlalchemy_exception, OperationalError):
+                replica_set.eject(replica, context.original_exception)
+        return handle_error
+
+    @staticmethod
+    def _start_request():
+        # Requests may share a session (e.g. in tests); each one starts unpinned
+        current_app.extensions['sqlalchemy'].session.info.pop(PRIMARY_ONLY, None)
+
+replica_router = ReplicaRouter()
+"""The read replica routing of the application."""
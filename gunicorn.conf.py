@@ -0,0 +1,63 @@
+"""
+Gunicorn configuration for the Product Service.
+
+Every setting can be tuned through environment variables, see below. The
+application is preloaded in the master process and forked into the workers,
+so the database engine is disposed after fork to make sure no pooled
+connection is shared between processes.
+"""
+import multiprocessing
+import os
+import shutil
+
+from database.db import dispose_engines
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+
+# Workers are processes, threads are per worker. The default follows the
+# usual (2 x cores) + 1 rule; threads let a worker overlap DB round trips.
+workers = int(os.environ.get('GUNICORN_WORKERS') or multiprocessing.cpu_count() * 2 + 1)
+threads = int(os.environ.get('GUNICORN_THREADS') or 4)
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS') or ('gthread' if threads > 1 else 'sync')
+
+# Import the application once in the master and share it copy-on-write
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').lower() in ('1', 'true', 'yes', 'on')
+
+# Recycle workers after a number of requests (with jitter so they do not all
+# restart at once) to bound memory growth
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS') or 1000)
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER') or 100)
+
+# Seconds to keep idle client connections open, and request/shutdown timeouts
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE') or 5)
+timeout = int(os.environ.get('GUNICORN_TIMEOUT') or 30)
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT') or 30)
+
+accesslog = os.environ.get('GUNICORN_ACCESSLOG', '-')
+errorlog = '-'
+
+# Workers write their Prometheus samples to this directory so /metrics can
+# aggregate them; start every server from an empty directory
+prometheus_multiproc_dir = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+if prometheus_multiproc_dir:
+    shutil.rmtree(prometheus_multiproc_dir, ignore_errors=True)
+    os.makedirs(prometheus_multiproc_dir, exist_ok=True)
+
+def post_fork(server, worker):
+    """
+    Drop the connections inherited from the master process.
+
+    With `preload_app` the master created the engine (and opened connections
+    for `db.create_all`). The forked worker discards that pool without
+    closing the sockets, which still belong to the parent, and opens its own.
+    """
+    dispose_engines(server.app.wsgi())
+    server.log.info('Worker %s: disposed inherited database connections', worker.pid)
+
+def child_exit(server, worker):
+    """
+    Drop the live gauges of a worker that exited.
+    """
+    if prometheus_multiproc_dir:
+        from prometheus_client import multiprocess  # pylint: disable=import-outside-toplevel
+        multiprocess.mark_process_dead(worker.pid)
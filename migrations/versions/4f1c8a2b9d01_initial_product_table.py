@@ -0,0 +1,37 @@
+"""Initial product table
+
+Revision ID: 4f1c8a2b9d01
+Revises: 
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4f1c8a2b9d01'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'product',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=128), nullable=True),
+        sa.Column('description', sa.String(length=1024), nullable=True),
+        sa.Column('price', sa.Float(), nullable=True),
+        sa.Column('inventory', sa.Integer(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('product', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_product_name'), ['name'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('product', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_product_name'))
+
+    op.drop_table('product')
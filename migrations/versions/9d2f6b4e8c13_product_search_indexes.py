@@ -0,0 +1,66 @@
+"""Product search indexes
+
+Revision ID: 9d2f6b4e8c13
+Revises: 7b3e5d9c1a42
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '9d2f6b4e8c13'
+down_revision = '7b3e5d9c1a42'
+branch_labels = None
+depends_on = None
+
+# External content FTS5 table kept in sync with `product` by triggers.
+# Note: batch migrations recreate the product table on SQLite, which drops
+# these triggers, so they must be recreated by such migrations.
+SQLITE_FTS_UPGRADE = (
+    "CREATE VIRTUAL TABLE product_fts USING fts5("
+    "name, description, content='product', content_rowid='id')",
+    "CREATE TRIGGER product_fts_ai AFTER INSERT ON product BEGIN "
+    "INSERT INTO product_fts (rowid, name, description) "
+    "VALUES (new.id, new.name, new.description); END",
+    "CREATE TRIGGER product_fts_ad AFTER DELETE ON product BEGIN "
+    "INSERT INTO product_fts (product_fts, rowid, name, description) "
+    "VALUES ('delete', old.id, old.name, old.description); END",
+    "CREATE TRIGGER product_fts_au AFTER UPDATE OF name, description ON product BEGIN "
+    "INSERT INTO product_fts (product_fts, rowid, name, description) "
+    "VALUES ('delete', old.id, old.name, old.description); "
+    "INSERT INTO product_fts (rowid, name, description) "
+    "VALUES (new.id, new.name, new.description); END",
+    # Index the existing products
+    "INSERT INTO product_fts (product_fts) VALUES ('rebuild')"
+)
+
+SQLITE_FTS_DOWNGRADE = (
+    "DROP TRIGGER IF EXISTS product_fts_au",
+    "DROP TRIGGER IF EXISTS product_fts_ad",
+    "DROP TRIGGER IF EXISTS product_fts_ai",
+    "DROP TABLE IF EXISTS product_fts"
+)
+
+
+def upgrade():
+    op.create_index('ix_product_price_inventory', 'product', ['price', 'inventory'])
+
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for statement in SQLITE_FTS_UPGRADE:
+            op.execute(statement)
+    elif dialect in ('mysql', 'mariadb'):
+        op.create_index('ix_product_fulltext', 'product', ['name', 'description'],
+                        mysql_prefix='FULLTEXT')
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for statement in SQLITE_FTS_DOWNGRADE:
+            op.execute(statement)
+    elif dialect in ('mysql', 'mariadb'):
+        op.drop_index('ix_product_fulltext', table_name='product')
+
+    op.drop_index('ix_product_price_inventory', table_name='product')
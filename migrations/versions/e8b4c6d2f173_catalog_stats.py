@@ -0,0 +1,135 @@
+"""Catalog stats maintained by triggers
+
+Revision ID: e8b4c6d2f173
+Revises: c5a7e1f3b920
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8b4c6d2f173'
+down_revision = 'c5a7e1f3b920'
+branch_labels = None
+depends_on = None
+
+# Bucket of a positive price in the DDSketch of the prices (1% accuracy):
+# ceil(ln(price) / ln(gamma)), gamma = 1.01 / 0.99
+PRICE_BUCKET_MULTIPLIER = 49.99833328888678
+
+TRIGGERS = ('catalog_stats_ai', 'catalog_stats_ad', 'catalog_stats_au')
+
+
+def _price_bucket(dialect, price):
+    bucket = f'CEIL(LN({price}) * {PRICE_BUCKET_MULTIPLIER!r})'
+    return f'CAST({bucket} AS INTEGER)' if dialect == 'sqlite' else bucket
+
+
+def _statements(dialect, sign, row):
+    """Count (sign '+') or uncount (sign '-') `row` in the stats."""
+    price_bucket = _price_bucket(dialect, f'{row}.price')
+    statements = [
+        f'UPDATE catalog_stats SET product_count = product_count {sign} 1, '
+        f'in_stock_count = in_stock_count {sign} (COALESCE({row}.inventory, 0) > 0), '
+        f'total_inventory = total_inventory {sign} COALESCE({row}.inventory, 0), '
+        f'inventory_value = inventory_value {sign} COALESCE({row}.price * {row}.inventory, 0), '
+        f'priced_count = priced_count {sign} ({row}.price IS NOT NULL), '
+        f'price_sum = price_sum {sign} COALESCE({row}.price, 0), '
+        f'zero_price_count = zero_price_count {sign} COALESCE({row}.price <= 0, 0) '
+        'WHERE id = 1'
+    ]
+    if sign == '-':
+        statements.append(
+            'UPDATE catalog_price_bucket SET product_count = product_count - 1 '
+            f'WHERE {row}.price > 0 AND bucket = {price_bucket}')
+    elif dialect == 'sqlite':
+        statements.append(
+            'INSERT INTO catalog_price_bucket (bucket, product_count) '
+            f'SELECT {price_bucket}, 1 WHERE {row}.price > 0 '
+            'ON CONFLICT (bucket) DO UPDATE SET product_count = product_count + 1')
+    else:
+        statements.append(
+            'INSERT INTO catalog_price_bucket (bucket, product_count) '
+            f'SELECT {price_bucket}, 1 FROM DUAL WHERE {row}.price > 0 '
+            'ON DUPLICATE KEY UPDATE '
+            'catalog_price_bucket.product_count = catalog_price_bucket.product_count + 1')
+    return statements
+
+
+def _triggers(dialect):
+    # Note: batch migrations recreate the product table on SQLite, which drops
+    # these triggers, so they must be recreated by such migrations.
+    for name, event_name, changes in (
+            ('catalog_stats_ai', 'INSERT', [('+', 'new')]),
+            ('catalog_stats_ad', 'DELETE', [('-', 'old')]),
+            ('catalog_stats_au', 'UPDATE', [('-', 'old'), ('+', 'new')])):
+        body = ''.join(f'{statement}; ' for sign, row in changes
+                       for statement in _statements(dialect, sign, row))
+        if dialect == 'sqlite':
+            if event_name == 'UPDATE':
+                event_name = 'UPDATE OF price, inventory'
+            yield f'CREATE TRIGGER {name} AFTER {event_name} ON product BEGIN {body}END'
+        else:
+            yield f'CREATE TRIGGER {name} AFTER {event_name} ON product FOR EACH ROW BEGIN {body}END'
+
+
+def _check_math_functions():
+    """Fail clearly when SQLite lacks the LN and CEIL functions used by the triggers."""
+    try:
+        op.get_bind().exec_driver_sql('SELECT CEIL(LN(2))')
+    except sa.exc.OperationalError as err:
+        raise RuntimeError(
+            'The catalog stats triggers require SQLite 3.35 or later built with '
+            'SQLITE_ENABLE_MATH_FUNCTIONS (LN and CEIL)') from err
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'sqlite':
+        _check_math_functions()
+    op.create_table(
+        'catalog_stats',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('product_count', sa.Integer(), nullable=False),
+        sa.Column('in_stock_count', sa.Integer(), nullable=False),
+        sa.Column('total_inventory', sa.Integer(), nullable=False),
+        sa.Column('inventory_value', sa.Float(), nullable=False),
+        sa.Column('priced_count', sa.Integer(), nullable=False),
+        sa.Column('price_sum', sa.Float(), nullable=False),
+        sa.Column('zero_price_count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table(
+        'catalog_price_bucket',
+        sa.Column('bucket', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('product_count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('bucket')
+    )
+
+    dialect = op.get_bind().dialect.name
+    if dialect == 'mariadb':
+        dialect = 'mysql'
+    # Aggregate the existing products, then keep up to date
+    op.execute(
+        'INSERT INTO catalog_stats (id, product_count, in_stock_count, total_inventory, '
+        'inventory_value, priced_count, price_sum, zero_price_count) '
+        'SELECT 1, COUNT(*), COALESCE(SUM(COALESCE(inventory, 0) > 0), 0), '
+        'COALESCE(SUM(inventory), 0), COALESCE(SUM(price * inventory), 0), COUNT(price), '
+        'COALESCE(SUM(price), 0), COALESCE(SUM(price <= 0), 0) FROM product'
+    )
+    op.execute(
+        'INSERT INTO catalog_price_bucket (bucket, product_count) '
+        f'SELECT {_price_bucket(dialect, "price")}, COUNT(*) FROM product '
+        'WHERE price > 0 GROUP BY 1'
+    )
+    if dialect in ('sqlite', 'mysql'):
+        for statement in _triggers(dialect):
+            op.execute(statement)
+
+
+def downgrade():
+    for name in TRIGGERS:
+        op.execute(f'DROP TRIGGER IF EXISTS {name}')
+    op.drop_table('catalog_price_bucket')
+    op.drop_table('catalog_stats')
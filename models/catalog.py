@@ -0,0 +1,189 @@
+from sqlalchemy import DDL, event
+from sqlalchemy.exc import OperationalError
+from database.db import db
+from shared.sketch import DDSketch
+
+class CatalogVersion(db.Model):
+    """
+    Single-row table holding the version of the whole product table.
+
+    The version is incremented in the same transaction as every write to
+    `Product`, so it can be used as the ETag of product listings without
+    scanning the table.
+
+    Attributes:
+        id (int): Always 1.
+        version (int): Incremented on every committed product write.
+    """
+
+    __tablename__ = 'catalog_version'
+
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        """
+        Return a string representation of the catalog version.
+
+        Returns:
+            str: A string representation of the catalog version.
+        """
+        return f'<CatalogVersion {self.version}>'
+
+# Seed the single row so writers only ever need an UPDATE
+event.listen(
+    CatalogVersion.__table__,
+    'after_create',
+    DDL('INSERT INTO catalog_version (id, version) VALUES (1, 0)')
+)
+
+# Price quantiles are estimated within 1% of the actual prices
+PRICE_SKETCH = DDSketch(relative_accuracy=0.01)
+
+# Oldest MySQL server supporting CREATE TRIGGER IF NOT EXISTS
+MYSQL_MIN_VERSION = (8, 0, 29)
+
+class CatalogStats(db.Model):
+    """
+    Single-row table holding aggregates of the whole product table.
+
+    The aggregates are kept up to date by triggers on `product`, in the same
+    transaction as every product write, so they are served without scanning
+    the table. Non-positive prices are counted in `zero_price_count`, other
+    prices in the buckets of `CatalogPriceBucket`.
+
+    Attributes:
+        id (int): Always 1.
+        product_count (int): The number of products.
+        in_stock_count (int): The number of products with inventory.
+        total_inventory (int): The sum of the inventories.
+        inventory_value (float): The sum of price * inventory.
+        priced_count (int): The number of products with a price.
+        price_sum (float): The sum of the prices.
+        zero_price_count (int): The number of products priced zero or less.
+    """
+
+    __tablename__ = 'catalog_stats'
+
+    id = db.Column(db.Integer, primary_key=True)
+    product_count = db.Column(db.Integer, nullable=False, default=0)
+    in_stock_count = db.Column(db.Integer, nullable=False, default=0)
+    total_inventory = db.Column(db.Integer, nullable=False, default=0)
+    inventory_value = db.Column(db.Float, nullable=False, default=0)
+    priced_count = db.Column(db.Integer, nullable=False, default=0)
+    price_sum = db.Column(db.Float, nullable=False, default=0)
+    zero_price_count = db.Column(db.Integer, nullable=False, default=0)
+
+class CatalogPriceBucket(db.Model):
+    """
+    Number of products per bucket of `PRICE_SKETCH`, a DDSketch of the prices.
+
+    Attributes:
+        bucket (int): The bucket of the prices, see `DDSketch.bucket`.
+        product_count (int): The number of products priced in the bucket.
+    """
+
+    __tablename__ = 'catalog_price_bucket'
+
+    bucket = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    product_count = db.Column(db.Integer, nullable=False, default=0)
+
+def _stats_statements(dialect, sign, row):
+    """Return the statements counting (sign '+') or uncounting (sign '-') `row` in the stats."""
+    price_bucket = f'CEIL(LN({row}.price) * {PRICE_SKETCH.multiplier!r})'
+    if dialect == 'sqlite':
+        price_bucket = f'CAST({price_bucket} AS INTEGER)'
+    statements = [
+        f'UPDATE catalog_stats SET product_count = product_count {sign} 1, '
+        f'in_stock_count = in_stock_count {sign} (COALESCE({row}.inventory, 0) > 0), '
+        f'total_inventory = total_inventory {sign} COALESCE({row}.inventory, 0), '
+        f'inventory_value = inventory_value {sign} COALESCE({row}.price * {row}.inventory, 0), '
+        f'priced_count = priced_count {sign} ({row}.price IS NOT NULL), '
+        f'price_sum = price_sum {sign} COALESCE({row}.price, 0), '
+        f'zero_price_count = zero_price_count {sign} COALESCE({row}.price <= 0, 0) '
+        'WHERE id = 1'
+    ]
+    if sign == '-':
+        statements.append(
+            'UPDATE catalog_price_bucket SET product_count = product_count - 1 '
+            f'WHERE {row}.price > 0 AND bucket = {price_bucket}')
+    elif dialect == 'sqlite':
+        statements.append(
+            'INSERT INTO catalog_price_bucket (bucket, product_count) '
+            f'SELECT {price_bucket}, 1 WHERE {row}.price > 0 '
+            'ON CONFLICT (bucket) DO UPDATE SET product_count = product_count + 1')
+    else:
+        statements.append(
+            'INSERT INTO catalog_price_bucket (bucket, product_count) '
+            f'SELECT {price_bucket}, 1 FROM DUAL WHERE {row}.price > 0 '
+            'ON DUPLICATE KEY UPDATE '
+            'catalog_price_bucket.product_count = catalog_price_bucket.product_count + 1')
+    return statements
+
+def stats_trigger_ddl(dialect):
+    """
+    Return the statements creating the triggers maintaining the catalog stats.
+
+    Supported dialects are 'sqlite' and 'mysql'.
+    """
+    triggers = (
+        ('catalog_stats_ai', 'INSERT', [('+', 'new')]),
+        ('catalog_stats_ad', 'DELETE', [('-', 'old')]),
+        ('catalog_stats_au', 'UPDATE', [('-', 'old'), ('+', 'new')])
+    )
+    ddl = []
+    for name, event_name, changes in triggers:
+        body = ''.join(f'{statement}; ' for sign, row in changes
+                       for statement in _stats_statements(dialect, sign, row))
+        if dialect == 'sqlite':
+            if event_name == 'UPDATE':
+                event_name = 'UPDATE OF price, inventory'
+            ddl.append(f'CREATE TRIGGER IF NOT EXISTS {name} AFTER {event_name} ON product '
+                       f'BEGIN {body}END')
+        else:
+            ddl.append(f'CREATE TRIGGER IF NOT EXISTS {name} AFTER {event_name} ON product '
+                       f'FOR EACH ROW BEGIN {body}END')
+    return ddl
+
+def check_stats_trigger_support(connection):
+    """
+    Check that the database of `connection` can run the catalog stats triggers.
+
+    The triggers compute price buckets with LN and CEIL, which SQLite only
+    provides from 3.35 when built with SQLITE_ENABLE_MATH_FUNCTIONS; without
+    them every product write would fail.
+
+    Raises:
+        RuntimeError: If SQLite lacks the math functions, or MySQL is older
+            than 8.0.29.
+    """
+    dialect = connection.dialect
+    if dialect.name == 'sqlite':
+        try:
+            connection.exec_driver_sql('SELECT CEIL(LN(2))')
+        except OperationalError as err:
+            raise RuntimeError(
+                'The catalog stats triggers require SQLite 3.35 or later built with '
+                'SQLITE_ENABLE_MATH_FUNCTIONS (LN and CEIL)') from err
+    elif (dialect.name == 'mysql' and not dialect.is_mariadb
+          and dialect.server_version_info < MYSQL_MIN_VERSION):
+        raise RuntimeError('The catalog stats triggers require MySQL 8.0.29 or later')
+
+def _check_before_create(target, connection, **kw):
+    check_stats_trigger_support(connection)
+
+# Fail before creating any table rather than on the first product write
+event.listen(db.metadata, 'before_create', _check_before_create)
+
+# Seed the single row so the triggers only ever need an UPDATE
+event.listen(
+    CatalogStats.__table__,
+    'after_create',
+    DDL('INSERT INTO catalog_stats (id, product_count, in_stock_count, total_inventory, '
+        'inventory_value, priced_count, price_sum, zero_price_count) '
+        'VALUES (1, 0, 0, 0, 0, 0, 0, 0)')
+)
+# Once every table exists, as MySQL triggers need their table
+for _dialect, _dialects in (('sqlite', 'sqlite'), ('mysql', ('mysql', 'mariadb'))):
+    for _statement in stats_trigger_ddl(_dialect):
+        event.listen(db.metadata, 'after_create', DDL(_statement).execute_if(dialect=_dialects))
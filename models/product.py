@@ -1,5 +1,53 @@
+from sqlalchemy import DDL, event
 from database.db import db
 
+# SQLite full-text index over name and description. It is an external content
+# FTS5 table (it stores only the index, reading the text from `product`) kept
+# in sync by triggers.
+SQLITE_FTS_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS product_fts USING fts5("
+    "name, description, content='product', content_rowid='id')",
+    "CREATE TRIGGER IF NOT EXISTS product_fts_ai AFTER INSERT ON product BEGIN "
+    "INSERT INTO product_fts (rowid, name, description) "
+    "VALUES (new.id, new.name, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS product_fts_ad AFTER DELETE ON product BEGIN "
+    "INSERT INTO product_fts (product_fts, rowid, name, description) "
+    "VALUES ('delete', old.id, old.name, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS product_fts_au "
+    "AFTER UPDATE OF name, description ON product BEGIN "
+    "INSERT INTO product_fts (product_fts, rowid, name, description) "
+    "VALUES ('delete', old.id, old.name, old.description); "
+    "INSERT INTO product_fts (rowid, name, description) "
+    "VALUES (new.id, new.name, new.description); END"
+)
+
+# Writable product attributes, in the order used by `Product.to_dict`
+PRODUCT_FIELDS = ('name', 'description', 'price', 'inventory')
+
+# Columns of a serialized product, in the order used by `Product.to_dict`
+PRODUCT_COLUMNS = ('id',) + PRODUCT_FIELDS + ('version',)
+
+# Types of the columns of a serialized product, for exports and imports
+PRODUCT_COLUMN_TYPES = (('id', int), ('name', str), ('description', str), ('price', float),
+                        ('inventory', int), ('version', int))
+
+def product_columns(fields=None):
+    """
+    Return the columns of a sparse fieldset, in the order of `PRODUCT_COLUMNS`.
+
+    The id is always included, it identifies the product (and is the cursor
+    of paginated listings). None selects every column.
+
+    Raises:
+        ValueError: If a field is not a product column.
+    """
+    if fields is None:
+        return PRODUCT_COLUMNS
+    unknown = sorted(set(fields) - set(PRODUCT_COLUMNS))
+    if unknown:
+        raise ValueError('Unknown fields: ' + ', '.join(unknown))
+    return tuple(column for column in PRODUCT_COLUMNS if column == 'id' or column in fields)
+
 class Product(db.Model):
     """
     Class representing a product.
@@ -10,6 +58,8 @@ class Product(db.Model):
         description (str): The description of the product.
         price (float): The price of the product.
         inventory (int): The inventory of the product.
+        version (int): Row version, incremented on every update. Used as the
+            ETag of the product and for optimistic concurrency control.
     """
 
     id = db.Column(db.Integer, primary_key=True)
@@ -17,6 +67,15 @@ class Product(db.Model):
     description = db.Column(db.String(1024))
     price = db.Column(db.Float)
     inventory = db.Column(db.Integer)
+    version = db.Column(db.Integer, nullable=False)
+
+    __mapper_args__ = {'version_id_col': version}
+    __table_args__ = (
+        # Price range filters and sorting, with the in-stock filter on inventory
+        db.Index('ix_product_price_inventory', 'price', 'inventory'),
+        db.Index('ix_product_fulltext', 'name', 'description',
+                 mysql_prefix='FULLTEXT').ddl_if(dialect='mysql'),
+    )
 
     def to_dict(self):
         """
@@ -30,7 +89,8 @@ class Product(db.Model):
             'name': self.name,
             'description': self.description,
             'price': self.price,
-            'inventory': self.inventory
+            'inventory': self.inventory,
+            'version': self.version
         }
 
     def __repr__(self):
@@ -42,3 +102,11 @@ class Product(db.Model):
         """
         return f'<Product {self.name}>'
 
+
+for statement in SQLITE_FTS_DDL:
+    event.listen(Product.__table__, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+event.listen(
+    Product.__table__,
+    'before_drop',
+    DDL('DROP TABLE IF EXISTS product_fts').execute_if(dialect='sqlite')
+)
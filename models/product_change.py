@@ -0,0 +1,54 @@
+from datetime import datetime
+from database.db import db
+
+class ProductChange(db.Model):
+    """
+    Class representing a change of a product, recorded in the change outbox.
+
+    A change is written in the same transaction as the product write it
+    describes, after the catalog version row is locked, so changes become
+    visible in `seq` order and consumers can sync incrementally by asking for
+    the changes after the last `seq` they saw.
+
+    Attributes:
+        seq (int): Position of the change in the feed.
+        product_id (int): The ID of the changed product.
+        op (str): 'created', 'updated' or 'deleted'.
+        version (int): The product version after the change, None for deletions.
+        product (dict): The product after the change, None for deletions.
+        created_at (datetime): When the change was recorded (UTC).
+    """
+
+    __tablename__ = 'product_change'
+
+    seq = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    product_id = db.Column(db.Integer, nullable=False)
+    op = db.Column(db.String(16), nullable=False)
+    version = db.Column(db.Integer)
+    product = db.Column(db.JSON)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def to_dict(self):
+        """
+        Convert the change to a dictionary.
+
+        Returns:
+            dict: A dictionary representing the change.
+        """
+        return {
+            'seq': self.seq,
+            'product_id': self.product_id,
+            'op': self.op,
+            'version': self.version,
+            'product': self.product,
+            'created_at': self.created_at.isoformat() + 'Z'
+        }
+
+    def __repr__(self):
+        """
+        Return a string representation of the change.
+
+        Returns:
+            str: A string representation of the change.
+        """
+        return f'<ProductChange {self.seq} {self.op} {self.product_id}>'
@@ -0,0 +1,216 @@
+import asyncio
+from quart import current_app
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm.exc import StaleDataError
+from database.async_db import async_db
+from models.catalog import CatalogVersion
+from models.product import PRODUCT_COLUMNS, Product, product_columns
+from models.product_change import ProductChange
+from services.product_service import VersionConflictError, cache_key, changes_committed
+from shared.cache import product_cache
+from shared.singleflight import AsyncSingleFlight
+
+# Shares one query between concurrent identical reads (SINGLE_FLIGHT_METHODS)
+async_product_reads = AsyncSingleFlight()
+
+def _publish_commit(app, product_id):
+    """
+    Invalidate the cached product and wake the change feed waiters.
+
+    Both may block (a Redis round trip, the lock held by sync long polls), so
+    this runs in a worker thread rather than in the event loop.
+    """
+    product_cache.invalidate(cache_key(product_id), app=app)
+    with changes_committed:
+        changes_committed.notify_all()
+
+class AsyncProductService:
+    """
+    Async counterpart of `ProductService`, backed by an `AsyncSession`.
+
+    Methods mirror their synchronous equivalents and return the same
+    dictionaries, so both application modes serve identical payloads.
+    """
+
+    @staticmethod
+    async def _commit(op, product_id):
+        """
+        Commit a product write, bumping the catalog version and recording the
+        change in the outbox in the same transaction (see `ProductService._commit`).
+
+        :return: The written product as a dictionary, None for deletions.
+        :rtype: dict or None
+        """
+        session = async_db.session
+        await session.execute(
+            update(CatalogVersion)
+            .where(CatalogVersion.id == 1)
+            .values(version=CatalogVersion.version + 1)
+        )
+        product = None
+        if op != 'deleted':
+            row = (await session.execute(
+                select(*(getattr(Product, column) for column in PRODUCT_COLUMNS))
+                .where(Product.id == product_id))).one()
+            product = dict(zip(PRODUCT_COLUMNS, row))
+        await session.execute(insert(ProductChange), [{
+            'product_id': product_id,
+            'op': op,
+            'version': product['version'] if product else None,
+            'product': product
+        }])
+        await session.commit()
+        await asyncio.to_thread(_publish_commit, current_app._get_current_object(), product_id)
+        return product
+
+    @staticmethod
+    async def add_product(data):
+        """
+        Add a new product to the database.
+
+        :param data: A dictionary containing product data.
+        :type data: dict
+
+        :return: A dictionary representing the added product.
+        :rtype: dict
+        """
+        product = Product(
+            name=data['name'],
+            description=data['description'],
+            price=data['price'],
+            inventory=data['inventory']
+        )
+        async_db.session.add(product)
+        await async_db.session.flush()
+        return await AsyncProductService._commit('created', product.id)
+
+    @staticmethod
+    async def get_products_page(after_id=None, limit=None, fields=None):
+        """
+        Retrieve a page of products using keyset pagination on the primary key.
+
+        :param after_id: Only return products with an id greater than this.
+        :type after_id: int or None
+        :param limit: The maximum number of products to return.
+        :type limit: int or None
+        :param fields: The product columns to select, see `product_columns`.
+        :type fields: iterable or None
+
+        :return: A list of dictionaries, each representing a product.
+        :rtype: list
+        """
+        return [product async for product in
+                AsyncProductService.iter_products(after_id=after_id, limit=limit, fields=fields)]
+
+    @staticmethod
+    async def iter_products(after_id=None, limit=None, batch_size=500, fields=None):
+        """
+        Lazily iterate over products ordered by id from a server-side cursor.
+
+        :param after_id: Only yield products with an id greater than this.
+        :type after_id: int or None
+        :param limit: The maximum number of products to yield.
+        :type limit: int or None
+        :param batch_size: The number of rows fetched per round trip.
+        :type batch_size: int
+        :param fields: The product columns to select, see `product_columns`.
+        :type fields: iterable or None
+
+        :return: An async generator of dictionaries, each representing a product.
+        :rtype: async generator
+        """
+        columns = product_columns(fields)
+        stmt = select(*(getattr(Product, column) for column in columns)).order_by(Product.id)
+        if after_id is not None:
+            stmt = stmt.where(Product.id > after_id)
+        if limit is not None:
+            stmt = stmt.limit(limit)
+        result = await async_db.session.stream(stmt.execution_options(yield_per=batch_size))
+        async for row in result:
+            yield dict(zip(columns, row))
+
+    @staticmethod
+    async def get_product(product_id, fields=None):
+        """
+        Retrieve a specific product from the database.
+
+        :param product_id: The ID of the product to retrieve.
+        :param fields: The product columns to select, see `product_columns`.
+        :type fields: iterable or None
+
+        :return: A dictionary representing the product if found, else None.
+        :rtype: dict or None
+        """
+        columns = product_columns(fields)
+        if 'get_product' not in current_app.config.get('SINGLE_FLIGHT_METHODS', ()):
+            return await AsyncProductService._load_product(product_id, columns)
+        return await async_product_reads.do(
+            'get_product', (product_id, columns),
+            lambda: AsyncProductService._load_product(product_id, columns))
+
+    @staticmethod
+    async def _load_product(product_id, columns=PRODUCT_COLUMNS):
+        """Load a product (only its `columns`) from the database."""
+        if columns is not PRODUCT_COLUMNS:
+            row = (await async_db.session.execute(
+                select(*(getattr(Product, column) for column in columns))
+                .where(Product.id == product_id))).first()
+            return dict(zip(columns, row)) if row is not None else None
+        product = await async_db.session.get(Product, product_id)
+        return product.to_dict() if product else None
+
+    @staticmethod
+    async def update_product(product_id, data):
+        """
+        Update a product in the database.
+
+        :param product_id: The ID of the product to update.
+        :param data: A dictionary containing the updated product data.
+
+        :return: A dictionary representing the updated product.
+        :rtype: dict
+
+        :raises ValueError: If the product does not exist.
+        :raises VersionConflictError: If the product was modified concurrently.
+        """
+        session = async_db.session
+        product = await session.get(Product, product_id)
+        if not product:
+            raise ValueError("Product not found")
+
+        product.name = data.get('name', product.name)
+        product.description = data.get('description', product.description)
+        product.price = data.get('price', product.price)
+        product.inventory = data.get('inventory', product.inventory)
+
+        try:
+            return await AsyncProductService._commit('updated', product_id)
+        except StaleDataError as err:
+            await session.rollback()
+            raise VersionConflictError("Product was modified concurrently") from err
+
+    @staticmethod
+    async def delete_product(product_id):
+        """
+        Delete a product from the database.
+
+        :param product_id: The ID of the product to delete.
+
+        :return: True if the product is successfully deleted.
+        :rtype: bool
+
+        :raises ValueError: If the product does not exist.
+        :raises VersionConflictError: If the product was modified concurrently.
+        """
+        session = async_db.session
+        product = await session.get(Product, product_id)
+        if not product:
+            raise ValueError("Product not found")
+
+        await session.delete(product)
+        try:
+            await AsyncProductService._commit('deleted', product_id)
+        except StaleDataError as err:
+            await session.rollback()
+            raise VersionConflictError("Product was modified concurrently") from err
+        return True
@@ -1,11 +1,276 @@
-from models.product import Product
+import re
+import threading
+import time
+from itertools import islice
+from flask import current_app
+from sqlalchemy import (and_, column, delete, func, insert, inspect, literal_column, or_, select,
+                        table, update)
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm.exc import StaleDataError
+from models.catalog import PRICE_SKETCH, CatalogPriceBucket, CatalogStats, CatalogVersion
+from models.product import PRODUCT_COLUMNS, PRODUCT_FIELDS, Product, product_columns
+from models.product_change import ProductChange
 from database.db import db
+from database.replicas import PRIMARY_ONLY, READ_REPLICA
+from shared.cache import product_cache
+from shared.coalescer import DeltaCoalescer
+from shared.singleflight import product_reads
+
+# Batches concurrent inventory deltas of a hot product (INVENTORY_COALESCING)
+inventory_coalescer = DeltaCoalescer()
+
+# Notified after every committed product write, wakes long-polling change readers
+changes_committed = threading.Condition()
+
+# Upsert statements of the dialects supporting one, by dialect name
+_UPSERT_INSERTS = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert,
+                   'mysql': mysql.insert, 'mariadb': mysql.insert}
+
+# Sort orders of `ProductService.search_products`: (column, descending).
+# Relevance has no column, it is ordered by the full-text rank.
+SEARCH_SORTS = {
+    'relevance': (None, False),
+    'id': ('id', False),
+    'price': ('price', False),
+    '-price': ('price', True),
+    'name': ('name', False),
+    '-name': ('name', True)
+}
+
+# External content FTS5 index of the product name and description on SQLite
+_product_fts = table('product_fts', column('rowid'), column('rank'))
+
+def _batched(iterable, size):
+    """Yield lists of at most `size` items from `iterable`."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+def _select_columns(columns=PRODUCT_COLUMNS):
+    """Select `columns` of products as plain tuples."""
+    return select(*(getattr(Product, column) for column in columns))
+
+def _row_dict(columns, row):
+    """Zip a selected row into a dictionary, None when there is no row."""
+    return dict(zip(columns, row)) if row is not None else None
+
+def _project(product, columns):
+    """Return the `columns` of a product dictionary."""
+    if columns is PRODUCT_COLUMNS:
+        return product
+    return {column: product[column] for column in columns}
+
+def _search_terms(query):
+    """Split a search query into words, dropping full-text query operators."""
+    return re.findall(r'\w+', query or '')
+
+def _match_terms(stmt, terms):
+    """
+    Restrict `stmt` to products whose name or description contain every term
+    (as a word prefix) using the full-text index of the database.
+
+    Returns the statement and the expression to order it by relevance.
+    """
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'sqlite':
+        expression = ' '.join(f'"{term}"*' for term in terms)
+        stmt = stmt.join(_product_fts, _product_fts.c.rowid == Product.id) \
+            .where(literal_column('product_fts').op('MATCH')(expression))
+        return stmt, _product_fts.c.rank
+    if dialect in ('mysql', 'mariadb'):
+        relevance = mysql.match(
+            Product.name, Product.description,
+            against=' '.join(f'+{term}*' for term in terms)
+        ).in_boolean_mode()
+        return stmt.where(relevance), relevance.desc()
+    # No full-text index on other databases, fall back to a (linear) LIKE scan
+    for term in terms:
+        pattern = f'%{term}%'
+        stmt = stmt.where(or_(Product.name.ilike(pattern), Product.description.ilike(pattern)))
+    return stmt, Product.id
+
+def _keyset_after(sort_column, descending, value, last_id):
+    """
+    Filter the rows that follow (`value`, `last_id`) in the order
+    (`sort_column`, id). NULLs sort before any value, as on SQLite and MySQL.
+    """
+    if value is None:
+        if descending:
+            return and_(sort_column.is_(None), Product.id > last_id)
+        return or_(sort_column.is_not(None), Product.id > last_id)
+    tie = and_(sort_column == value, Product.id > last_id)
+    if descending:
+        return or_(sort_column < value, tie, sort_column.is_(None))
+    return or_(sort_column > value, tie)
+
+def _single_flight(method, key, loader):
+    """
+    Run `loader`, sharing its query with concurrent identical reads of `method`.
+
+    Reads of a session that wrote are not shared, so they still see their writes.
+    """
+    if (method not in current_app.config.get('SINGLE_FLIGHT_METHODS', ())
+            or db.session.info.get(PRIMARY_ONLY)):
+        return loader()
+    return product_reads.do(method, key, loader)
+
+def _import_mapping(row):
+    """
+    Validate an imported row, returning its product mapping or an error message.
+    """
+    if not isinstance(row, dict):
+        return None, 'Row must be an object with the product fields'
+    missing = [field for field in PRODUCT_FIELDS if row.get(field) is None
+               and field != 'description']
+    if missing:
+        return None, 'Missing required fields: ' + ', '.join(missing)
+    try:
+        mapping = {
+            'name': str(row['name']),
+            'description': None if row.get('description') is None else str(row['description']),
+            'price': float(row['price']),
+            'inventory': int(row['inventory'])
+        }
+    except (TypeError, ValueError):
+        return None, 'price must be a number and inventory an integer'
+    return mapping, None
+
+def _cache_fill_bind():
+    """
+    Return the bind arguments of a read whose rows are cached.
+
+    A replica may not have applied the write that just invalidated a product
+    yet, and a stale row cached from it would be served for the whole TTL, so
+    the reads filling the cache go to the primary.
+    """
+    return None if product_cache.enabled else READ_REPLICA
+
+def cache_key(product_id):
+    """Return the cache key of a product."""
+    return f'product:{product_id}'
+
+def _inventory_state(product):
+    """Return the id, inventory and version of a serialized product."""
+    return {'id': product['id'], 'inventory': product['inventory'], 'version': product['version']}
+
+def _error(index, message, product_id=None):
+    """Build a failed entry of a bulk result report."""
+    return {'index': index, 'id': product_id, 'status': 'error', 'error': message}
+
+# JSON types accepted for the writable product fields of bulk writes
+PRODUCT_FIELD_TYPES = {
+    'name': ((str,), 'a string'),
+    'description': ((str, type(None)), 'a string or null'),
+    'price': ((int, float), 'a number'),
+    'inventory': ((int,), 'an integer')
+}
+
+def _is_id(value):
+    """Whether `value` is a product id (an integer, not a boolean)."""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+def _field_error(data):
+    """Return why the product fields of a bulk item have the wrong type, or None."""
+    for field, (types, expected) in PRODUCT_FIELD_TYPES.items():
+        if field in data and (isinstance(data[field], bool) or
+                              not isinstance(data[field], types)):
+            return f'{field} must be {expected}'
+    return None
+
+def _db_error(err):
+    """Return the message of a database error, without the SQL statement."""
+    return str(getattr(err, 'orig', None) or err)
+
+class VersionConflictError(Exception):
+    """
+    Raised when a product was modified since the version the caller expected.
+    """
+
+class InsufficientInventoryError(Exception):
+    """
+    Raised when an inventory change would make the inventory of a product negative.
+    """
+
+    def __init__(self, product_id):
+        super().__init__(f'Insufficient inventory for product {product_id}')
+        self.product_id = product_id
 
 class ProductService:
     """
     A class to handle operations related to products.
     """
 
+    @staticmethod
+    def _commit(op=None, product_ids=()):
+        """
+        Commit a product write.
+
+        The catalog version is bumped inside the same transaction. Its row lock
+        serializes product writes, so the `op` changes of `product_ids` that
+        are recorded in the change outbox right after it become visible in
+        sequence order. The cached entries of the products are invalidated once
+        the commit succeeded.
+
+        :param op: The change: 'created', 'updated' or 'deleted'.
+        :param product_ids: The IDs of the written products.
+
+        :return: The written products as dictionaries, ordered by id (none for deletions).
+        :rtype: list
+        """
+        return ProductService._commit_changes([(op, product_ids)])
+
+    @staticmethod
+    def _commit_changes(changes):
+        """
+        Commit product writes of several kinds, see `_commit`.
+
+        :param changes: (op, product_ids) pairs.
+
+        :return: The written products as dictionaries, per pair ordered by id.
+        :rtype: list
+        """
+        if not any(product_ids for _, product_ids in changes):
+            # Nothing was written: the catalog version and the feed stay as they are
+            db.session.commit()
+            return []
+        db.session.execute(
+            update(CatalogVersion)
+            .where(CatalogVersion.id == 1)
+            .values(version=CatalogVersion.version + 1)
+        )
+        products = []
+        written_ids = []
+        for op, product_ids in changes:
+            if not product_ids:
+                continue
+            written_ids.extend(product_ids)
+            if op == 'deleted':
+                rows = [{'product_id': product_id, 'op': op, 'version': None, 'product': None}
+                        for product_id in product_ids]
+            else:
+                written = ProductService._product_rows(product_ids)
+                products.extend(written)
+                rows = [{'product_id': product['id'], 'op': op,
+                         'version': product['version'], 'product': product}
+                        for product in written]
+            db.session.execute(insert(ProductChange), rows)
+        db.session.commit()
+        product_cache.invalidate(*(cache_key(product_id) for product_id in written_ids))
+        with changes_committed:
+            changes_committed.notify_all()
+        return products
+
+    @staticmethod
+    def _product_rows(product_ids):
+        """Select products from the primary as dictionaries, ordered by id."""
+        rows = db.session.execute(
+            _select_columns().where(Product.id.in_(product_ids)).order_by(Product.id))
+        return [dict(zip(PRODUCT_COLUMNS, row)) for row in rows]
+
     @staticmethod
     def add_product(data):
         """
@@ -24,71 +289,804 @@ class ProductService:
             inventory=data['inventory']
         )
         db.session.add(product)
-        db.session.commit()
-        return product.to_dict()
+        db.session.flush()
+        return ProductService._commit('created', [product.id])[0]
 
     @staticmethod
-    def get_all_products():
+    def get_all_products(fields=None):
         """
         Retrieve all products from the database.
 
+        :param fields: The product columns to select, see `product_columns`.
+        :type fields: iterable or None
+
+        :return: A list of dictionaries, each representing a product.
+        :rtype: list
+        """
+        return list(ProductService.iter_products(fields=fields))
+
+    @staticmethod
+    def get_products_page(after_id=None, limit=None, fields=None):
+        """
+        Retrieve a page of products using keyset pagination on the primary key.
+
+        Rows are ordered by id, so the id of the last product on a page is the
+        cursor for the next one. Unlike offset pagination the cost of a page
+        does not grow with its position in the table.
+
+        :param after_id: Only return products with an id greater than this.
+        :type after_id: int or None
+        :param limit: The maximum number of products to return.
+        :type limit: int or None
+        :param fields: The product columns to select, see `product_columns`.
+        :type fields: iterable or None
+
         :return: A list of dictionaries, each representing a product.
         :rtype: list
         """
-        return [product.to_dict() for product in Product.query.all()]
+        return list(ProductService.iter_products(after_id=after_id, limit=limit, fields=fields))
+
+    @staticmethod
+    def iter_products(after_id=None, limit=None, batch_size=500, fields=None):
+        """
+        Lazily iterate over products ordered by id.
+
+        Rows are fetched from a server-side cursor in batches of `batch_size`
+        (`yield_per`), so memory stays flat regardless of the table size.
+        Only the columns are selected and each result tuple is zipped into a
+        dictionary, skipping the hydration of `Product` objects and the
+        identity map; with `fields`, the other columns are not even fetched.
+
+        :param after_id: Only yield products with an id greater than this.
+        :type after_id: int or None
+        :param limit: The maximum number of products to yield.
+        :type limit: int or None
+        :param batch_size: The number of rows fetched per round trip.
+        :type batch_size: int
+        :param fields: The product columns to select, see `product_columns`.
+        :type fields: iterable or None
+
+        :return: A generator of dictionaries, each representing a product.
+        :rtype: generator
+        """
+        columns = product_columns(fields)
+        stmt = _select_columns(columns).order_by(Product.id)
+        if after_id is not None:
+            stmt = stmt.where(Product.id > after_id)
+        if limit is not None:
+            stmt = stmt.limit(limit)
+        stmt = stmt.execution_options(yield_per=batch_size)
+        for row in db.session.execute(stmt, bind_arguments=READ_REPLICA):
+            yield dict(zip(columns, row))
 
     @staticmethod
-    def get_product(product_id):
+    def search_products(query=None, min_price=None, max_price=None, in_stock=None,
+                        sort=None, after=None, limit=50, fields=None):
+        """
+        Search products by text, price range and stock.
+
+        The text query matches words (and word prefixes) of the name and
+        description through the full-text index (FTS5 on SQLite, FULLTEXT on
+        MySQL). Price filters and sorting use the (price, inventory) index.
+        Pages after the first are selected with a keyset `after` cursor, so
+        deep pages cost the same as the first one.
+
+        :param query: Words that must all appear in the name or description.
+        :type query: str or None
+        :param min_price: Only return products at or above this price.
+        :type min_price: float or None
+        :param max_price: Only return products at or below this price.
+        :type max_price: float or None
+        :param in_stock: Only return products in stock (True) or out of stock (False).
+        :type in_stock: bool or None
+        :param sort: One of `SEARCH_SORTS`. Defaults to relevance when there is
+            a text query, else to id.
+        :type sort: str or None
+        :param after: The cursor returned with the previous page.
+        :type after: tuple or None
+        :param limit: The maximum number of products to return.
+        :type limit: int
+        :param fields: The product columns to select, see `product_columns`.
+        :type fields: iterable or None
+
+        :return: The products of the page and the cursor of the next page,
+            which is None on the last page and when sorting by relevance.
+        :rtype: tuple
+
+        :raises ValueError: If the sort order is unknown or needs a query.
+        """
+        terms = _search_terms(query)
+        sort = sort or ('relevance' if terms else 'id')
+        if sort not in SEARCH_SORTS:
+            raise ValueError('sort must be one of: ' + ', '.join(SEARCH_SORTS))
+        if sort == 'relevance' and not terms:
+            raise ValueError('sort=relevance requires a search query')
+
+        column_name, descending = SEARCH_SORTS[sort]
+        columns = product_columns(fields)
+        # The sort column is selected for the cursor of the next page
+        selected = columns if column_name in (None, *columns) else columns + (column_name,)
+        stmt = _select_columns(selected)
+        relevance = None
+        if terms:
+            stmt, relevance = _match_terms(stmt, terms)
+        if min_price is not None:
+            stmt = stmt.where(Product.price >= min_price)
+        if max_price is not None:
+            stmt = stmt.where(Product.price <= max_price)
+        if in_stock is True:
+            stmt = stmt.where(Product.inventory > 0)
+        elif in_stock is False:
+            stmt = stmt.where(or_(Product.inventory <= 0, Product.inventory.is_(None)))
+
+        if column_name is None:
+            stmt = stmt.order_by(relevance, Product.id)
+        else:
+            sort_column = getattr(Product, column_name)
+            if after is not None:
+                stmt = stmt.where(_keyset_after(sort_column, descending, *after))
+            stmt = stmt.order_by(sort_column.desc() if descending else sort_column, Product.id)
+
+        rows = db.session.execute(stmt.limit(limit), bind_arguments=READ_REPLICA)
+        products = [dict(zip(selected, row)) for row in rows]
+        cursor = None
+        if column_name is not None and len(products) == limit:
+            cursor = (products[-1][column_name], products[-1]['id'])
+        return [_project(product, columns) for product in products], cursor
+
+    @staticmethod
+    def get_product(product_id, fields=None):
         """
         Retrieve a specific product from the database.
 
+        With `fields`, a cached product is projected, otherwise only the
+        requested columns are selected (and the partial product is not cached).
+
         :param product_id: The ID of the product to retrieve.
+        :param fields: The product columns to select, see `product_columns`.
+        :type fields: iterable or None
 
         :return: A dictionary representing the product if found, else None.
         :rtype: dict or None
         """
+        columns = product_columns(fields)
+        if columns is not PRODUCT_COLUMNS:
+            cached = product_cache.peek(cache_key(product_id))
+            if cached is not None:
+                return _project(cached, columns)
+            return _single_flight('get_product', (product_id, columns), lambda: _row_dict(
+                columns, db.session.execute(
+                    _select_columns(columns).where(Product.id == product_id),
+                    bind_arguments=READ_REPLICA).first()))
         # product = Product.query.get(product_id) # v1
         # product = db.session.get(Product, product_id) # v2
-        product = db.session.get(Product, product_id)
+        return product_cache.get_or_load(
+            cache_key(product_id),
+            lambda: _single_flight('get_product', product_id,
+                                   lambda: ProductService._load_product(product_id)))
+
+    @staticmethod
+    def _load_product(product_id):
+        """Load a product from the database, bypassing the cache."""
+        product = db.session.get(Product, product_id, bind_arguments=_cache_fill_bind())
         return product.to_dict() if product else None
 
     @staticmethod
-    def update_product(product_id, data):
+    def get_products_by_ids(product_ids, fields=None):
+        """
+        Retrieve several products by id in a single round trip.
+
+        Products are taken from the cache, then from the products already
+        loaded in the session (identity map); the others are selected with a
+        single `IN` query and cached (read from the primary when the cache is
+        enabled). With `fields` only the requested columns are selected, and
+        the partial products are not cached.
+
+        :param product_ids: The IDs of the products; repeated IDs are ignored.
+        :type product_ids: iterable
+        :param fields: The product columns to select, see `product_columns`.
+        :type fields: iterable or None
+
+        :return: The found products as dictionaries in the order of
+            `product_ids`, and the IDs of the missing products.
+        :rtype: tuple
+        """
+        columns = product_columns(fields)
+        product_ids = list(dict.fromkeys(product_ids))
+        keys = {cache_key(product_id): product_id for product_id in product_ids}
+        found = {keys[key]: product for key, product in product_cache.get_many(keys).items()}
+        mapper = inspect(Product)
+        for product_id in product_ids:
+            if product_id in found:
+                continue
+            product = db.session.identity_map.get(
+                mapper.identity_key_from_primary_key((product_id,)))
+            if product is not None and not inspect(product).expired_attributes:
+                found[product_id] = product.to_dict()
+
+        remaining = [product_id for product_id in product_ids if product_id not in found]
+        if remaining:
+            generations = {product_id: product_cache.generation(cache_key(product_id))
+                           for product_id in remaining}
+            rows = db.session.execute(
+                _select_columns(columns).where(Product.id.in_(remaining)),
+                bind_arguments=_cache_fill_bind() if columns is PRODUCT_COLUMNS else READ_REPLICA)
+            for row in rows:
+                product = dict(zip(columns, row))
+                found[product['id']] = product
+                if columns is PRODUCT_COLUMNS:
+                    product_cache.set(cache_key(product['id']), product,
+                                      generation=generations[product['id']])
+
+        products = [_project(found[product_id], columns)
+                    for product_id in product_ids if product_id in found]
+        missing = [product_id for product_id in product_ids if product_id not in found]
+        return products, missing
+
+    @staticmethod
+    def get_product_version(product_id):
+        """
+        Retrieve the row version of a product without loading the product.
+
+        The cached product is used when available, otherwise only the version
+        column is selected.
+
+        :param product_id: The ID of the product.
+
+        :return: The version of the product if found, else None.
+        :rtype: int or None
+        """
+        cached = product_cache.peek(cache_key(product_id))
+        if cached is not None and cached.get('version') is not None:
+            return cached['version']
+        return _single_flight('get_product_version', product_id, lambda: db.session.scalar(
+            select(Product.version).where(Product.id == product_id), bind_arguments=READ_REPLICA))
+
+    @staticmethod
+    def get_catalog_version():
+        """
+        Retrieve the version of the product table.
+
+        The version changes whenever any product is added, updated or deleted.
+
+        :return: The catalog version.
+        :rtype: int
+        """
+        return _single_flight('get_catalog_version', None, lambda: db.session.scalar(
+            select(CatalogVersion.version).where(CatalogVersion.id == 1),
+            bind_arguments=READ_REPLICA)) or 0
+
+    @staticmethod
+    def get_catalog_stats(quantiles=(0.5, 0.9, 0.95, 0.99)):
+        """
+        Retrieve aggregates of the whole product table.
+
+        The aggregates are maintained by triggers on every product write, and
+        price quantiles are estimated from a DDSketch of the prices (within
+        1%), so the cost does not depend on the number of products.
+
+        :param quantiles: The price quantiles to estimate, between 0 and 1.
+        :type quantiles: tuple
+
+        :return: The counts, inventory totals and price distribution.
+        :rtype: dict
+        """
+        def load():
+            stats = db.session.scalars(
+                select(CatalogStats).where(CatalogStats.id == 1),
+                bind_arguments=READ_REPLICA).one()
+            buckets = db.session.execute(
+                select(CatalogPriceBucket.bucket, CatalogPriceBucket.product_count)
+                .where(CatalogPriceBucket.product_count > 0)
+                .order_by(CatalogPriceBucket.bucket),
+                bind_arguments=READ_REPLICA).all()
+            estimates = PRICE_SKETCH.quantiles(
+                buckets, stats.zero_price_count, (0.0, 1.0) + tuple(quantiles))
+            return {
+                'product_count': stats.product_count,
+                'in_stock_count': stats.in_stock_count,
+                'total_inventory': stats.total_inventory,
+                'inventory_value': stats.inventory_value,
+                'price': {
+                    'count': stats.priced_count,
+                    'mean': stats.price_sum / stats.priced_count if stats.priced_count else None,
+                    'min': estimates[0.0],
+                    'max': estimates[1.0],
+                    'quantiles': {f'{quantile:g}': estimates[quantile] for quantile in quantiles},
+                    'relative_accuracy': PRICE_SKETCH.relative_accuracy
+                }
+            }
+
+        return _single_flight('get_catalog_stats', tuple(quantiles), load)
+
+    @staticmethod
+    def get_changes(since=0, limit=500):
+        """
+        Retrieve the product changes recorded after sequence number `since`.
+
+        :param since: The sequence number of the last change already seen.
+        :type since: int
+        :param limit: The maximum number of changes to return.
+        :type limit: int
+
+        :return: A list of dictionaries, each representing a change, in sequence order.
+        :rtype: list
+        """
+        changes = db.session.scalars(
+            select(ProductChange)
+            .where(ProductChange.seq > since)
+            .order_by(ProductChange.seq)
+            .limit(limit),
+            bind_arguments=READ_REPLICA
+        )
+        return [change.to_dict() for change in changes]
+
+    @staticmethod
+    def wait_for_changes(since=0, limit=500, timeout=0.0, poll_interval=0.5):
+        """
+        Retrieve the changes after `since`, waiting up to `timeout` seconds for one.
+
+        The outbox is polled every `poll_interval` seconds; writes committed
+        by this process wake the waiting readers immediately.
+
+        :param since: The sequence number of the last change already seen.
+        :param limit: The maximum number of changes to return.
+        :param timeout: The longest time to wait for a change, in seconds.
+        :param poll_interval: The time between two reads of the outbox, in seconds.
+
+        :return: A list of changes, empty if none arrived in time.
+        :rtype: list
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            changes = ProductService.get_changes(since, limit)
+            remaining = deadline - time.monotonic()
+            if changes or remaining <= 0:
+                return changes
+            # End the read transaction, so the next read sees new commits
+            db.session.rollback()
+            with changes_committed:
+                changes_committed.wait(min(poll_interval, remaining))
+
+    @staticmethod
+    def update_product(product_id, data, expected_version=None):
         """
         Update a product in the database.
 
+        The UPDATE only matches the row version that was read, so a concurrent
+        modification is detected instead of silently overwritten.
+
         :param product_id: The ID of the product to update.
         :param data: A dictionary containing the updated product data.
+        :param expected_version: If given, only update the product at this version.
 
         :return: A dictionary representing the updated product.
         :rtype: dict
+
+        :raises ValueError: If the product does not exist.
+        :raises VersionConflictError: If the product version does not match.
         """
         product = db.session.get(Product, product_id)
         if not product:
             raise ValueError("Product not found")
+        if expected_version is not None and product.version != expected_version:
+            raise VersionConflictError("Product version does not match")
 
         product.name = data.get('name', product.name)
         product.description = data.get('description', product.description)
         product.price = data.get('price', product.price)
         product.inventory = data.get('inventory', product.inventory)
 
-        db.session.commit()
-        return product.to_dict()
+        try:
+            return ProductService._commit('updated', [product_id])[0]
+        except StaleDataError as err:
+            db.session.rollback()
+            raise VersionConflictError("Product was modified concurrently") from err
 
     @staticmethod
-    def delete_product(product_id):
+    def delete_product(product_id, expected_version=None):
         """
         Delete a product from the database.
 
         :param product_id: The ID of the product to delete.
+        :param expected_version: If given, only delete the product at this version.
 
         :return: True if the product is successfully deleted.
         :rtype: bool
+
+        :raises ValueError: If the product does not exist.
+        :raises VersionConflictError: If the product version does not match.
         """
         product = db.session.get(Product, product_id)
         if not product:
             raise ValueError("Product not found")
+        if expected_version is not None and product.version != expected_version:
+            raise VersionConflictError("Product version does not match")
 
         db.session.delete(product)
-        db.session.commit()
+        try:
+            ProductService._commit('deleted', [product_id])
+        except StaleDataError as err:
+            db.session.rollback()
+            raise VersionConflictError("Product was modified concurrently") from err
         return True
+
+    @staticmethod
+    def adjust_inventory(product_id, delta, coalesce=False):
+        """
+        Atomically add `delta` to the inventory of a product.
+
+        The change is a single conditional UPDATE, so concurrent adjustments
+        never lose updates and a decrement never takes the inventory below
+        zero. With `coalesce`, concurrent adjustments of the same product in
+        this process are applied together, see `_adjust_inventory_batch`.
+
+        :param product_id: The ID of the product.
+        :param delta: The change of inventory, negative to take stock.
+        :type delta: int
+        :param coalesce: Batch concurrent adjustments of the same product.
+        :type coalesce: bool
+
+        :return: The id, new inventory and version of the product.
+        :rtype: dict
+
+        :raises ValueError: If the product does not exist.
+        :raises InsufficientInventoryError: If there is not enough inventory.
+        """
+        if coalesce:
+            return inventory_coalescer.submit(
+                product_id, delta, ProductService._adjust_inventory_batch)
+        if not ProductService._apply_inventory_delta(product_id, delta):
+            db.session.rollback()
+            ProductService._raise_inventory_error(product_id)
+        return _inventory_state(ProductService._commit('updated', [product_id])[0])
+
+    @staticmethod
+    def reserve_inventory(quantities):
+        """
+        Take stock of several products in one transaction, all or nothing.
+
+        Rows are updated in id order, so concurrent reservations lock them in
+        the same order and cannot deadlock.
+
+        :param quantities: The quantity to reserve, keyed by product ID.
+        :type quantities: dict
+
+        :return: The id, new inventory and version of every product, by id.
+        :rtype: list
+
+        :raises ValueError: If a product does not exist.
+        :raises InsufficientInventoryError: If a product has not enough inventory.
+        """
+        product_ids = sorted(quantities)
+        for product_id in product_ids:
+            if not ProductService._apply_inventory_delta(product_id, -quantities[product_id]):
+                db.session.rollback()
+                ProductService._raise_inventory_error(product_id)
+        return [_inventory_state(product)
+                for product in ProductService._commit('updated', product_ids)]
+
+    @staticmethod
+    def _adjust_inventory_batch(product_id, deltas):
+        """
+        Apply a batch of inventory deltas of one product in one transaction.
+
+        The row is locked (on databases supporting SELECT ... FOR UPDATE) and
+        the deltas are accepted in order while the inventory stays positive.
+        The accepted deltas are written with one conditional UPDATE; if another
+        process changed the inventory in the meantime they are applied one by
+        one instead.
+
+        :return: A result per delta, the new state or an exception.
+        :rtype: list
+        """
+        inventory = db.session.execute(
+            select(Product.inventory).where(Product.id == product_id).with_for_update()
+        ).first()
+        if inventory is None:
+            db.session.rollback()
+            return [ValueError("Product not found")] * len(deltas)
+
+        available = inventory[0] or 0
+        results = [None] * len(deltas)
+        accepted = []
+        for index, delta in enumerate(deltas):
+            if available + delta >= 0:
+                available += delta
+                accepted.append(index)
+            else:
+                results[index] = InsufficientInventoryError(product_id)
+        if not accepted:
+            db.session.rollback()
+            return results
+
+        net = sum(deltas[index] for index in accepted)
+        if not ProductService._apply_inventory_delta(product_id, net):
+            for index in accepted:
+                if not ProductService._apply_inventory_delta(product_id, deltas[index]):
+                    results[index] = InsufficientInventoryError(product_id)
+            if all(result is not None for result in results):
+                db.session.rollback()
+                return results
+        state = _inventory_state(ProductService._commit('updated', [product_id])[0])
+        return [state if result is None else result for result in results]
+
+    @staticmethod
+    def _apply_inventory_delta(product_id, delta):
+        """Add `delta` to the inventory unless it would go below zero; return whether it did."""
+        inventory = func.coalesce(Product.inventory, 0)
+        result = db.session.execute(
+            update(Product)
+            .where(Product.id == product_id, inventory + delta >= 0)
+            .values(inventory=inventory + delta, version=Product.version + 1)
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount == 1
+
+    @staticmethod
+    def _raise_inventory_error(product_id):
+        """Raise the reason why the inventory of a product could not be changed."""
+        if db.session.get(Product, product_id) is None:
+            raise ValueError("Product not found")
+        raise InsufficientInventoryError(product_id)
+
+    @staticmethod
+    def bulk_add_products(items, batch_size=500):
+        """
+        Add many products, committing once per batch.
+
+        Each batch is written with a single bulk insert. If the batch violates
+        a constraint (e.g. a duplicate name) it is retried item by item inside
+        savepoints, so only the offending items are rejected.
+
+        :param items: An iterable of dictionaries containing product data.
+        :type items: iterable
+        :param batch_size: The number of products written per transaction.
+        :type batch_size: int
+
+        :return: A result entry per item, in input order.
+        :rtype: list
+        """
+        results = []
+        index = 0
+        for batch in _batched(items, batch_size):
+            mappings = []
+            for data in batch:
+                if not isinstance(data, dict):
+                    results.append(_error(index, 'Item must be a JSON object'))
+                elif any(field not in data for field in PRODUCT_FIELDS):
+                    results.append(_error(index, 'Missing required fields: ' + ', '.join(
+                        field for field in PRODUCT_FIELDS if field not in data)))
+                elif _field_error(data) is not None:
+                    results.append(_error(index, _field_error(data)))
+                else:
+                    mapping = {field: data[field] for field in PRODUCT_FIELDS}
+                    mappings.append((index, mapping))
+                    results.append(None)
+                index += 1
+            if not mappings:
+                continue
+            try:
+                db.session.bulk_insert_mappings(
+                    Product, [mapping for _, mapping in mappings], return_defaults=True)
+                ProductService._commit('created', [mapping['id'] for _, mapping in mappings])
+                for item_index, mapping in mappings:
+                    results[item_index] = {'index': item_index, 'id': mapping['id'],
+                                           'status': 'created'}
+            except SQLAlchemyError:
+                db.session.rollback()
+                for item_index, mapping in mappings:
+                    results[item_index] = ProductService._insert_one(item_index, mapping)
+                ProductService._commit('created', [
+                    results[item_index]['id'] for item_index, _ in mappings
+                    if results[item_index]['status'] == 'created'])
+        return results
+
+    @staticmethod
+    def _insert_one(index, mapping):
+        """Insert a single product inside a savepoint and report the outcome."""
+        try:
+            with db.session.begin_nested():
+                product = Product(**mapping)
+                db.session.add(product)
+            return {'index': index, 'id': product.id, 'status': 'created'}
+        except SQLAlchemyError as err:
+            return _error(index, _db_error(err))
+
+    @staticmethod
+    def bulk_update_products(items, batch_size=500):
+        """
+        Update many products, committing once per batch.
+
+        Each item must contain the `id` of the product and the fields to
+        change. Existing ids are resolved with one query per batch and the
+        updates are written with a single bulk update.
+
+        :param items: An iterable of dictionaries with an `id` and product data.
+        :type items: iterable
+        :param batch_size: The number of products written per transaction.
+        :type batch_size: int
+
+        :return: A result entry per item, in input order.
+        :rtype: list
+        """
+        results = []
+        index = 0
+        for batch in _batched(items, batch_size):
+            ids = [data['id'] for data in batch if isinstance(data, dict) and _is_id(data.get('id'))]
+            existing = dict(db.session.execute(
+                select(Product.id, Product.version).where(Product.id.in_(ids))).all())
+            mappings = []
+            for data in batch:
+                if not isinstance(data, dict) or not _is_id(data.get('id')):
+                    results.append(_error(index, 'Item must be a JSON object with an integer id'))
+                elif _field_error(data) is not None:
+                    results.append(_error(index, _field_error(data), data['id']))
+                elif data['id'] not in existing:
+                    results.append(_error(index, 'Product not found', data['id']))
+                else:
+                    mapping = {field: data[field] for field in PRODUCT_FIELDS if field in data}
+                    mapping['id'] = data['id']
+                    mapping['version'] = existing[data['id']]
+                    mappings.append((index, mapping))
+                    results.append(None)
+                index += 1
+            if not mappings:
+                continue
+            try:
+                db.session.bulk_update_mappings(Product, [mapping for _, mapping in mappings])
+                ProductService._commit('updated', [mapping['id'] for _, mapping in mappings])
+                for item_index, mapping in mappings:
+                    results[item_index] = {'index': item_index, 'id': mapping['id'],
+                                           'status': 'updated'}
+            except SQLAlchemyError:
+                db.session.rollback()
+                for item_index, mapping in mappings:
+                    results[item_index] = ProductService._update_one(item_index, mapping)
+                ProductService._commit('updated', [
+                    mapping['id'] for item_index, mapping in mappings
+                    if results[item_index]['status'] == 'updated'])
+        return results
+
+    @staticmethod
+    def _update_one(index, mapping):
+        """Update a single product inside a savepoint and report the outcome."""
+        version = db.session.scalar(select(Product.version).where(Product.id == mapping['id']))
+        if version is None:
+            return _error(index, 'Product not found', mapping['id'])
+        try:
+            with db.session.begin_nested():
+                db.session.bulk_update_mappings(Product, [dict(mapping, version=version)])
+            return {'index': index, 'id': mapping['id'], 'status': 'updated'}
+        except StaleDataError:
+            return _error(index, 'Product was modified concurrently', mapping['id'])
+        except SQLAlchemyError as err:
+            return _error(index, _db_error(err), mapping['id'])
+
+    @staticmethod
+    def bulk_delete_products(product_ids, batch_size=500):
+        """
+        Delete many products, committing once per batch.
+
+        :param product_ids: An iterable of product IDs.
+        :type product_ids: iterable
+        :param batch_size: The number of products deleted per transaction.
+        :type batch_size: int
+
+        :return: A result entry per item, in input order.
+        :rtype: list
+        """
+        results = []
+        index = 0
+        for batch in _batched(product_ids, batch_size):
+            ids = [product_id for product_id in batch if _is_id(product_id)]
+            existing = set(db.session.scalars(select(Product.id).where(Product.id.in_(ids))))
+            for product_id in batch:
+                if not _is_id(product_id):
+                    results.append(_error(index, 'Item must be an integer id'))
+                elif product_id not in existing:
+                    results.append(_error(index, 'Product not found', product_id))
+                else:
+                    results.append({'index': index, 'id': product_id, 'status': 'deleted'})
+                index += 1
+            if existing:
+                db.session.execute(delete(Product).where(Product.id.in_(existing)))
+                ProductService._commit('deleted', sorted(existing))
+        return results
+
+    @staticmethod
+    def import_products(rows, batch_size=500, max_errors=100):
+        """
+        Create or update products by name, committing once per batch.
+
+        A row whose name matches an existing product updates its description,
+        price and inventory; other rows create products. Within a batch the
+        last row of a name wins. Only counters and the first `max_errors`
+        errors are kept, so any number of rows can be imported.
+
+        :param rows: An iterable of dictionaries with the product fields.
+        :type rows: iterable
+        :param batch_size: The number of rows written per transaction.
+        :type batch_size: int
+
+        :return: The created, updated and failed counts and the first errors.
+        :rtype: dict
+        """
+        summary = {'created': 0, 'updated': 0, 'failed': 0, 'errors': []}
+
+        def fail(index, message):
+            summary['failed'] += 1
+            if len(summary['errors']) < max_errors:
+                summary['errors'].append({'index': index, 'error': message})
+
+        index = 0
+        for batch in _batched(rows, batch_size):
+            first_index = index
+            by_name = {}
+            for row in batch:
+                mapping, error = _import_mapping(row)
+                if error is not None:
+                    fail(index, error)
+                else:
+                    by_name[mapping['name']] = mapping
+                index += 1
+            if not by_name:
+                continue
+            try:
+                created, updated = ProductService._upsert_batch(list(by_name.values()))
+            except IntegrityError as err:
+                db.session.rollback()
+                fail(first_index, f'Batch of {len(batch)} rows failed: {err.orig}')
+                summary['failed'] += len(by_name) - 1
+                continue
+            summary['created'] += created
+            summary['updated'] += updated
+        return summary
+
+    @staticmethod
+    def _upsert_batch(mappings):
+        """
+        Insert or update products by name with a single statement.
+
+        Uses the native upsert of SQLite, PostgreSQL and MySQL on the unique
+        index of `Product.name`; other databases update the existing names and
+        insert the others.
+
+        :return: The numbers of created and updated products.
+        :rtype: tuple
+        """
+        names = [mapping['name'] for mapping in mappings]
+        existing = set(db.session.scalars(select(Product.name).where(Product.name.in_(names))))
+        rows = [dict(mapping, version=1) for mapping in mappings]
+        dialect = db.session.get_bind(mapper=Product).dialect.name
+        upsert_insert = _UPSERT_INSERTS.get(dialect)
+        if upsert_insert is None:
+            for mapping in mappings:
+                if mapping['name'] in existing:
+                    db.session.execute(
+                        update(Product).where(Product.name == mapping['name'])
+                        .values(description=mapping['description'], price=mapping['price'],
+                                inventory=mapping['inventory'], version=Product.version + 1))
+            new_rows = [row for row in rows if row['name'] not in existing]
+            if new_rows:
+                db.session.execute(insert(Product).values(new_rows))
+        else:
+            stmt = upsert_insert(Product).values(rows)
+            if dialect in ('mysql', 'mariadb'):
+                stmt = stmt.on_duplicate_key_update(
+                    description=stmt.inserted.description, price=stmt.inserted.price,
+                    inventory=stmt.inserted.inventory, version=Product.version + 1)
+            else:
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[Product.name],
+                    set_={'description': stmt.excluded.description,
+                          'price': stmt.excluded.price,
+                          'inventory': stmt.excluded.inventory,
+                          'version': Product.version + 1})
+            db.session.execute(stmt)
+        ids = dict(db.session.execute(
+            select(Product.name, Product.id).where(Product.name.in_(names))).all())
+        created_ids = sorted(ids[name] for name in names if name not in existing)
+        updated_ids = sorted(ids[name] for name in names if name in existing)
+        ProductService._commit_changes([('created', created_ids), ('updated', updated_ids)])
+        return len(created_ids), len(updated_ids)
@@ -0,0 +1,389 @@
+"""
+Module for caching utilities.
+
+This module contains the cache backends and the read-through `ProductCache`
+extension used by the service layer to avoid a database round trip for hot
+products.
+
+Backends:
+- `LocalCacheBackend`: in-process LRU cache with a per-entry TTL.
+- `RedisCacheBackend`: shared cache speaking the Redis protocol, for
+  deployments with more than one worker process.
+"""
+
+import json
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from flask import current_app
+
+class LocalCacheBackend:
+    """
+    In-process LRU cache with a per-entry time to live.
+
+    Args:
+        max_entries (int): Entries kept before the least recently used is evicted.
+        default_ttl (float): Seconds an entry stays valid.
+    """
+
+    name = 'local'
+
+    def __init__(self, max_entries=1024, default_ttl=60):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Return the cached value for `key`, or None if missing or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def get_many(self, keys):
+        """
+        Return the unexpired cached values of `keys`, by key.
+        """
+        values = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                values[key] = value
+        return values
+
+    def set(self, key, value, ttl=None):
+        """
+        Store `value` under `key`, evicting the least recently used entry if full.
+        """
+        expires_at = time.monotonic() + (ttl if ttl is not None else self.default_ttl)
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def add(self, key, value, ttl=None):
+        """
+        Store `value` under `key` unless it holds an unexpired value.
+
+        Returns:
+            bool: Whether the value was stored.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > now:
+                return False
+            self._entries[key] = (value, now + (ttl if ttl is not None else self.default_ttl))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return True
+
+    def delete(self, key):
+        """
+        Remove `key` from the cache.
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """
+        Remove every entry from the cache.
+        """
+        with self._lock:
+            self._entries.clear()
+
+class RedisCacheBackend:
+    """
+    Cache backend for any client speaking the Redis protocol.
+
+    Values are stored as JSON with a server-side expiry, so every worker
+    process shares the same entries and invalidations.
+
+    Args:
+        client: A client exposing `get`, `mget`, `set(name, value, ex=..., nx=...)`
+            and `delete`.
+        prefix (str): Prefix for every key, to share a Redis database safely.
+        default_ttl (int): Seconds an entry stays valid.
+    """
+
+    name = 'redis'
+
+    def __init__(self, client, prefix='product-cache:', default_ttl=60):
+        self.client = client
+        self.prefix = prefix
+        self.default_ttl = default_ttl
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        """
+        Create a backend connected to the Redis server at `url`.
+
+        Raises:
+            RuntimeError: If the `redis` package is not installed.
+        """
+        try:
+            import redis  # pylint: disable=import-outside-toplevel
+        except ImportError as err:
+            raise RuntimeError('CACHE_BACKEND=redis requires the redis package') from err
+        return cls(redis.Redis.from_url(url), **kwargs)
+
+    def get(self, key):
+        """
+        Return the cached value for `key`, or None if missing or expired.
+        """
+        raw = self.client.get(self.prefix + key)
+        return json.loads(raw) if raw is not None else None
+
+    def get_many(self, keys):
+        """
+        Return the cached values of `keys`, by key, in a single round trip.
+        """
+        keys = list(keys)
+        if not keys:
+            return {}
+        raws = self.client.mget([self.prefix + key for key in keys])
+        return {key: json.loads(raw) for key, raw in zip(keys, raws) if raw is not None}
+
+    def set(self, key, value, ttl=None):
+        """
+        Store `value` under `key` with an expiry.
+        """
+        ttl = ttl if ttl is not None else self.default_ttl
+        self.client.set(self.prefix + key, json.dumps(value), ex=max(1, int(ttl)))
+
+    def add(self, key, value, ttl=None):
+        """
+        Store `value` under `key` with an expiry unless the key exists.
+
+        Returns:
+            bool: Whether the value was stored.
+        """
+        ttl = ttl if ttl is not None else self.default_ttl
+        return bool(self.client.set(self.prefix + key, json.dumps(value),
+                                    ex=max(1, int(ttl)), nx=True))
+
+    def delete(self, key):
+        """
+        Remove `key` from the cache.
+        """
+        self.client.delete(self.prefix + key)
+
+    def clear(self):
+        """
+        Not supported: entries of a shared cache expire on their own.
+        """
+
+class CacheStats:
+    """
+    Hit and miss counters of a cache.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+
+    def incr(self, counter, amount=1):
+        """
+        Increment the counter named `counter` by `amount`.
+        """
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    def to_dict(self):
+        """
+        Return the counters and the hit ratio.
+        """
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'invalidations': self.invalidations,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else None
+        }
+
+class _CacheState:
+    """
+    Per-application state of the `ProductCache` extension.
+    """
+
+    def __init__(self, backend, stripes):
+        self.backend = backend
+        self.stats = CacheStats()
+        self.locks = [threading.Lock() for _ in range(stripes)]
+        # Bumped on every invalidation of a key of the stripe
+        self.generations = [0] * stripes
+
+    def stripe(self, key):
+        """
+        Return the index of the lock and generation of `key`.
+        """
+        return zlib.crc32(key.encode()) % len(self.locks)
+
+    def lock_for(self, key):
+        """
+        Return the lock guarding loads of `key`.
+        """
+        return self.locks[self.stripe(key)]
+
+class ProductCache:
+    """
+    Read-through cache for product lookups.
+
+    Configured with:
+        CACHE_BACKEND: 'none' (default), 'local' or 'redis'.
+        CACHE_TTL: Seconds an entry stays valid.
+        CACHE_MAX_ENTRIES: Size of the in-process LRU.
+        CACHE_REDIS_URL: URL of the Redis server for the 'redis' backend.
+
+    On a miss only one thread per process loads a given key: concurrent
+    readers of the same key wait on a striped lock and then read the freshly
+    cached value, so a hot product expiring does not stampede the database.
+
+    Invalidations take the same lock and bump a generation of the stripe, and
+    a value loaded before an invalidation of its stripe is not stored: a
+    reader racing a writer cannot cache the row as it was before the write.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app, backend=None):
+        """
+        Register the cache on `app`, optionally with an explicit backend.
+        """
+        config = app.config
+        if backend is None:
+            kind = config.get('CACHE_BACKEND', 'none')
+            ttl = config.get('CACHE_TTL', 60)
+            if kind == 'local':
+                backend = LocalCacheBackend(config.get('CACHE_MAX_ENTRIES', 1024), ttl)
+            elif kind == 'redis':
+                backend = RedisCacheBackend.from_url(config['CACHE_REDIS_URL'], default_ttl=ttl)
+            elif kind != 'none':
+                raise ValueError(f'Unknown CACHE_BACKEND: {kind}')
+        app.extensions['product_cache'] = _CacheState(backend, config.get('CACHE_LOCK_STRIPES', 64))
+
+    @property
+    def _state(self):
+        return current_app.extensions['product_cache']
+
+    @property
+    def enabled(self):
+        """
+        Whether a backend is configured for the current application.
+        """
+        return self._state.backend is not None
+
+    def get_or_load(self, key, loader):
+        """
+        Return the cached value for `key`, calling `loader` on a miss.
+
+        Values for which `loader` returns None are not cached.
+        """
+        state = self._state
+        if state.backend is None:
+            return loader()
+        generation = self.generation(key)
+        value = state.backend.get(key)
+        if value is not None:
+            state.stats.incr('hits')
+            return value
+        with state.lock_for(key):
+            # Another thread may have loaded the key while we were waiting
+            value = state.backend.get(key)
+            if value is not None:
+                state.stats.incr('hits')
+                return value
+            state.stats.incr('misses')
+            value = loader()
+            if value is not None and state.generations[state.stripe(key)] == generation:
+                state.backend.set(key, value)
+            return value
+
+    def get_many(self, keys):
+        """
+        Return the cached values of `keys`, by key, counting hits and misses.
+
+        Missing keys are not loaded, the caller loads them together and
+        stores them with `set`.
+        """
+        state = self._state
+        if state.backend is None:
+            return {}
+        keys = list(keys)
+        values = state.backend.get_many(keys)
+        state.stats.incr('hits', len(values))
+        state.stats.incr('misses', len(keys) - len(values))
+        return values
+
+    def generation(self, key):
+        """
+        Return the invalidation generation of `key`, to be read before loading it.
+        """
+        state = self._state
+        return state.generations[state.stripe(key)]
+
+    def set(self, key, value, generation=None):
+        """
+        Store a value loaded by the caller under `key`.
+
+        With the `generation` of the key read before the load, the value is
+        dropped when the key may have been invalidated since.
+        """
+        state = self._state
+        if state.backend is None:
+            return
+        with state.lock_for(key):
+            if generation is None or state.generations[state.stripe(key)] == generation:
+                state.backend.set(key, value)
+
+    def peek(self, key):
+        """
+        Return the cached value for `key` without loading it or counting a lookup.
+        """
+        state = self._state
+        return state.backend.get(key) if state.backend is not None else None
+
+    def invalidate(self, *keys, app=None):
+        """
+        Remove `keys` from the cache after the underlying rows changed.
+
+        The cache of `app` is used when given, e.g. by the ASGI application,
+        which is not a Flask application context; the current application's
+        otherwise.
+        """
+        state = app.extensions['product_cache'] if app is not None else self._state
+        if state.backend is None:
+            return
+        for key in keys:
+            with state.lock_for(key):
+                state.generations[state.stripe(key)] += 1
+                state.backend.delete(key)
+            state.stats.incr('invalidations')
+
+    def stats(self):
+        """
+        Return the backend name and the hit/miss counters.
+        """
+        state = self._state
+        stats = state.stats.to_dict()
+        stats['backend'] = state.backend.name if state.backend is not None else 'none'
+        return stats
+
+product_cache = ProductCache()
+"""The read-through cache for product lookups."""
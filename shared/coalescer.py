@@ -0,0 +1,77 @@
+"""
+Module for coalescing concurrent writes.
+
+This module contains `DeltaCoalescer`, which groups the deltas that concurrent
+threads of a process submit for the same key, so a hot key is written once per
+batch instead of once per request.
+"""
+
+import threading
+import zlib
+
+class _PendingDelta:
+    """A delta waiting for its batch to be applied."""
+
+    __slots__ = ('delta', 'result', 'done')
+
+    def __init__(self, delta):
+        self.delta = delta
+        self.result = None
+        self.done = threading.Event()
+
+class DeltaCoalescer:
+    """
+    Group concurrent deltas to the same key into batches.
+
+    The first caller submitting a delta for a key leads the batch: it waits
+    until the previous batch of that key was applied, then applies every delta
+    that joined in the meantime with a single `apply_batch(key, deltas)` call.
+    The other callers block until the leader published their result.
+
+    `apply_batch` returns one result per delta, in order; a result that is an
+    exception is raised in the thread that submitted the delta.
+    """
+
+    def __init__(self, stripes=64):
+        self._lock = threading.Lock()
+        self._pending = {}
+        # One batch per key is applied at a time; keys share striped locks
+        self._key_locks = [threading.Lock() for _ in range(stripes)]
+
+    def _key_lock(self, key):
+        return self._key_locks[zlib.crc32(str(key).encode()) % len(self._key_locks)]
+
+    def submit(self, key, delta, apply_batch):
+        """
+        Submit `delta` for `key` and wait for the result of its batch.
+
+        Args:
+            key: The key written by the batch (e.g. a product id).
+            delta: The change requested by this caller.
+            apply_batch (callable): Called by the leader with the key and the
+                deltas of the batch, returns a result per delta.
+
+        Returns:
+            The result of `delta`.
+        """
+        entry = _PendingDelta(delta)
+        with self._lock:
+            batch = self._pending.setdefault(key, [])
+            batch.append(entry)
+            leader = len(batch) == 1
+        if not leader:
+            entry.done.wait()
+        else:
+            with self._key_lock(key):
+                with self._lock:
+                    batch = self._pending.pop(key)
+                try:
+                    results = apply_batch(key, [pending.delta for pending in batch])
+                except Exception as err:  # pylint: disable=broad-except
+                    results = [err] * len(batch)
+                for pending, result in zip(batch, results):
+                    pending.result = result
+                    pending.done.set()
+        if isinstance(entry.result, Exception):
+            raise entry.result
+        return entry.result
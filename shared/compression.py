@@ -0,0 +1,329 @@
+"""
+Module for response compression.
+
+This module contains the `ResponseCompression` extension, which compresses
+response bodies with the best encoding the client accepts (zstd, brotli or
+gzip) in an after-request hook.
+
+- Bodies smaller than COMPRESSION_MIN_SIZE are sent as they are.
+- Streamed responses (NDJSON and JSON listings, server-sent events) are
+  compressed chunk by chunk while they are generated, flushing the compressor
+  every COMPRESSION_STREAM_FLUSH_SIZE bytes, or after every chunk for
+  server-sent events, so the client never waits on a half-full buffer.
+- Bodies of responses carrying an ETag are repeatable, so their compressed
+  bytes are cached: a hot listing is compressed once per catalog version and
+  encoding, not once per request.
+- A compressed representation has other bytes than the plain one, so a strong
+  ETag gets the encoding as a suffix ("product-1-v2-gzip"). The suffixes are
+  removed from the If-None-Match and If-Match headers of requests, so the views
+  compare the tags they produced.
+
+brotli and zstandard are optional dependencies: encodings whose module is not
+installed are not offered.
+"""
+
+import zlib
+from flask import current_app, request
+from werkzeug.datastructures import ETags
+from werkzeug.http import parse_etags
+from shared.cache import CacheStats, LocalCacheBackend
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+# Media types worth compressing
+COMPRESSIBLE_MIMETYPES = frozenset((
+    'application/json', 'application/x-ndjson', 'text/event-stream',
+    'text/html', 'text/plain', 'text/csv', 'application/javascript'
+))
+
+# Media types whose chunks are delivered to the client as soon as they are generated
+UNBUFFERED_MIMETYPES = frozenset(('text/event-stream',))
+
+# Request environ key of the If-None-Match header as sent, with the suffixes
+ORIGINAL_IF_NONE_MATCH = 'compression.if_none_match'
+
+class _GzipStream:
+    """Streaming gzip compressor."""
+
+    def __init__(self, level):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        """Compress `data`, returning the output ready so far."""
+        return self._compressor.compress(data)
+
+    def flush(self):
+        """Return the output of the data compressed so far, keeping the stream open."""
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        """Return the end of the compressed stream."""
+        return self._compressor.flush()
+
+class _BrotliStream:
+    """Streaming brotli compressor."""
+
+    def __init__(self, level):
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data):
+        """Compress `data`, returning the output ready so far."""
+        return self._compressor.process(data)
+
+    def flush(self):
+        """Return the output of the data compressed so far, keeping the stream open."""
+        return self._compressor.flush()
+
+    def finish(self):
+        """Return the end of the compressed stream."""
+        return self._compressor.finish()
+
+class _ZstdStream:
+    """Streaming zstd compressor."""
+
+    def __init__(self, level):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data):
+        """Compress `data`, returning the output ready so far."""
+        return self._compressor.compress(data)
+
+    def flush(self):
+        """Return the output of the data compressed so far, keeping the stream open."""
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self):
+        """Return the end of the compressed stream."""
+        return self._compressor.flush()
+
+def _compress_gzip(data, level):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+def _compress_brotli(data, level):
+    return brotli.compress(data, quality=level)
+
+def _compress_zstd(data, level):
+    return zstandard.ZstdCompressor(level=level).compress(data)
+
+# Content-Encoding -> (one-shot compressor, streaming compressor), when available
+ENCODINGS = {'gzip': (_compress_gzip, _GzipStream)}
+if brotli is not None:
+    ENCODINGS['br'] = (_compress_brotli, _BrotliStream)
+if zstandard is not None:
+    ENCODINGS['zstd'] = (_compress_zstd, _ZstdStream)
+
+def choose_encoding(accept_encodings, preferred):
+    """
+    Choose the response encoding.
+
+    Args:
+        accept_encodings (Accept): The parsed Accept-Encoding header.
+        preferred (Iterable[str]): Available encodings, most preferred first;
+            breaks ties between encodings the client accepts equally.
+
+    Returns:
+        str: The encoding, or None to send the body as it is.
+    """
+    best, best_quality = None, 0
+    for encoding in preferred:
+        quality = accept_encodings[encoding]
+        if encoding in ENCODINGS and quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+def _etag_suffix(encoding):
+    """Return the ETag suffix of the representations compressed with `encoding`."""
+    return f'-{encoding}'
+
+def _strip_suffix(etag):
+    """Return `etag` without the suffix of a compressed representation."""
+    for encoding in ENCODINGS:
+        if etag.endswith(_etag_suffix(encoding)):
+            return etag[:-len(_etag_suffix(encoding))]
+    return etag
+
+def _strip_suffixes(header):
+    """Return an If-Match or If-None-Match header without compressed representation suffixes."""
+    etags = parse_etags(header)
+    strong = etags.as_set()
+    weak = etags.as_set(include_weak=True) - strong
+    return ETags([_strip_suffix(etag) for etag in strong], [_strip_suffix(etag) for etag in weak],
+                 etags.star_tag).to_header()
+
+def _set_encoding(response, encoding):
+    """Mark `response` as compressed with `encoding`, suffixing its strong ETag."""
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag is not None and not weak:
+        response.set_etag(etag + _etag_suffix(encoding))
+
+def _compressed_stream(chunks, encoding, level, flush_size):
+    """
+    Compress an iterable of chunks, flushing at least every `flush_size` bytes.
+    """
+    compressor = ENCODINGS[encoding][1](level)
+    pending = 0
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            output = compressor.compress(chunk)
+            pending += len(chunk)
+            if pending >= flush_size:
+                output += compressor.flush()
+                pending = 0
+            if output:
+                yield output
+        yield compressor.finish()
+    finally:
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
+
+class _CompressionState:
+    """
+    Per-application state of the `ResponseCompression` extension.
+    """
+
+    def __init__(self, encodings, levels, min_size, flush_size, cache):
+        self.encodings = encodings
+        self.levels = levels
+        self.min_size = min_size
+        self.flush_size = flush_size
+        self.cache = cache
+        self.stats = CacheStats()
+
+class ResponseCompression:
+    """
+    Content-Encoding negotiation and compression of responses.
+
+    Configured with:
+        COMPRESSION_ENABLED: Turn compression on or off.
+        COMPRESSION_ENCODINGS: Encodings offered, most preferred first.
+        COMPRESSION_LEVELS: Compression level per encoding.
+        COMPRESSION_MIN_SIZE: Smallest body, in bytes, worth compressing.
+        COMPRESSION_STREAM_FLUSH_SIZE: Bytes of a streamed body between flushes.
+        COMPRESSION_CACHE_MAX_ENTRIES: Compressed bodies kept per process,
+            0 disables the cache.
+        COMPRESSION_CACHE_TTL: Seconds a compressed body stays cached.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """
+        Register the compression hook on `app`.
+        """
+        config = app.config
+        if not config.get('COMPRESSION_ENABLED', True):
+            return
+        encodings = [encoding for encoding in config.get('COMPRESSION_ENCODINGS', ('gzip',))
+                     if encoding in ENCODINGS]
+        max_entries = config.get('COMPRESSION_CACHE_MAX_ENTRIES', 256)
+        cache = (LocalCacheBackend(max_entries, config.get('COMPRESSION_CACHE_TTL', 300))
+                 if max_entries else None)
+        app.extensions['compression'] = _CompressionState(
+            encodings, config.get('COMPRESSION_LEVELS', {}),
+            config.get('COMPRESSION_MIN_SIZE', 500),
+            config.get('COMPRESSION_STREAM_FLUSH_SIZE', 16384), cache)
+        app.before_request(self._strip_etag_suffixes)
+        app.after_request(self._compress_response)
+
+    @staticmethod
+    def _strip_etag_suffixes():
+        """Let the views match the request's ETags against the ETags of plain responses."""
+        environ = request.environ
+        if environ.get('HTTP_IF_NONE_MATCH'):
+            environ[ORIGINAL_IF_NONE_MATCH] = environ['HTTP_IF_NONE_MATCH']
+            environ['HTTP_IF_NONE_MATCH'] = _strip_suffixes(environ['HTTP_IF_NONE_MATCH'])
+        if environ.get('HTTP_IF_MATCH'):
+            environ['HTTP_IF_MATCH'] = _strip_suffixes(environ['HTTP_IF_MATCH'])
+
+    @staticmethod
+    def _not_modified_etag(response):
+        """Send back the suffixed ETag of a 304 when the client holds the compressed representation."""
+        etag, weak = response.get_etag()
+        original = request.environ.get(ORIGINAL_IF_NONE_MATCH)
+        if etag is None or weak or original is None:
+            return
+        sent = parse_etags(original)
+        for encoding in ENCODINGS:
+            if sent.contains_weak(etag + _etag_suffix(encoding)):
+                response.set_etag(etag + _etag_suffix(encoding))
+                return
+
+    @staticmethod
+    def _compress_response(response):
+        if response.status_code == 304:
+            ResponseCompression._not_modified_etag(response)
+        elif response.mimetype not in COMPRESSIBLE_MIMETYPES:
+            return response
+        response.vary.add('Accept-Encoding')
+        if (response.status_code < 200 or response.status_code in (204, 206, 304)
+                or response.direct_passthrough or 'Content-Encoding' in response.headers
+                or response.cache_control.no_transform):
+            return response
+        state = current_app.extensions['compression']
+        encoding = choose_encoding(request.accept_encodings, state.encodings)
+        if encoding is None:
+            return response
+        level = state.levels.get(encoding, 6)
+
+        if response.is_streamed:
+            flush_size = 1 if response.mimetype in UNBUFFERED_MIMETYPES else state.flush_size
+            response.response = _compressed_stream(
+                response.response, encoding, level, flush_size)
+            response.headers.pop('Content-Length', None)
+            _set_encoding(response, encoding)
+            return response
+
+        body = response.get_data()
+        if len(body) < state.min_size:
+            return response
+        etag, _ = response.get_etag()
+        key = None
+        if etag is not None and state.cache is not None:
+            # The checksum guards against two bodies sharing an ETag
+            key = f'{encoding}:{etag}:{len(body)}:{zlib.crc32(body):08x}'
+            compressed = state.cache.get(key)
+            if compressed is not None:
+                state.stats.incr('hits')
+                response.set_data(compressed)
+                _set_encoding(response, encoding)
+                return response
+            state.stats.incr('misses')
+        compressed = ENCODINGS[encoding][0](body, level)
+        if len(compressed) >= len(body):
+            return response
+        if key is not None:
+            state.cache.set(key, compressed)
+        response.set_data(compressed)
+        _set_encoding(response, encoding)
+        return response
+
+    @staticmethod
+    def stats():
+        """
+        Return the offered encodings and the counters of the compressed body cache.
+        """
+        state = current_app.extensions.get('compression')
+        if state is None:
+            return {'encodings': []}
+        stats = state.stats.to_dict()
+        del stats['invalidations']
+        stats['encodings'] = state.encodings
+        return stats
+
+response_compression = ResponseCompression()
+"""The response compression of the application."""
@@ -0,0 +1,203 @@
+"""
+Module for tabular data formats.
+
+This module contains the encoders and decoders of the formats used to export
+and import rows (dictionaries with a fixed set of typed columns):
+
+- 'ndjson': one JSON object per line,
+- 'csv': a header line, then one line per row,
+- 'arrow': the Arrow IPC streaming format, one record batch per chunk,
+- 'parquet': Parquet, one row group per chunk.
+
+Encoders consume the rows lazily and yield one chunk of output per
+`chunk_size` rows; decoders read their input incrementally and yield rows,
+so neither end holds more than a chunk in memory. Parquet keeps its index at
+the end of the file, so a Parquet input is first spooled to a temporary file.
+
+pyarrow is an optional dependency: the 'arrow' and 'parquet' formats are only
+available when it is installed.
+"""
+
+import csv
+import io
+import json
+import tempfile
+from itertools import islice
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # pragma: no cover - optional dependency
+    pyarrow = None
+
+# Parquet input kept in memory before it is spooled to disk
+PARQUET_SPOOL_SIZE = 8 * 1024 * 1024
+
+def _chunks(rows, chunk_size):
+    """Yield lists of at most `chunk_size` rows."""
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+def _arrow_schema(columns):
+    types = {int: pyarrow.int64(), float: pyarrow.float64(), str: pyarrow.string()}
+    return pyarrow.schema([(name, types[kind]) for name, kind in columns])
+
+class _ChunkSink:
+    """Writable file object collecting the output of a pyarrow writer."""
+
+    closed = False
+
+    def __init__(self):
+        self._parts = []
+
+    def write(self, data):
+        """Collect `data`, returning the number of bytes written."""
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        """Do nothing: the bytes are kept until `take` is called."""
+
+    def take(self):
+        """Return and forget the bytes written since the last call."""
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+def _encode_ndjson(rows, columns, chunk_size, dumps):
+    for chunk in _chunks(rows, chunk_size):
+        yield ''.join(dumps(row) + '\n' for row in chunk)
+
+def _encode_csv(rows, columns, chunk_size, dumps):
+    names = [name for name, _ in columns]
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, names, extrasaction='ignore', lineterminator='\n')
+    writer.writeheader()
+    for chunk in _chunks(rows, chunk_size):
+        writer.writerows(chunk)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def _arrow_batches(rows, columns, chunk_size, schema):
+    for chunk in _chunks(rows, chunk_size):
+        yield pyarrow.RecordBatch.from_pylist(chunk, schema=schema)
+
+def _encode_arrow(rows, columns, chunk_size, dumps):
+    schema = _arrow_schema(columns)
+    sink = _ChunkSink()
+    with pyarrow.ipc.new_stream(sink, schema) as writer:
+        for batch in _arrow_batches(rows, columns, chunk_size, schema):
+            writer.write_batch(batch)
+            yield sink.take()
+    yield sink.take()
+
+def _encode_parquet(rows, columns, chunk_size, dumps):
+    schema = _arrow_schema(columns)
+    sink = _ChunkSink()
+    with pyarrow.parquet.ParquetWriter(sink, schema) as writer:
+        for batch in _arrow_batches(rows, columns, chunk_size, schema):
+            writer.write_table(pyarrow.Table.from_batches([batch]))
+            yield sink.take()
+    yield sink.take()
+
+def iter_ndjson(stream):
+    """
+    Lazily parse newline delimited JSON.
+
+    Lines that are not valid JSON are yielded as None so they are reported as
+    failed rows instead of aborting the whole input.
+    """
+    for line in stream:
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield None
+
+def _decode_ndjson(stream, columns, chunk_size):
+    return iter_ndjson(stream)
+
+def _decode_csv(stream, columns, chunk_size):
+    types = dict(columns)
+    reader = csv.DictReader(io.TextIOWrapper(stream, encoding='utf-8', newline=''))
+    try:
+        for row in reader:
+            try:
+                yield {name: types[name](value) if value != '' and name in types else None
+                       for name, value in row.items() if name is not None}
+            except ValueError:
+                yield None
+    except csv.Error as err:
+        raise ValueError(str(err)) from err
+
+def _decode_arrow(stream, columns, chunk_size):
+    for batch in pyarrow.ipc.open_stream(stream):
+        yield from batch.to_pylist()
+
+def _decode_parquet(stream, columns, chunk_size):
+    with tempfile.SpooledTemporaryFile(PARQUET_SPOOL_SIZE) as spool:
+        while True:
+            data = stream.read(1024 * 1024)
+            if not data:
+                break
+            spool.write(data)
+        spool.seek(0)
+        for batch in pyarrow.parquet.ParquetFile(spool).iter_batches(batch_size=chunk_size):
+            yield from batch.to_pylist()
+
+# Format name -> (media type, file extension, encoder, decoder), when available
+FORMATS = {
+    'ndjson': ('application/x-ndjson', 'ndjson', _encode_ndjson, _decode_ndjson),
+    'csv': ('text/csv', 'csv', _encode_csv, _decode_csv)
+}
+if pyarrow is not None:
+    FORMATS['arrow'] = ('application/vnd.apache.arrow.stream', 'arrow',
+                        _encode_arrow, _decode_arrow)
+    FORMATS['parquet'] = ('application/vnd.apache.parquet', 'parquet',
+                          _encode_parquet, _decode_parquet)
+
+def format_for_mimetype(mimetype):
+    """
+    Return the name of the format of `mimetype`, or None if there is none.
+    """
+    for name, (format_mimetype, *_) in FORMATS.items():
+        if format_mimetype == mimetype:
+            return name
+    return None
+
+def encode_rows(name, rows, columns, chunk_size=1000, dumps=json.dumps):
+    """
+    Encode rows in the format `name`.
+
+    Args:
+        name (str): One of `FORMATS`.
+        rows (Iterable[dict]): The rows, consumed lazily.
+        columns (Sequence[tuple]): (name, type) of every column, type being
+            int, float or str.
+        chunk_size (int): Rows per chunk of output.
+        dumps (callable): Serializes a row to JSON, for 'ndjson'.
+
+    Returns:
+        Iterator: Chunks of output, str for text formats and bytes otherwise.
+    """
+    return FORMATS[name][2](rows, columns, chunk_size, dumps)
+
+def decode_rows(name, stream, columns, chunk_size=1000):
+    """
+    Decode the rows of a binary stream in the format `name`.
+
+    Rows that cannot be decoded are yielded as None, so they can be reported
+    without aborting the rest of the input.
+
+    Returns:
+        Iterator[dict]: The rows, read lazily from `stream`.
+    """
+    return FORMATS[name][3](stream, columns, chunk_size)
@@ -0,0 +1,169 @@
+"""
+Module for idempotent requests.
+
+This module contains the `idempotent` view decorator and the `IdempotencyStore`
+extension holding its results. A client retrying a write sends the same
+`Idempotency-Key` header with every attempt:
+
+- the first request claims the key, runs, and its response is stored for
+  IDEMPOTENCY_TTL seconds,
+- a repeat of a finished request gets the stored response back, marked with
+  an `Idempotent-Replayed` header, without running again,
+- a repeat arriving while the first request still runs waits for its
+  response (up to IDEMPOTENCY_WAIT seconds, then 409),
+- a request reusing a key with a different method, path or body gets 422.
+
+Responses with a 5xx status are not stored, so the request can be retried.
+Results are kept in a `LocalCacheBackend` (per process) or a
+`RedisCacheBackend` (shared by every worker process).
+"""
+
+import functools
+import hashlib
+import time
+from flask import current_app, jsonify, make_response, request
+from shared.cache import LocalCacheBackend, RedisCacheBackend
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+
+# Longest Idempotency-Key accepted
+MAX_KEY_LENGTH = 255
+
+# Headers of a stored response sent again with the replayed response
+REPLAYED_HEADERS = ('Content-Type', 'ETag', 'Location')
+
+def _fingerprint():
+    """Return a digest of the method, path, query string and body of the request."""
+    digest = hashlib.sha256()
+    for part in (request.method, request.path, request.query_string.decode()):
+        digest.update(part.encode())
+        digest.update(b'\0')
+    digest.update(request.get_data(cache=True))
+    return digest.hexdigest()
+
+def _error(message, status):
+    response = jsonify({'error': message})
+    response.status_code = status
+    return response
+
+def _replay(record):
+    response = current_app.response_class(record['body'], status=record['status'])
+    for name, value in record['headers']:
+        response.headers[name] = value
+    response.headers[REPLAYED_HEADER] = 'true'
+    return response
+
+class _IdempotencyState:
+    """
+    Per-application state of the `IdempotencyStore` extension.
+    """
+
+    def __init__(self, backend, ttl, lock_ttl, wait, poll_interval):
+        self.backend = backend
+        self.ttl = ttl
+        self.lock_ttl = lock_ttl
+        self.wait = wait
+        self.poll_interval = poll_interval
+
+class IdempotencyStore:
+    """
+    Store of the responses of idempotent requests.
+
+    Configured with:
+        IDEMPOTENCY_ENABLED: Turn Idempotency-Key handling on or off.
+        IDEMPOTENCY_BACKEND: 'local' (per process) or 'redis' (shared).
+        IDEMPOTENCY_TTL: Seconds a response is kept for repeats.
+        IDEMPOTENCY_LOCK_TTL: Seconds a key stays claimed by a request that
+            did not finish (e.g. its worker was killed).
+        IDEMPOTENCY_WAIT: Seconds a repeat waits for the first request.
+        IDEMPOTENCY_POLL_INTERVAL: Seconds between two checks while waiting.
+        IDEMPOTENCY_MAX_ENTRIES: Size of the 'local' store.
+        CACHE_REDIS_URL: URL of the Redis server for the 'redis' backend.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app, backend=None):
+        """
+        Register the store on `app`, optionally with an explicit backend.
+        """
+        config = app.config
+        if not config.get('IDEMPOTENCY_ENABLED', True):
+            return
+        ttl = config.get('IDEMPOTENCY_TTL', 86400)
+        if backend is None:
+            kind = config.get('IDEMPOTENCY_BACKEND', 'local')
+            if kind == 'local':
+                backend = LocalCacheBackend(config.get('IDEMPOTENCY_MAX_ENTRIES', 10000), ttl)
+            elif kind == 'redis':
+                backend = RedisCacheBackend.from_url(
+                    config['CACHE_REDIS_URL'], prefix='idempotency:', default_ttl=ttl)
+            else:
+                raise ValueError(f'Unknown IDEMPOTENCY_BACKEND: {kind}')
+        app.extensions['idempotency'] = _IdempotencyState(
+            backend, ttl, config.get('IDEMPOTENCY_LOCK_TTL', 60),
+            config.get('IDEMPOTENCY_WAIT', 10), config.get('IDEMPOTENCY_POLL_INTERVAL', 0.05))
+
+def _run_once(state, key, fingerprint, view, args, kwargs):
+    """
+    Run the view for a claimed key and store its response.
+    """
+    try:
+        response = make_response(view(*args, **kwargs))
+    except Exception:
+        state.backend.delete(key)
+        raise
+    if response.status_code >= 500 or response.is_streamed:
+        state.backend.delete(key)
+        return response
+    state.backend.set(key, {
+        'fingerprint': fingerprint,
+        'status': response.status_code,
+        'headers': [(name, response.headers[name])
+                    for name in REPLAYED_HEADERS if name in response.headers],
+        'body': response.get_data(as_text=True)
+    }, ttl=state.ttl)
+    return response
+
+def idempotent(view):
+    """
+    Make a write view idempotent for requests sending an Idempotency-Key.
+
+    Requests without the header, or while the store is disabled, run as usual.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        state = current_app.extensions.get('idempotency')
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if state is None or key is None:
+            return view(*args, **kwargs)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return _error(f'{IDEMPOTENCY_HEADER} must be 1 to {MAX_KEY_LENGTH} characters', 400)
+
+        fingerprint = _fingerprint()
+        deadline = time.monotonic() + state.wait
+        while True:
+            if state.backend.add(key, {'fingerprint': fingerprint, 'status': None},
+                                 ttl=state.lock_ttl):
+                return _run_once(state, key, fingerprint, view, args, kwargs)
+            record = state.backend.get(key)
+            if record is None:
+                # The first request failed or expired, claim the key again
+                continue
+            if record['fingerprint'] != fingerprint:
+                return _error(f'{IDEMPOTENCY_HEADER} was used with a different request', 422)
+            if record['status'] is not None:
+                return _replay(record)
+            if time.monotonic() >= deadline:
+                response = _error(f'A request with this {IDEMPOTENCY_HEADER} is in progress', 409)
+                response.headers['Retry-After'] = '1'
+                return response
+            time.sleep(state.poll_interval)
+
+    return wrapper
+
+idempotency_store = IdempotencyStore()
+"""The store of the responses of idempotent requests."""
@@ -0,0 +1,117 @@
+"""
+Module for request instrumentation.
+
+This module contains the `RequestInstrumentation` extension, which measures
+the wall time of every request together with the number of SQL statements it
+executed and the time spent in the database, using SQLAlchemy engine events.
+
+The measurements are:
+- logged as structured fields when the request completes,
+- returned to the client in a `Server-Timing` header,
+- used for an optional slow-query log and a warning on requests that execute
+  an unusual number of statements (typically an N+1 query pattern).
+"""
+
+import time
+from flask import current_app, g, has_app_context, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from shared.logging_utils import get_logger
+
+# Get an instance of a logger
+logger = get_logger(__name__)
+
+# Longest statement excerpt written to the slow-query log
+MAX_STATEMENT_LENGTH = 500
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the execution context, which is discarded with a failed statement
+    context._query_start_time = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - context._query_start_time
+    if has_request_context() and 'request_start_time' in g:
+        g.db_queries += 1
+        g.db_time += duration
+    if not has_app_context():
+        return
+    threshold = current_app.config.get('SLOW_QUERY_THRESHOLD_MS')
+    if threshold is not None and duration * 1000 >= threshold:
+        logger.warning(
+            'slow query duration_ms=%.2f statement="%s"',
+            duration * 1000, ' '.join(statement.split())[:MAX_STATEMENT_LENGTH],
+            extra={'duration_ms': round(duration * 1000, 3), 'statement': statement}
+        )
+
+class RequestInstrumentation:
+    """
+    Per-request timing and SQL statement instrumentation.
+
+    Configured with:
+        REQUEST_TIMING_ENABLED: Turn the instrumentation on or off.
+        SERVER_TIMING_HEADER: Add a `Server-Timing` header to responses.
+        SLOW_QUERY_THRESHOLD_MS: Log statements slower than this (None disables).
+        REQUEST_QUERY_WARN_THRESHOLD: Warn about requests executing more statements.
+    """
+
+    _listening = False
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """
+        Register the request hooks on `app`.
+        """
+        if not app.config.get('REQUEST_TIMING_ENABLED', True):
+            return
+        if not RequestInstrumentation._listening:
+            # Listen on the Engine class, so every engine (and replica) is covered
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+            RequestInstrumentation._listening = True
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+
+    @staticmethod
+    def _start_request():
+        g.request_start_time = time.perf_counter()
+        g.db_queries = 0
+        g.db_time = 0.0
+
+    @staticmethod
+    def _finish_request(response):
+        if 'request_start_time' not in g:
+            return response
+        duration_ms = (time.perf_counter() - g.request_start_time) * 1000
+        db_time_ms = g.db_time * 1000
+        fields = {
+            'http_method': request.method,
+            'http_path': request.path,
+            'http_status': response.status_code,
+            'endpoint': request.endpoint,
+            'duration_ms': round(duration_ms, 3),
+            'db_queries': g.db_queries,
+            'db_time_ms': round(db_time_ms, 3)
+        }
+        logger.info(
+            'request completed method=%s path=%s status=%s duration_ms=%.2f '
+            'db_queries=%d db_time_ms=%.2f',
+            request.method, request.path, response.status_code, duration_ms,
+            g.db_queries, db_time_ms, extra=fields
+        )
+        warn_threshold = current_app.config.get('REQUEST_QUERY_WARN_THRESHOLD')
+        if warn_threshold is not None and g.db_queries > warn_threshold:
+            logger.warning('request executed %d SQL statements endpoint=%s',
+                           g.db_queries, request.endpoint, extra=fields)
+        if current_app.config.get('SERVER_TIMING_HEADER', True):
+            response.headers.add(
+                'Server-Timing',
+                f'app;dur={duration_ms:.2f}, '
+                f'db;dur={db_time_ms:.2f};desc="{g.db_queries} queries"'
+            )
+        return response
+
+request_instrumentation = RequestInstrumentation()
+"""The per-request timing and SQL instrumentation."""
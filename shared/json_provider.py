@@ -0,0 +1,80 @@
+"""
+Module for JSON serialization.
+
+This module contains `OrjsonProvider`, a Flask JSON provider backed by orjson,
+and `configure_json`, which installs the provider selected by the
+JSON_PROVIDER setting on an application.
+
+orjson is an optional dependency: when it is not installed, or JSON_PROVIDER
+is 'default', the application keeps Flask's stdlib based provider.
+"""
+
+from flask.json.provider import DefaultJSONProvider, _default
+from shared.logging_utils import get_logger
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+# Get an instance of a logger
+logger = get_logger(__name__)
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    JSON provider serializing with orjson.
+
+    Output is equivalent to the default provider (sorted keys unless
+    `sort_keys` is turned off, indentation for pretty responses, the same
+    fallback for dates, decimals and dataclasses) except that non-ASCII
+    characters are written as UTF-8 instead of being escaped.
+
+    Calls passing stdlib specific keyword arguments (`cls`, `indent`, ...)
+    are delegated to the default provider.
+    """
+
+    def _options(self, indent=False):
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=_default, option=self._options()).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        pretty = self.compact is False or (self.compact is None and self._app.debug)
+        body = orjson.dumps(obj, default=_default, option=self._options(indent=pretty))
+        return self._app.response_class(body + b'\n', mimetype=self.mimetype)
+
+JSON_PROVIDERS = {
+    'default': DefaultJSONProvider,
+    'orjson': OrjsonProvider
+}
+
+def configure_json(app):
+    """
+    Install the JSON provider named by JSON_PROVIDER on `app`.
+
+    Falls back to the default provider when orjson is not installed.
+
+    Raises:
+        ValueError: If JSON_PROVIDER names an unknown provider.
+    """
+    name = app.config.get('JSON_PROVIDER', 'orjson')
+    if name not in JSON_PROVIDERS:
+        raise ValueError(f'Unknown JSON_PROVIDER: {name}')
+    if name == 'orjson' and orjson is None:
+        logger.warning('JSON_PROVIDER is orjson but orjson is not installed, using the default')
+        name = 'default'
+    app.json = JSON_PROVIDERS[name](app)
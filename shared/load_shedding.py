@@ -0,0 +1,150 @@
+"""
+Module for load shedding.
+
+This module contains the `LoadShedder` extension, which rejects requests with
+503 and a `Retry-After` header while the worker process is overloaded,
+instead of queueing them until the database pool times out. The process is
+overloaded when:
+
+- more than LOAD_SHED_MAX_IN_FLIGHT requests are being handled, or
+- checking a connection out of the database pool recently took more than
+  LOAD_SHED_MAX_POOL_WAIT_MS on average.
+
+The same signal makes the readiness probe fail, so the orchestrator stops
+routing traffic to the overloaded instance until it recovers.
+"""
+
+import threading
+from flask import current_app, g, jsonify, request
+from database.db import db
+from shared.logging_utils import get_logger
+
+# Get an instance of a logger
+logger = get_logger(__name__)
+
+class _LoadSheddingState:
+    """
+    Per-application state of the `LoadShedder` extension.
+    """
+
+    def __init__(self, max_in_flight, max_pool_wait_ms, retry_after, blueprints):
+        self.max_in_flight = max_in_flight
+        self.max_pool_wait_ms = max_pool_wait_ms
+        self.retry_after = retry_after
+        self.blueprints = blueprints
+        self.in_flight = 0
+        self.shed = 0
+        self._lock = threading.Lock()
+
+    def enter(self):
+        """
+        Count a request starting, returning the requests now in flight.
+        """
+        with self._lock:
+            self.in_flight += 1
+            return self.in_flight
+
+    def leave(self, shed=False):
+        """
+        Count a request finishing, and whether it was shed.
+        """
+        with self._lock:
+            self.in_flight -= 1
+            self.shed += shed
+
+class LoadShedder:
+    """
+    Adaptive load shedding of the requests of a worker process.
+
+    Configured with:
+        LOAD_SHEDDING_ENABLED: Turn load shedding on or off.
+        LOAD_SHED_MAX_IN_FLIGHT: Requests handled at once before shedding
+            (None disables the check).
+        LOAD_SHED_MAX_POOL_WAIT_MS: Recent average pool checkout time before
+            shedding (None disables the check).
+        LOAD_SHED_RETRY_AFTER: Seconds clients are asked to wait.
+        LOAD_SHED_BLUEPRINTS: Blueprints whose requests can be shed.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """
+        Register the load shedding hooks on `app`.
+        """
+        config = app.config
+        if not config.get('LOAD_SHEDDING_ENABLED', True):
+            return
+        app.extensions['load_shedding'] = _LoadSheddingState(
+            config.get('LOAD_SHED_MAX_IN_FLIGHT'), config.get('LOAD_SHED_MAX_POOL_WAIT_MS'),
+            config.get('LOAD_SHED_RETRY_AFTER', 1),
+            frozenset(config.get('LOAD_SHED_BLUEPRINTS', ('product_blueprint',))))
+        app.before_request(self._start_request)
+        app.teardown_request(self._teardown_request)
+
+    @staticmethod
+    def _pool_wait_ms():
+        metrics = getattr(db.engine.pool, 'metrics', None)
+        return 1000 * metrics.recent_checkout_time() if metrics is not None else 0.0
+
+    def _overload_reason(self, state, in_flight):
+        if state.max_in_flight is not None and in_flight > state.max_in_flight:
+            return f'{in_flight} requests in flight (max {state.max_in_flight})'
+        if state.max_pool_wait_ms is not None:
+            pool_wait_ms = self._pool_wait_ms()
+            if pool_wait_ms > state.max_pool_wait_ms:
+                return (f'database pool checkouts take {pool_wait_ms:.0f} ms '
+                        f'(max {state.max_pool_wait_ms} ms)')
+        return None
+
+    def overload_reason(self):
+        """
+        Return why the current worker process is overloaded, or None if it is not.
+        """
+        state = current_app.extensions.get('load_shedding')
+        if state is None:
+            return None
+        # As seen by a request arriving now
+        return self._overload_reason(state, state.in_flight + 1)
+
+    def _start_request(self):
+        state = current_app.extensions['load_shedding']
+        if request.blueprint not in state.blueprints:
+            return None
+        g.load_shedding_shed = False
+        reason = self._overload_reason(state, state.enter())
+        if reason is None:
+            return None
+        g.load_shedding_shed = True
+        logger.warning('shedding request %s %s: %s', request.method, request.path, reason)
+        response = jsonify({'error': 'Service overloaded, retry later'})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(state.retry_after)
+        return response
+
+    @staticmethod
+    def _teardown_request(exception=None):
+        shed = g.pop('load_shedding_shed', None)
+        if shed is not None:
+            current_app.extensions['load_shedding'].leave(shed)
+
+    @staticmethod
+    def stats():
+        """
+        Return the thresholds, the requests in flight and the requests shed.
+        """
+        state = current_app.extensions.get('load_shedding')
+        if state is None:
+            return {'enabled': False}
+        return {
+            'enabled': True,
+            'in_flight': state.in_flight,
+            'shed': state.shed,
+            'max_in_flight': state.max_in_flight,
+            'max_pool_wait_ms': state.max_pool_wait_ms
+        }
+
+load_shedder = LoadShedder()
+"""The load shedding of the application."""
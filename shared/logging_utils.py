@@ -3,29 +3,233 @@ Module for logging utilities.
 
 This module contains functions for setting up and configuring loggers,
 facilitating consistent logging practices across the application.
+
+Loggers are configured from environment variables, read when the first
+logger is created:
+
+- LOG_LEVEL: DEBUG, INFO (default), WARNING, ...
+- LOG_FORMAT: 'text' (default), 'json' or 'logfmt'. The structured formats
+  write the `extra` fields of a record as fields of their own.
+- LOG_MODE: 'sync' (default) writes records to stdout in the logging thread;
+  'queue' hands them to a bounded queue drained by a background thread, so
+  formatting and writing never block a request. When the queue is full
+  (LOG_QUEUE_SIZE records) new records are dropped and counted.
+- LOG_SAMPLE_RATES: Fraction of the records kept per level, e.g.
+  'DEBUG=0.01,INFO=0.1', for the requests of LOG_SAMPLED_ENDPOINTS (every
+  request when unset). Levels without a rate are always kept.
 """
 
+import atexit
+import datetime
+import json
 import logging
 import os
+import queue
+import random
 import sys
+import threading
+from logging.handlers import QueueHandler, QueueListener
+from flask import has_request_context, request
 
-def get_logger(name):
+# Attributes of every LogRecord, the other ones were passed with `extra`
+_RECORD_ATTRIBUTES = frozenset(
+    logging.LogRecord('', logging.INFO, '', 0, '', None, None).__dict__) | {'message', 'asctime'}
+
+class LoggingStats:
     """
-    Create a configured logger.
+    Counters of the records that were not written.
+    """
+
+    def __init__(self):
+        self.dropped = 0
+        self.sampled_out = 0
+        self._lock = threading.Lock()
+
+    def incr(self, counter):
+        """
+        Increment the counter named `counter`.
+        """
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def to_dict(self):
+        """
+        Return the counters.
+        """
+        return {'dropped': self.dropped, 'sampled_out': self.sampled_out}
+
+stats = LoggingStats()
+"""Counters of the records dropped by the queue or by sampling."""
+
+def _extra_fields(record):
+    """Return the fields passed to a log call with `extra`."""
+    return {key: value for key, value in record.__dict__.items()
+            if key not in _RECORD_ATTRIBUTES and not key.startswith('_')}
+
+def _timestamp(record):
+    """Return the time of a record in ISO 8601, UTC."""
+    created = datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc)
+    return created.isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+
+class JSONFormatter(logging.Formatter):
+    """
+    Format records as one JSON object per line.
 
     Args:
-        name (str): Name of the logger.
-        level: Logging level, e.g., logging.INFO, logging.DEBUG.
+        verbose (bool): Add the source location, process and thread.
+    """
 
-    Returns:
-        logging.Logger: Configured logger instance.
+    def __init__(self, verbose=False):
+        super().__init__()
+        self.verbose = verbose
+
+    def _fields(self, record):
+        fields = {
+            'time': _timestamp(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage()
+        }
+        if self.verbose:
+            fields.update({
+                'file': f'{record.pathname}:{record.lineno}',
+                'method': record.funcName,
+                'proc_id': record.process,
+                'thread_id': record.thread
+            })
+        fields.update(_extra_fields(record))
+        if record.exc_info:
+            fields['exc_info'] = self.formatException(record.exc_info)
+        return fields
+
+    def format(self, record):
+        return json.dumps(self._fields(record), default=str)
+
+class LogfmtFormatter(JSONFormatter):
+    """
+    Format records as logfmt `key=value` pairs, one record per line.
     """
-    # Read log level from environment variable or default to INFO
-    log_level_name = os.getenv('LOG_LEVEL', 'INFO').upper()
-    level = getattr(logging, log_level_name, logging.INFO)
 
-    logger = logging.getLogger(name)
-    logger.setLevel(level)
+    @staticmethod
+    def _value(value):
+        value = value if isinstance(value, str) else json.dumps(value, default=str)
+        if value == '' or any(char in value for char in ' ="\n'):
+            return json.dumps(value)
+        return value
+
+    def format(self, record):
+        return ' '.join(f'{key}={self._value(value)}'
+                        for key, value in self._fields(record).items())
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep a fraction of the records of each level.
+
+    Args:
+        rates (dict): Fraction of the records kept, keyed by level number.
+        endpoints (Iterable[str]): Only sample the records of requests to
+            these endpoints; every record is sampled when empty.
+    """
+
+    def __init__(self, rates, endpoints=()):
+        super().__init__()
+        self.rates = rates
+        self.endpoints = frozenset(endpoints)
+
+    def filter(self, record):
+        rate = self.rates.get(record.levelno)
+        if rate is None:
+            return True
+        if self.endpoints and not (has_request_context() and request.endpoint in self.endpoints):
+            return True
+        if random.random() < rate:
+            return True
+        stats.incr('sampled_out')
+        return False
+
+class BoundedQueueHandler(QueueHandler):
+    """
+    Queue handler dropping records instead of blocking when its queue is full.
+
+    The message is merged with its arguments in the logging thread; the
+    formatting of the record happens in the listener thread.
+    """
+
+    def prepare(self, record):
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            stats.incr('dropped')
+
+class _Listener(QueueListener):
+    """Queue listener whose stop waits for room in a full queue."""
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+class _Pipeline:
+    """
+    The handler shared by every logger, and the queue listener in 'queue' mode.
+    """
+
+    def __init__(self, output, mode, queue_size, sampling):
+        self.output = output
+        self.queue_size = queue_size
+        self.listener = None
+        if mode == 'queue':
+            self.handler = BoundedQueueHandler(queue.Queue(queue_size))
+            self.start()
+            atexit.register(self.stop)
+            # The listener thread does not survive a fork (e.g. gunicorn workers)
+            os.register_at_fork(after_in_child=self._restart)
+        else:
+            self.handler = output
+        if sampling is not None:
+            self.handler.addFilter(sampling)
+
+    def start(self):
+        """
+        Start draining the queue in a background thread.
+        """
+        self.listener = _Listener(self.handler.queue, self.output, respect_handler_level=True)
+        self.listener.start()
+
+    def stop(self):
+        """
+        Write the queued records and stop the background thread.
+        """
+        if self.listener is not None and self.listener._thread is not None:
+            self.listener.stop()
+
+    def _restart(self):
+        # The queue may hold records of the parent, or a lock held at fork
+        self.handler.queue = queue.Queue(self.queue_size)
+        self.start()
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+def _parse_rates(value):
+    """Parse LOG_SAMPLE_RATES ('DEBUG=0.01,INFO=0.1') into rates per level number."""
+    rates = {}
+    for item in (value or '').split(','):
+        if '=' in item:
+            level, rate = item.split('=', 1)
+            rates[logging.getLevelName(level.strip().upper())] = float(rate)
+    return rates
+
+def _formatter(log_format, level):
+    """Return the formatter of LOG_FORMAT, more detailed at DEBUG level."""
+    verbose = level <= logging.DEBUG
+    if log_format == 'json':
+        return JSONFormatter(verbose)
+    if log_format == 'logfmt':
+        return LogfmtFormatter(verbose)
 
     # Define different Formatter formats based on verbosity required
     verbose_format = (
@@ -35,24 +239,46 @@ def get_logger(name):
     )
     default_format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
     # simple_format = '%(levelname)s - %(message)s'
+    return logging.Formatter(verbose_format if verbose else default_format)
+
+def _get_pipeline(level):
+    """Create the shared logging pipeline from the environment on first use."""
+    global _pipeline  # pylint: disable=global-statement
+    with _pipeline_lock:
+        if _pipeline is None:
+            # Create console handler and set level
+            console_handler = logging.StreamHandler(sys.stdout)
+            console_handler.setLevel(level)
+            console_handler.setFormatter(_formatter(os.getenv('LOG_FORMAT', 'text').lower(), level))
 
-    # Select formatter based on the log level
-    if level <= logging.DEBUG:
-        # Create the more detailed formatter for DEBUG level
-        formatter = logging.Formatter(verbose_format)
-    else:
-        # Create the simpler formatter for higher levels like INFO
-        formatter = logging.Formatter(default_format)
+            rates = _parse_rates(os.getenv('LOG_SAMPLE_RATES'))
+            endpoints = [endpoint.strip() for endpoint in
+                         os.getenv('LOG_SAMPLED_ENDPOINTS', '').split(',') if endpoint.strip()]
+            _pipeline = _Pipeline(
+                console_handler, os.getenv('LOG_MODE', 'sync').lower(),
+                int(os.getenv('LOG_QUEUE_SIZE') or 10000),
+                SamplingFilter(rates, endpoints) if rates else None)
+        return _pipeline
 
-    # Create console handler and set level
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setLevel(level)
+def get_logger(name):
+    """
+    Create a configured logger.
 
-    # Add formatter to console_handler
-    console_handler.setFormatter(formatter)
+    Args:
+        name (str): Name of the logger.
+
+    Returns:
+        logging.Logger: Configured logger instance.
+    """
+    # Read log level from environment variable or default to INFO
+    log_level_name = os.getenv('LOG_LEVEL', 'INFO').upper()
+    level = getattr(logging, log_level_name, logging.INFO)
+
+    logger = logging.getLogger(name)
+    logger.setLevel(level)
 
-    # Add console_handler to logger
+    # Add the shared handler to logger
     if not logger.handlers:
-        logger.addHandler(console_handler)
+        logger.addHandler(_get_pipeline(level).handler)
 
     return logger
@@ -0,0 +1,188 @@
+"""
+Module for Prometheus metrics.
+
+This module contains the `Metrics` extension, which records request counts,
+latency histograms and in-flight requests per blueprint endpoint, and exports
+database pool usage, product cache counters, the product reads saved by
+request coalescing and the log records dropped or sampled out.
+
+When the PROMETHEUS_MULTIPROC_DIR environment variable is set (it must be set
+before the workers start, see gunicorn.conf.py) every worker process writes
+its samples to that directory and `/metrics` aggregates all of them.
+"""
+
+import os
+import threading
+import time
+from flask import g, request
+from database.db import db
+from database.pool import pool_status
+from shared.cache import product_cache
+from shared import logging_utils
+from shared.logging_utils import get_logger
+from shared.singleflight import product_reads
+
+try:
+    from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry,
+                                   Counter, Gauge, Histogram, generate_latest, multiprocess)
+except ImportError:  # pragma: no cover - optional dependency
+    generate_latest = None
+
+# Get an instance of a logger
+logger = get_logger(__name__)
+
+# Endpoint label of requests that did not match any route
+UNMATCHED_ENDPOINT = 'unmatched'
+
+class Metrics:
+    """
+    Prometheus request, pool and cache metrics.
+
+    Configured with:
+        METRICS_ENABLED: Turn the metrics on or off.
+        METRICS_SYNC_INTERVAL: Seconds between two exports of the pool and
+            cache statistics from the request path.
+
+    Labelled children are created once and kept in nested dictionaries keyed
+    by endpoint, method and status, so recording a request is a few dict
+    lookups plus the (lock-protected) increments of prometheus_client.
+    """
+
+    def __init__(self, app=None):
+        self.available = generate_latest is not None
+        self._children = {}
+        self._sync_lock = threading.Lock()
+        self._last_sync = 0.0
+        self._sync_interval = 1.0
+        self._exported = {}
+        if self.available:
+            self.requests = Counter(
+                'http_requests_total', 'HTTP requests handled',
+                ['endpoint', 'method', 'status'])
+            self.latency = Histogram(
+                'http_request_duration_seconds', 'HTTP request latency',
+                ['endpoint', 'method'])
+            self.in_progress = Gauge(
+                'http_requests_in_progress', 'HTTP requests being handled',
+                multiprocess_mode='livesum')
+            self.pool_checked_out = Gauge(
+                'db_pool_checked_out_connections', 'Connections checked out of the pool',
+                multiprocess_mode='livesum')
+            self.pool_overflow = Gauge(
+                'db_pool_overflow_connections', 'Overflow connections in use',
+                multiprocess_mode='livesum')
+            self.pool_checkouts = Counter(
+                'db_pool_checkouts_total', 'Connection checkouts')
+            self.pool_waits = Counter(
+                'db_pool_checkout_waits_total', 'Checkouts that waited for a free connection')
+            self.cache_hits = Counter(
+                'product_cache_hits_total', 'Product cache hits')
+            self.cache_misses = Counter(
+                'product_cache_misses_total', 'Product cache misses')
+            self.logs_dropped = Counter(
+                'log_records_dropped_total', 'Log records dropped by a full logging queue')
+            self.logs_sampled_out = Counter(
+                'log_records_sampled_out_total', 'Log records discarded by sampling')
+            self.reads_shared = Counter(
+                'product_reads_shared_total',
+                'Product reads served by a concurrent identical query', ['method'])
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """
+        Register the request hooks on `app`.
+        """
+        if not app.config.get('METRICS_ENABLED', True):
+            return
+        if not self.available:
+            logger.warning('METRICS_ENABLED but prometheus_client is not installed')
+            return
+        self._sync_interval = app.config.get('METRICS_SYNC_INTERVAL', 1.0)
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        app.teardown_request(self._teardown_request)
+
+    def _start_request(self):
+        g.metrics_start_time = time.perf_counter()
+        self.in_progress.inc()
+
+    def _finish_request(self, response):
+        start = g.get('metrics_start_time')
+        if start is None:
+            return response
+        endpoint = request.endpoint or UNMATCHED_ENDPOINT
+        by_method = self._children.get(endpoint)
+        if by_method is None:
+            by_method = self._children.setdefault(endpoint, {})
+        children = by_method.get(request.method)
+        if children is None:
+            children = by_method.setdefault(
+                request.method, (self.latency.labels(endpoint, request.method), {}))
+        histogram, counters = children
+        counter = counters.get(response.status_code)
+        if counter is None:
+            counter = counters.setdefault(
+                response.status_code,
+                self.requests.labels(endpoint, request.method, str(response.status_code)))
+        histogram.observe(time.perf_counter() - start)
+        counter.inc()
+        if start - self._last_sync >= self._sync_interval:
+            self.sync()
+        return response
+
+    def _teardown_request(self, exception=None):
+        if g.pop('metrics_start_time', None) is not None:
+            self.in_progress.dec()
+
+    def sync(self):
+        """
+        Export the current pool, cache and shared read statistics of this process.
+
+        Cumulative statistics are exported as counter increments since the
+        last sync, so they aggregate correctly across worker processes.
+        """
+        if not self._sync_lock.acquire(blocking=False):
+            return
+        try:
+            self._last_sync = time.perf_counter()
+            pool = pool_status(db.engine)
+            self.pool_checked_out.set(pool.get('checked_out', 0))
+            self.pool_overflow.set(pool.get('overflow', 0))
+            cache = product_cache.stats()
+            logs = logging_utils.stats.to_dict()
+            for counter, key, value in (
+                    (self.pool_checkouts, 'checkouts', pool.get('checkouts', 0)),
+                    (self.pool_waits, 'waits', pool.get('waits', 0)),
+                    (self.cache_hits, 'hits', cache['hits']),
+                    (self.cache_misses, 'misses', cache['misses']),
+                    (self.logs_dropped, 'logs_dropped', logs['dropped']),
+                    (self.logs_sampled_out, 'logs_sampled_out', logs['sampled_out'])):
+                delta = value - self._exported.get(key, 0)
+                if delta > 0:
+                    counter.inc(delta)
+                # A recreated pool or cache restarts from zero
+                self._exported[key] = value
+            for method, counters in product_reads.stats().items():
+                key = f'reads_shared:{method}'
+                delta = counters['shared'] - self._exported.get(key, 0)
+                if delta > 0:
+                    self.reads_shared.labels(method).inc(delta)
+                self._exported[key] = counters['shared']
+        finally:
+            self._sync_lock.release()
+
+    def render(self):
+        """
+        Return the exposition of every metric and its content type.
+        """
+        self.sync()
+        if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        else:
+            registry = REGISTRY
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+
+metrics = Metrics()
+"""The Prometheus metrics of the application."""
@@ -0,0 +1,73 @@
+"""
+Module for query parameters.
+
+This module contains the readers of the optional query parameters shared by
+the sync and async product views. They take the request's `args`, so they
+work with Flask and Quart requests alike, and raise `ValueError` with a
+message for the client when a parameter is invalid.
+"""
+
+from models.product import product_columns
+
+def int_arg(args, name, minimum=None):
+    """
+    Read an optional integer query parameter.
+
+    Raises:
+        ValueError: If the parameter is not an integer or below `minimum`.
+    """
+    value = args.get(name)
+    if value is None or value == '':
+        return None
+    try:
+        value = int(value)
+    except ValueError as err:
+        raise ValueError(f'{name} must be an integer') from err
+    if minimum is not None and value < minimum:
+        raise ValueError(f'{name} must be >= {minimum}')
+    return value
+
+def float_arg(args, name):
+    """
+    Read an optional number query parameter.
+
+    Raises:
+        ValueError: If the parameter is not a number.
+    """
+    value = args.get(name)
+    if value is None or value == '':
+        return None
+    try:
+        return float(value)
+    except ValueError as err:
+        raise ValueError(f'{name} must be a number') from err
+
+def bool_arg(args, name):
+    """
+    Read an optional boolean query parameter.
+
+    Raises:
+        ValueError: If the parameter is not true/false, 1/0 or yes/no.
+    """
+    value = args.get(name, '').lower()
+    if value == '':
+        return None
+    if value in ('true', '1', 'yes'):
+        return True
+    if value in ('false', '0', 'no'):
+        return False
+    raise ValueError(f'{name} must be true or false')
+
+def fields_arg(args):
+    """
+    Read the optional `fields` query parameter, a comma-separated sparse fieldset.
+
+    Raises:
+        ValueError: If a field is not a product column.
+    """
+    value = args.get('fields')
+    if not value:
+        return None
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    product_columns(fields)
+    return fields
@@ -0,0 +1,241 @@
+"""
+Module for request rate limiting.
+
+This module contains the `RateLimiter` extension, which gives every client a
+token bucket: a client can send RATE_LIMIT_BURST requests at once and
+RATE_LIMIT_RATE requests per second after that. Requests over the limit are
+answered with 429 and a `Retry-After` header.
+
+Backends:
+- `LocalRateLimitBackend`: buckets kept in the worker process; every worker
+  enforces the limit on its own.
+- `RedisRateLimitBackend`: buckets kept in Redis and updated by a Lua
+  script, so every worker process shares the same limit.
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app, jsonify, request
+from shared.logging_utils import get_logger
+
+# Get an instance of a logger
+logger = get_logger(__name__)
+
+class LocalRateLimitBackend:
+    """
+    In-process token buckets, the least recently used evicted first.
+
+    Args:
+        max_entries (int): Buckets kept before the least recently used is evicted.
+    """
+
+    name = 'local'
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, key, rate, burst):
+        """
+        Take a token from the bucket of `key`.
+
+        Args:
+            key (str): The client.
+            rate (float): Tokens added per second.
+            burst (int): Capacity of the bucket.
+
+        Returns:
+            tuple: Whether a token was taken, the tokens left and the seconds
+                until the next token.
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated_at) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_entries:
+                self._buckets.popitem(last=False)
+        return allowed, tokens, (1 - tokens) / rate if tokens < 1 else 0.0
+
+# Refills and takes a token from the bucket hash KEYS[1]; ARGV holds the rate
+# per second and the burst. Returns the decision, the tokens left (in
+# thousandths) and the milliseconds until the next token.
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+local tokens = tonumber(bucket[1]) or burst
+local updated_at = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated_at) * rate / 1000)
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated_at', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+local wait = 0
+if tokens < 1 then
+    wait = math.ceil((1 - tokens) / rate * 1000)
+end
+return {allowed, math.floor(tokens * 1000), wait}
+"""
+
+class RedisRateLimitBackend:
+    """
+    Token buckets shared by every worker process through Redis.
+
+    Each bucket is a hash refilled and decremented atomically by a Lua script
+    using the clock of the Redis server, so workers on several hosts agree.
+    Buckets expire once they would be full again.
+
+    Args:
+        client: A client exposing `register_script`.
+        prefix (str): Prefix for every key, to share a Redis database safely.
+    """
+
+    name = 'redis'
+
+    def __init__(self, client, prefix='rate-limit:'):
+        self.client = client
+        self.prefix = prefix
+        self._script = client.register_script(TOKEN_BUCKET_SCRIPT)
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        """
+        Create a backend connected to the Redis server at `url`.
+
+        Raises:
+            RuntimeError: If the `redis` package is not installed.
+        """
+        try:
+            import redis  # pylint: disable=import-outside-toplevel
+        except ImportError as err:
+            raise RuntimeError('RATE_LIMIT_BACKEND=redis requires the redis package') from err
+        return cls(redis.Redis.from_url(url), **kwargs)
+
+    def acquire(self, key, rate, burst):
+        """
+        Take a token from the bucket of `key`, see `LocalRateLimitBackend.acquire`.
+        """
+        allowed, tokens, wait = self._script(keys=[self.prefix + key], args=[rate, burst])
+        return bool(allowed), tokens / 1000, wait / 1000
+
+class _RateLimitState:
+    """
+    Per-application state of the `RateLimiter` extension.
+    """
+
+    def __init__(self, backend, rate, burst, blueprints, client_header):
+        self.backend = backend
+        self.rate = rate
+        self.burst = burst
+        self.blueprints = blueprints
+        self.client_header = client_header
+        self.limited = 0
+        self._lock = threading.Lock()
+
+    def record_limited(self):
+        """
+        Count a rejected request.
+        """
+        with self._lock:
+            self.limited += 1
+
+class RateLimiter:
+    """
+    Per-client token bucket rate limiting.
+
+    Configured with:
+        RATE_LIMIT_ENABLED: Turn rate limiting on or off.
+        RATE_LIMIT_RATE: Requests per second allowed to a client.
+        RATE_LIMIT_BURST: Requests a client can send at once.
+        RATE_LIMIT_BACKEND: 'local' (per process) or 'redis' (shared).
+        RATE_LIMIT_REDIS_URL: URL of the Redis server for the 'redis' backend.
+        RATE_LIMIT_BLUEPRINTS: Blueprints whose requests are limited.
+        RATE_LIMIT_CLIENT_HEADER: Header identifying the client (e.g. an API
+            key, or X-Forwarded-For behind a proxy); the remote address is
+            used when it is unset or missing.
+
+    If the backend fails, requests are let through rather than rejected.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app, backend=None):
+        """
+        Register the rate limiting hook on `app`, optionally with an explicit backend.
+        """
+        config = app.config
+        if not config.get('RATE_LIMIT_ENABLED', False):
+            return
+        if backend is None:
+            kind = config.get('RATE_LIMIT_BACKEND', 'local')
+            if kind == 'local':
+                backend = LocalRateLimitBackend(config.get('RATE_LIMIT_MAX_CLIENTS', 10000))
+            elif kind == 'redis':
+                backend = RedisRateLimitBackend.from_url(config['RATE_LIMIT_REDIS_URL'])
+            else:
+                raise ValueError(f'Unknown RATE_LIMIT_BACKEND: {kind}')
+        app.extensions['rate_limit'] = _RateLimitState(
+            backend, config.get('RATE_LIMIT_RATE', 50), config.get('RATE_LIMIT_BURST', 100),
+            frozenset(config.get('RATE_LIMIT_BLUEPRINTS', ('product_blueprint',))),
+            config.get('RATE_LIMIT_CLIENT_HEADER'))
+        app.before_request(self._limit_request)
+
+    @staticmethod
+    def _client_key(state):
+        if state.client_header:
+            value = request.headers.get(state.client_header)
+            if value:
+                # X-Forwarded-For lists the client first
+                return value.split(',', 1)[0].strip()
+        return request.remote_addr or 'unknown'
+
+    def _limit_request(self):
+        state = current_app.extensions['rate_limit']
+        if request.blueprint not in state.blueprints:
+            return None
+        try:
+            allowed, _, wait = state.backend.acquire(
+                self._client_key(state), state.rate, state.burst)
+        except Exception as err:  # pylint: disable=broad-except
+            logger.warning('rate limit backend %s failed: %s', state.backend.name, err)
+            return None
+        if allowed:
+            return None
+        state.record_limited()
+        response = jsonify({'error': 'Too many requests'})
+        response.status_code = 429
+        response.headers['Retry-After'] = str(max(1, math.ceil(wait)))
+        return response
+
+    @staticmethod
+    def stats():
+        """
+        Return the backend, the limit and the number of rejected requests.
+        """
+        state = current_app.extensions.get('rate_limit')
+        if state is None:
+            return {'backend': 'none'}
+        return {
+            'backend': state.backend.name,
+            'rate': state.rate,
+            'burst': state.burst,
+            'limited': state.limited
+        }
+
+rate_limiter = RateLimiter()
+"""The per-client rate limiting of the application."""
@@ -0,0 +1,165 @@
+"""
+Module for request coalescing.
+
+This module contains `SingleFlight` and `AsyncSingleFlight`, which let
+concurrent identical calls share one execution: the first caller of a key
+runs the function, callers arriving while it runs wait for its result
+instead of running the function again. Once the call returned the key is
+forgotten, so results are never reused by later callers (that is the job of
+a cache).
+
+Calls are grouped (e.g. by the name of the service method), and every group
+counts its executions and the calls that shared one, i.e. the executions
+saved.
+"""
+
+import asyncio
+import threading
+
+class _Call:
+    """A call in flight and its outcome."""
+
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class _SingleFlightStats:
+    """
+    Execution counters per group.
+    """
+
+    def __init__(self):
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def incr(self, group, counter):
+        """
+        Increment `counter` ('executed' or 'shared') of `group`.
+        """
+        with self._lock:
+            counters = self._counters.setdefault(group, {'executed': 0, 'shared': 0})
+            counters[counter] += 1
+
+    def to_dict(self):
+        """
+        Return the counters of every group.
+        """
+        with self._lock:
+            return {group: dict(counters) for group, counters in self._counters.items()}
+
+class SingleFlight:
+    """
+    Coalesce identical concurrent calls of the threads of a process.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._stats = _SingleFlightStats()
+
+    def do(self, group, key, fn):
+        """
+        Return the result of `fn()`, shared with the concurrent calls of `key`.
+
+        Args:
+            group (str): The group of the call, for the counters.
+            key: Identifies the call within its group; must be hashable.
+            fn (callable): Computes the result.
+
+        Returns:
+            The result of `fn`; an exception raised by `fn` is raised in
+            every caller sharing the call.
+        """
+        call_key = (group, key)
+        with self._lock:
+            call = self._calls.get(call_key)
+            leader = call is None
+            if leader:
+                call = self._calls[call_key] = _Call()
+        if not leader:
+            call.done.wait()
+            self._stats.incr(group, 'shared')
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn()
+        except Exception as err:
+            call.error = err
+            raise
+        finally:
+            with self._lock:
+                del self._calls[call_key]
+            call.done.set()
+            self._stats.incr(group, 'executed')
+        return call.result
+
+    def stats(self):
+        """
+        Return the executions and the shared calls of every group.
+        """
+        return self._stats.to_dict()
+
+class AsyncSingleFlight:
+    """
+    Coalesce identical concurrent calls of the tasks of an event loop.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._stats = _SingleFlightStats()
+
+    async def do(self, group, key, fn):
+        """
+        Return the result of `await fn()`, shared with the concurrent calls of `key`.
+
+        A caller cancelled while waiting does not cancel the shared call; if
+        the caller running the shared call is cancelled, the waiting callers
+        run it again.
+        """
+        call_key = (group, key)
+        while True:
+            future = self._calls.get(call_key)
+            if future is None:
+                break
+            try:
+                result = await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if future.cancelled():
+                    continue
+                raise
+            except Exception:
+                self._stats.incr(group, 'shared')
+                raise
+            self._stats.incr(group, 'shared')
+            return result
+        future = asyncio.get_running_loop().create_future()
+        self._calls[call_key] = future
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as err:
+            future.set_exception(err)
+            # Retrieved here, so an exception nobody waited for is not reported
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+        finally:
+            del self._calls[call_key]
+            self._stats.incr(group, 'executed')
+        return result
+
+    def stats(self):
+        """
+        Return the executions and the shared calls of every group.
+        """
+        return self._stats.to_dict()
+
+product_reads = SingleFlight()
+"""Shares one query between concurrent identical product reads."""
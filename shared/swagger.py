@@ -0,0 +1,89 @@
+"""
+Module for the Swagger API documentation.
+
+This module contains `init_swagger`, which serves the API documentation with
+Flasgger, and the loading of the Swagger template.
+
+The template is written in `swagger/swagger_definitions.yaml`. Parsing YAML is
+slow, so the template is also cached as JSON next to it; the cache is used as
+long as it is newer than the YAML file. Build it ahead of time (e.g. in the
+Docker image) with:
+
+    python -m shared.swagger
+"""
+
+import json
+import os
+from flask import request
+from shared.logging_utils import get_logger
+
+# Get an instance of a logger
+logger = get_logger(__name__)
+
+SWAGGER_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'swagger')
+SWAGGER_YAML = os.path.join(SWAGGER_DIR, 'swagger_definitions.yaml')
+SWAGGER_JSON = os.path.join(SWAGGER_DIR, 'swagger_definitions.json')
+
+def compile_swagger_template(yaml_path=SWAGGER_YAML, json_path=SWAGGER_JSON):
+    """
+    Parse the YAML template and write its JSON cache.
+
+    Returns:
+        dict: The Swagger template.
+    """
+    import yaml  # pylint: disable=import-outside-toplevel
+    with open(yaml_path, 'r', encoding='utf8') as f:
+        template = yaml.safe_load(f.read())
+    with open(json_path, 'w', encoding='utf8') as f:
+        json.dump(template, f)
+    return template
+
+def load_swagger_template(yaml_path=SWAGGER_YAML, json_path=SWAGGER_JSON):
+    """
+    Load the Swagger template, from the JSON cache when it is up to date.
+
+    A stale or missing cache is rebuilt; if it cannot be written (read-only
+    file system) the YAML template is used directly.
+
+    Returns:
+        dict: The Swagger template.
+    """
+    try:
+        if os.path.getmtime(json_path) >= os.path.getmtime(yaml_path):
+            with open(json_path, 'r', encoding='utf8') as f:
+                return json.load(f)
+    except OSError:
+        pass
+    try:
+        return compile_swagger_template(yaml_path, json_path)
+    except OSError as err:
+        logger.warning('could not write the swagger template cache: %s', err)
+        import yaml  # pylint: disable=import-outside-toplevel
+        with open(yaml_path, 'r', encoding='utf8') as f:
+            return yaml.safe_load(f.read())
+
+def init_swagger(app):
+    """
+    Serve the API documentation of `app` with Flasgger.
+
+    Flasgger is imported here rather than at module level, and the template
+    is only loaded when the documentation is first requested.
+
+    Returns:
+        Swagger: The Flasgger extension.
+    """
+    from flasgger import Swagger  # pylint: disable=import-outside-toplevel
+
+    swagger = Swagger(app)
+    blueprint = swagger.config.get('endpoint', 'flasgger')
+
+    @app.before_request
+    def load_template():
+        if swagger.template is None and request.blueprint == blueprint:
+            swagger.template = load_swagger_template()
+
+    return swagger
+
+if __name__ == '__main__':
+    compile_swagger_template()
+    print(f'Wrote {SWAGGER_JSON}')
@@ -0,0 +1,108 @@
+import json
+import unittest
+from config import TestConfig
+from shared.cache import LocalCacheBackend, product_cache
+
+try:
+    import aiosqlite  # pylint: disable=unused-import
+    from asgi import create_asgi_app
+except ImportError:  # pragma: no cover - optional async dependencies
+    create_asgi_app = None
+
+@unittest.skipIf(create_asgi_app is None, 'async mode requires quart and aiosqlite')
+class AsyncProductServiceTestCase(unittest.IsolatedAsyncioTestCase):
+    """
+    Test cases for the ASGI application and the async product service.
+    """
+
+    async def asyncSetUp(self):
+        """
+        Start the ASGI application, which creates the tables.
+        """
+        self.app = create_asgi_app(TestConfig)
+        self.test_app = self.app.test_app()
+        await self.test_app.startup()
+        self.client = self.app.test_client()
+
+    async def asyncTearDown(self):
+        """
+        Shut the ASGI application down.
+        """
+        await self.test_app.shutdown()
+
+    async def test_product_lifecycle(self):
+        """
+        Test creating, reading, updating and deleting a product.
+        """
+        response = await self.client.post('/api/product', json={
+            'name': 'Async Product',
+            'description': 'Created through the ASGI app',
+            'price': 10.99,
+            'inventory': 100
+        })
+        self.assertEqual(response.status_code, 201)
+        product = await response.get_json()
+        self.assertEqual(product['version'], 1)
+
+        response = await self.client.put(f"/api/product/{product['id']}", json={'price': 5.0})
+        self.assertEqual((await response.get_json())['version'], 2)
+
+        response = await self.client.get(f"/api/product/{product['id']}")
+        self.assertEqual((await response.get_json())['price'], 5.0)
+
+        response = await self.client.delete(f"/api/product/{product['id']}")
+        self.assertEqual(response.status_code, 200)
+        response = await self.client.delete(f"/api/product/{product['id']}")
+        self.assertEqual(response.status_code, 404)
+
+    async def test_paginated_and_streamed_listing(self):
+        """
+        Test keyset pagination and NDJSON streaming.
+        """
+        for index in range(3):
+            await self.client.post('/api/product', json={
+                'name': f'Product {index}', 'description': '', 'price': 1.0, 'inventory': 1
+            })
+        response = await self.client.get('/api/products?after_id=1&limit=1')
+        self.assertEqual([product['id'] for product in await response.get_json()], [2])
+
+        response = await self.client.get('/api/products?stream=ndjson')
+        lines = (await response.get_data(as_text=True)).splitlines()
+        self.assertEqual([json.loads(line)['id'] for line in lines], [1, 2, 3])
+        # Serialized by the application's JSON provider, like the WSGI listing
+        self.assertEqual(lines[0], self.app.json.dumps(json.loads(lines[0])))
+
+    async def test_writes_invalidate_the_shared_cache(self):
+        """
+        Test that async writes remove the product from the cache shared with the WSGI app.
+        """
+        backend = LocalCacheBackend()
+        product_cache.init_app(self.app, backend=backend)
+        await self.client.post('/api/product', json={
+            'name': 'Cached', 'description': '', 'price': 1.0, 'inventory': 1
+        })
+        backend.set('product:1', {'id': 1, 'price': 1.0})
+        await self.client.put('/api/product/1', json={'price': 2.0})
+        self.assertIsNone(backend.get('product:1'))
+
+        backend.set('product:1', {'id': 1, 'price': 2.0})
+        await self.client.delete('/api/product/1')
+        self.assertIsNone(backend.get('product:1'))
+
+    async def test_sparse_fieldsets(self):
+        """
+        Test that `fields` restricts the returned product fields.
+        """
+        await self.client.post('/api/product', json={
+            'name': 'Sparse', 'description': 'Long text', 'price': 2.0, 'inventory': 1
+        })
+        response = await self.client.get('/api/product/1?fields=name,price')
+        self.assertEqual(await response.get_json(), {'id': 1, 'name': 'Sparse', 'price': 2.0})
+        response = await self.client.get('/api/products?limit=5&fields=name')
+        self.assertEqual(await response.get_json(), [{'id': 1, 'name': 'Sparse'}])
+        response = await self.client.get('/api/products?fields=weight')
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+from benchmarks import loadtest, serialization, startup
+
+class LoadTestTestCase(unittest.TestCase):
+    """
+    Test cases for the load-testing harness.
+    """
+
+    def test_percentile(self):
+        """
+        Test the nearest-rank percentile.
+        """
+        values = list(range(1, 101))
+        self.assertEqual(loadtest.percentile(values, 50), 50)
+        self.assertEqual(loadtest.percentile(values, 99), 99)
+        self.assertEqual(loadtest.percentile([], 95), 0.0)
+
+    def test_read_ratio(self):
+        """
+        Test that --read-ratio rescales the weights of reads and writes.
+        """
+        workload = loadtest.load_workload(loadtest.DEFAULT_WORKLOAD, read_ratio=0.5)
+        reads = sum(entry['probability'] for entry in workload if entry['method'] == 'GET')
+        self.assertAlmostEqual(reads, 0.5)
+
+    def test_in_process_run_and_compare(self):
+        """
+        Test a short in-process run and the comparison of two runs.
+        """
+        target = loadtest.InProcessTarget(seed_products=20)
+        try:
+            workload = loadtest.load_workload(loadtest.DEFAULT_WORKLOAD)
+            results = loadtest.run(target, workload, concurrency=2, requests=30, random_seed=1)
+        finally:
+            target.close()
+        self.assertEqual(results['total']['requests'], 30)
+        self.assertEqual(results['total']['errors'], 0)
+        self.assertIn('p99_ms', results['endpoints']['get_product'])
+
+        slower = {'endpoints': {}, 'total': dict(results['total'], p95_ms=results['total']['p95_ms'] * 2 + 1)}
+        _, regressions = loadtest.compare(results, slower, max_regression=10)
+        self.assertIn('total p95_ms', regressions)
+
+    def test_serialization_paths(self):
+        """
+        Test that the serialization micro-benchmark times every path.
+        """
+        results = serialization.run(rows=20, repeat=1)
+        self.assertIn('orm+stdlib', results)
+        self.assertIn('columns+stdlib', results)
+
+    def test_startup_phases(self):
+        """
+        Test that the startup benchmark measures every phase of a fresh interpreter.
+        """
+        results = startup.run(runs=1)
+        self.assertEqual(results['status'], 200)
+        for phase in startup.PHASES:
+            self.assertGreater(results[phase], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
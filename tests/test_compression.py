@@ -0,0 +1,177 @@
+import gzip
+import json
+import unittest
+import zlib
+from app import create_app
+from database.db import db
+from config import TestConfig
+from services.product_service import ProductService
+from shared.compression import brotli, zstandard
+
+class CompressionTestCase(unittest.TestCase):
+    """
+    Test cases for response compression.
+    """
+
+    def setUp(self):
+        """
+        Set up the test environment before each test.
+        """
+        self.app = create_app(TestConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+        ProductService.bulk_add_products([
+            {'name': f'Product {number}', 'description': 'A sample product',
+             'price': 9.99, 'inventory': 10}
+            for number in range(50)
+        ])
+
+    def tearDown(self):
+        """
+        Clean up the test environment after each test.
+        """
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _get(self, path, encoding):
+        return self.client.get(path, headers={'Accept-Encoding': encoding})
+
+    def test_gzip_listing(self):
+        """
+        Test that a listing is gzip compressed, with an ETag of its own.
+        """
+        plain = self.client.get('/api/products')
+        self.assertNotIn('Content-Encoding', plain.headers)
+        self.assertIn('Accept-Encoding', plain.headers['Vary'])
+
+        response = self._get('/api/products', 'gzip')
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+        self.assertEqual(response.headers['ETag'], plain.headers['ETag'][:-1] + '-gzip"')
+        body = response.get_data()
+        self.assertEqual(int(response.headers['Content-Length']), len(body))
+        self.assertLess(len(body), len(plain.get_data()))
+        self.assertEqual(gzip.decompress(body), plain.get_data())
+
+    def test_negotiation(self):
+        """
+        Test that the encoding follows the client's qualities, then the server preference.
+        """
+        self.assertNotIn('Content-Encoding', self._get('/api/products', 'gzip;q=0').headers)
+        self.assertNotIn('Content-Encoding', self._get('/api/products', 'identity').headers)
+        self.assertEqual(self._get('/api/products', 'deflate, gzip;q=0.5')
+                         .headers['Content-Encoding'], 'gzip')
+        if brotli is not None:
+            response = self._get('/api/products', 'gzip;q=0.8, br')
+            self.assertEqual(response.headers['Content-Encoding'], 'br')
+            self.assertEqual(brotli.decompress(response.get_data()),
+                             self.client.get('/api/products').get_data())
+        if zstandard is not None:
+            response = self._get('/api/products', 'gzip, br, zstd')
+            self.assertEqual(response.headers['Content-Encoding'], 'zstd')
+            self.assertEqual(zstandard.ZstdDecompressor().decompress(response.get_data()),
+                             self.client.get('/api/products').get_data())
+
+    def test_conditional_requests_with_a_compressed_etag(self):
+        """
+        Test that the ETag of a compressed representation is matched by conditional requests.
+        """
+        etag = self._get('/api/products', 'gzip').headers['ETag']
+        response = self.client.get('/api/products', headers={'Accept-Encoding': 'gzip',
+                                                             'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers['ETag'], etag)
+
+    def test_if_match_with_a_compressed_etag(self):
+        """
+        Test that an update accepts the ETag of a compressed product.
+        """
+        class SmallBodyConfig(TestConfig):
+            """Configuration compressing every body."""
+            COMPRESSION_MIN_SIZE = 0
+
+        app = create_app(SmallBodyConfig)
+        with app.app_context():
+            db.create_all()
+            client = app.test_client()
+            ProductService.add_product({'name': 'A', 'description': 'A sample product ' * 10,
+                                        'price': 1.0, 'inventory': 1})
+            etag = client.get('/api/product/1', headers={'Accept-Encoding': 'gzip'}).headers['ETag']
+            self.assertEqual(etag, '"product-1-v1-gzip"')
+            response = client.put('/api/product/1', json={'price': 5.0}, headers={'If-Match': etag})
+            self.assertEqual(response.status_code, 200)
+            response = client.put('/api/product/1', json={'price': 6.0}, headers={'If-Match': etag})
+            self.assertEqual(response.status_code, 412)
+            db.session.remove()
+            db.drop_all()
+
+    def test_small_body_is_not_compressed(self):
+        """
+        Test that bodies below COMPRESSION_MIN_SIZE are sent as they are.
+        """
+        response = self._get('/api/product/1', 'gzip')
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertEqual(response.get_json()['id'], 1)
+
+    def test_compressed_body_is_cached(self):
+        """
+        Test that a listing is compressed once per catalog version and encoding.
+        """
+        first = self._get('/api/products', 'gzip').get_data()
+        second = self._get('/api/products', 'gzip').get_data()
+        self.assertEqual(first, second)
+        stats = self.client.get('/probes/compression').get_json()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+
+        # A write changes the ETag, so the new listing is compressed again
+        ProductService.adjust_inventory(1, -1)
+        listing = gzip.decompress(self._get('/api/products', 'gzip').get_data())
+        self.assertEqual(json.loads(listing)[0]['inventory'], 9)
+        stats = self.client.get('/probes/compression').get_json()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 2))
+
+    def test_streamed_listing(self):
+        """
+        Test that streamed listings are compressed chunk by chunk.
+        """
+        plain = self.client.get('/api/products?stream=ndjson').get_data()
+        response = self._get('/api/products?stream=ndjson', 'gzip')
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertNotIn('Content-Length', response.headers)
+        self.assertEqual(gzip.decompress(response.get_data()), plain)
+
+    def test_server_sent_events_are_flushed(self):
+        """
+        Test that every event can be decompressed as soon as it is received.
+        """
+        self.app.config['CHANGES_POLL_INTERVAL'] = 0.01
+        response = self._get('/api/products/changes?format=sse&wait=0', 'gzip')
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        decompressor = zlib.decompressobj(31)
+        chunks = iter(response.response)
+        self.assertEqual(decompressor.decompress(next(chunks)), b'retry: 1000\n\n')
+        self.assertTrue(decompressor.decompress(next(chunks)).startswith(b'id: 1\n'))
+        response.close()
+
+    def test_disabled(self):
+        """
+        Test that COMPRESSION_ENABLED turns compression off.
+        """
+        class UncompressedConfig(TestConfig):
+            """Configuration without compression."""
+            COMPRESSION_ENABLED = False
+
+        app = create_app(UncompressedConfig)
+        with app.app_context():
+            db.create_all()
+            response = app.test_client().get('/api/products', headers={'Accept-Encoding': 'gzip'})
+            self.assertNotIn('Content-Encoding', response.headers)
+            db.session.remove()
+            db.drop_all()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+import config
+from app import create_app
+from database.db import db
+from database.pool import InstrumentedQueuePool
+from config import TestConfig
+
+class EngineOptionsTestCase(unittest.TestCase):
+    """
+    Test cases for the environment-driven connection pool options.
+    """
+
+    def test_environment_overrides(self):
+        """
+        Test that the DB_POOL_* variables override the class defaults.
+        """
+        with mock.patch.dict(os.environ, {'DB_POOL_SIZE': '42', 'DB_POOL_PRE_PING': 'false'}):
+            options = config._engine_options(5, 10, 30, 1800, True)
+        self.assertEqual(options['pool_size'], 42)
+        self.assertEqual(options['max_overflow'], 10)
+        self.assertFalse(options['pool_pre_ping'])
+
+    def test_memory_database_drops_queue_pool_options(self):
+        """
+        Test that an in-memory SQLite database ignores the QueuePool sizing.
+        """
+        app = create_app(TestConfig)
+        self.assertNotIn('pool_size', app.config['SQLALCHEMY_ENGINE_OPTIONS'])
+
+class PoolMetricsTestCase(unittest.TestCase):
+    """
+    Test cases for the pool statistics endpoint.
+    """
+
+    def setUp(self):
+        """
+        Set up an application backed by a SQLite file, which uses a QueuePool.
+        """
+        self.tmpdir = tempfile.mkdtemp()
+
+        class FileConfig(TestConfig):
+            """Configuration using a SQLite file with a small pool."""
+            SQLALCHEMY_DATABASE_URI = f'sqlite:///{self.tmpdir}/pool.db'
+            SQLALCHEMY_ENGINE_OPTIONS = config._engine_options(2, 1, 5, 1800, True)
+
+        self.app = create_app(FileConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        """
+        Clean up the test environment after each test.
+        """
+        db.session.remove()
+        db.drop_all()
+        db.engine.dispose()
+        self.app_context.pop()
+        shutil.rmtree(self.tmpdir)
+
+    def test_pool_statistics(self):
+        """
+        Test that checkouts are counted and reported at /probes/pool.
+        """
+        self.assertIsInstance(db.engine.pool, InstrumentedQueuePool)
+        self.client.get('/api/products')
+        stats = self.client.get('/probes/pool').get_json()
+        self.assertEqual(stats['pool'], 'InstrumentedQueuePool')
+        self.assertEqual(stats['size'], 2)
+        self.assertGreaterEqual(stats['checkouts'], 1)
+        self.assertIn('avg_checkout_ms', stats)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+import shutil
+import tempfile
+import unittest
+from sqlalchemy.exc import OperationalError
+from app import create_app
+from database.db import db
+from config import TestConfig
+from models.product import Product
+from services.product_service import ProductService
+
+class DatabaseReplicasTestCase(unittest.TestCase):
+    """
+    Test cases for the routing of product reads to read replicas.
+
+    The primary and the replicas are separate SQLite files holding different
+    data, so the name of a product tells which database served it.
+    """
+
+    def setUp(self):
+        """
+        Set up the test environment before each test.
+        """
+        self.tmpdir = tempfile.mkdtemp()
+
+        class ReplicaConfig(TestConfig):
+            """Configuration with a primary and two replicas."""
+            SQLALCHEMY_DATABASE_URI = f'sqlite:///{self.tmpdir}/primary.db'
+            SQLALCHEMY_REPLICA_URLS = [f'sqlite:///{self.tmpdir}/replica1.db',
+                                       f'sqlite:///{self.tmpdir}/replica2.db']
+
+        self.app = create_app(ReplicaConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.client = self.app.test_client()
+        self.replicas = self.app.extensions['replicas'].replicas
+        self._seed(db.engine, 'primary')
+        for replica in self.replicas:
+            self._seed(replica.engine, replica.name)
+
+    @staticmethod
+    def _seed(engine, name):
+        """Create the schema on `engine` and a product named after the database."""
+        db.metadata.create_all(engine)
+        with engine.begin() as connection:
+            connection.execute(Product.__table__.insert().values(
+                id=1, name=name, description='Sample', price=1.0, inventory=5, version=1))
+
+    def tearDown(self):
+        """
+        Clean up the test environment after each test.
+        """
+        db.session.remove()
+        self.app_context.pop()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def _served_by(self):
+        return self.client.get('/api/product/1').get_json()['name']
+
+    def test_reads_round_robin(self):
+        """
+        Test that reads alternate between the replicas.
+        """
+        self.assertEqual({self._served_by() for _ in range(4)}, {'replica_1', 'replica_2'})
+        stats = self.client.get('/probes/replicas').get_json()
+        self.assertEqual([replica['reads'] for replica in stats], [2, 2])
+
+    def test_read_your_writes(self):
+        """
+        Test that reads after a write in the same request use the primary.
+        """
+        with self.app.test_request_context():
+            ProductService.update_product(1, {'inventory': 4})
+            self.assertEqual(ProductService.get_product(1)['name'], 'primary')
+            self.assertEqual(ProductService.get_products_page()[0]['inventory'], 4)
+        self.assertTrue(self._served_by().startswith('replica_'))
+
+    def test_failing_replica_is_ejected(self):
+        """
+        Test that a replica raising errors is skipped until it recovers.
+        """
+        db.metadata.drop_all(self.replicas[1].engine)
+        self.assertEqual(self._served_by(), 'replica_1')
+        # The read that hits the broken replica fails and ejects it
+        with self.assertRaises(OperationalError):
+            self._served_by()
+        db.session.rollback()
+        self.assertEqual({self._served_by() for _ in range(3)}, {'replica_1'})
+        stats = self.client.get('/probes/replicas').get_json()
+        self.assertEqual([replica['healthy'] for replica in stats], [True, False])
+
+        self.replicas[1].ejected_until = 0.0
+        self._seed(self.replicas[1].engine, 'replica_2')
+        self.assertEqual({self._served_by() for _ in range(2)}, {'replica_1', 'replica_2'})
+
+class ReplicaCacheTestCase(unittest.TestCase):
+    """
+    Test cases for the product cache with a lagging read replica.
+    """
+
+    def setUp(self):
+        """
+        Set up a primary, a replica and the in-process product cache.
+        """
+        self.tmpdir = tempfile.mkdtemp()
+
+        class ReplicaCacheConfig(TestConfig):
+            """Configuration with a replica and the product cache."""
+            SQLALCHEMY_DATABASE_URI = f'sqlite:///{self.tmpdir}/primary.db'
+            SQLALCHEMY_REPLICA_URLS = [f'sqlite:///{self.tmpdir}/replica.db']
+            CACHE_BACKEND = 'local'
+
+        self.app = create_app(ReplicaCacheConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.client = self.app.test_client()
+        self.replica = self.app.extensions['replicas'].replicas[0]
+        for engine in (db.engine, self.replica.engine):
+            DatabaseReplicasTestCase._seed(engine, 'old')
+
+    def tearDown(self):
+        """
+        Clean up the test environment after each test.
+        """
+        db.session.remove()
+        self.app_context.pop()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def test_cache_is_not_filled_from_a_lagging_replica(self):
+        """
+        Test that a read after a write caches the primary row, not the replica's.
+        """
+        self.assertEqual(self.client.get('/api/product/1').get_json()['name'], 'old')
+        response = self.client.put('/api/product/1', json={'name': 'new'})
+        self.assertEqual(response.get_json()['version'], 2)
+
+        # The replica has not applied the update yet
+        for _ in range(2):
+            product = self.client.get('/api/product/1').get_json()
+            self.assertEqual((product['name'], product['version']), ('new', 2))
+        self.client.put('/api/product/1', json={'price': 2.0})
+        products = self.client.get('/api/products?ids=1').get_json()['products']
+        self.assertEqual((products[0]['price'], products[0]['version']), (2.0, 3))
+
+
+if __name__ == '__main__':
+    unittest.main()
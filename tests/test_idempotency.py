@@ -0,0 +1,175 @@
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+from app import create_app
+from database.db import db
+from config import TestConfig
+from models.product import Product
+from services.product_service import ProductService
+from shared.cache import LocalCacheBackend
+from shared.idempotency import _fingerprint
+
+class IdempotencyTestCase(unittest.TestCase):
+    """
+    Test cases for writes sent with an Idempotency-Key.
+    """
+
+    def setUp(self):
+        """
+        Set up the test environment before each test.
+        """
+        # A database file, so concurrent requests can run in threads
+        self.tmpdir = tempfile.mkdtemp()
+
+        class IdempotencyConfig(TestConfig):
+            """Configuration backed by a temporary SQLite file."""
+            SQLALCHEMY_DATABASE_URI = f'sqlite:///{self.tmpdir}/idempotency.db'
+            IDEMPOTENCY_POLL_INTERVAL = 0.01
+
+        self.app = create_app(IdempotencyConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+        self.product = {'name': 'Sample', 'description': 'Sample', 'price': 1.0, 'inventory': 5}
+
+    def tearDown(self):
+        """
+        Clean up the test environment after each test.
+        """
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def _create(self, key='key-1', product=None):
+        return self.client.post('/api/product', json=product or self.product,
+                                headers={'Idempotency-Key': key})
+
+    def test_repeat_replays_response(self):
+        """
+        Test that a repeated request gets the first response without running again.
+        """
+        first = self._create()
+        second = self._create()
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(second.status_code, 201)
+        self.assertEqual(second.get_json(), first.get_json())
+        self.assertEqual(second.headers['ETag'], first.headers['ETag'])
+        self.assertEqual(second.headers['Idempotent-Replayed'], 'true')
+        self.assertNotIn('Idempotent-Replayed', first.headers)
+        self.assertEqual(db.session.query(Product).count(), 1)
+
+        # Another key is another request
+        other = self._create('key-2', dict(self.product, name='Other'))
+        self.assertEqual(other.get_json()['id'], 2)
+
+    def test_key_reused_with_other_request(self):
+        """
+        Test that a key cannot be reused for a different request.
+        """
+        self._create()
+        response = self._create(product=dict(self.product, name='Other'))
+        self.assertEqual(response.status_code, 422)
+        response = self.client.put('/api/product/1', json={'price': 2.0},
+                                   headers={'Idempotency-Key': 'key-1'})
+        self.assertEqual(response.status_code, 422)
+
+    def test_client_errors_are_replayed(self):
+        """
+        Test that a stored 4xx response is replayed as well.
+        """
+        self._create()
+        headers = {'Idempotency-Key': 'take'}
+        first = self.client.post('/api/product/1/inventory', json={'delta': -10}, headers=headers)
+        self.assertEqual(first.status_code, 409)
+        ProductService.adjust_inventory(1, 10)
+        second = self.client.post('/api/product/1/inventory', json={'delta': -10}, headers=headers)
+        self.assertEqual(second.status_code, 409)
+        self.assertEqual(second.headers['Idempotent-Replayed'], 'true')
+
+    def test_concurrent_duplicates_run_once(self):
+        """
+        Test that a duplicate waits for the in-flight request instead of running.
+        """
+        add_product = ProductService.add_product
+        calls = []
+
+        def slow_add_product(data):
+            calls.append(data)
+            time.sleep(0.3)
+            return add_product(data)
+
+        responses = []
+
+        def create():
+            with self.app.app_context():
+                responses.append(self.app.test_client().post(
+                    '/api/product', json=self.product, headers={'Idempotency-Key': 'key-1'}))
+
+        with mock.patch.object(ProductService, 'add_product', side_effect=slow_add_product):
+            threads = [threading.Thread(target=create) for _ in range(3)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual([response.status_code for response in responses], [201] * 3)
+        self.assertEqual({response.get_json()['id'] for response in responses}, {1})
+        self.assertEqual(sum('Idempotent-Replayed' in response.headers
+                             for response in responses), 2)
+
+    def test_in_progress_timeout(self):
+        """
+        Test that a duplicate gives up with 409 when the first request does not finish.
+        """
+        self.app.extensions['idempotency'].wait = 0
+        with self.app.test_request_context('/api/product', method='POST', json=self.product):
+            fingerprint = _fingerprint()
+        backend = self.app.extensions['idempotency'].backend
+        backend.add('key-1', {'fingerprint': fingerprint, 'status': None})
+        response = self._create()
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.headers['Retry-After'], '1')
+
+    def test_failure_releases_key(self):
+        """
+        Test that a request failing with an exception can be retried with its key.
+        """
+        with mock.patch.object(ProductService, 'add_product', side_effect=RuntimeError('down')):
+            with self.assertRaises(RuntimeError):
+                self._create()
+        self.assertIsNone(self.app.extensions['idempotency'].backend.get('key-1'))
+        self.assertEqual(self._create().status_code, 201)
+
+    def test_invalid_key(self):
+        """
+        Test that an empty or oversized key is rejected.
+        """
+        self.assertEqual(self._create('').status_code, 400)
+        self.assertEqual(self._create('k' * 256).status_code, 400)
+
+class CacheBackendAddTestCase(unittest.TestCase):
+    """
+    Test cases for the set-if-absent operation of the local cache backend.
+    """
+
+    def test_add(self):
+        """
+        Test that `add` only stores a value when the key is absent or expired.
+        """
+        backend = LocalCacheBackend()
+        self.assertTrue(backend.add('a', 1))
+        self.assertFalse(backend.add('a', 2))
+        self.assertEqual(backend.get('a'), 1)
+        backend.set('b', 1, ttl=0)
+        self.assertTrue(backend.add('b', 2))
+        self.assertEqual(backend.get('b'), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
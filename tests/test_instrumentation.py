@@ -0,0 +1,74 @@
+import unittest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from app import create_app
+from database.db import db
+from config import TestConfig
+
+class RequestInstrumentationTestCase(unittest.TestCase):
+    """
+    Test cases for the per-request timing and SQL instrumentation.
+    """
+
+    def setUp(self):
+        """
+        Set up the test environment before each test.
+        """
+        self.app = create_app(TestConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        """
+        Clean up the test environment after each test.
+        """
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_server_timing_header(self):
+        """
+        Test that responses report the request and database time.
+        """
+        response = self.client.get('/api/products')
+        header = response.headers['Server-Timing']
+        self.assertIn('app;dur=', header)
+        self.assertRegex(header, r'db;dur=[\d.]+;desc="[1-9]\d* queries"')
+
+    def test_structured_request_log(self):
+        """
+        Test that the request log carries the timing as structured fields.
+        """
+        with self.assertLogs('shared.instrumentation', level='INFO') as logs:
+            self.client.get('/api/product/1')
+        record = logs.records[-1]
+        self.assertEqual(record.http_path, '/api/product/1')
+        self.assertEqual(record.endpoint, 'product_blueprint.get_product')
+        self.assertGreaterEqual(record.db_queries, 1)
+
+    def test_slow_query_log(self):
+        """
+        Test that statements above the threshold are logged.
+        """
+        self.app.config['SLOW_QUERY_THRESHOLD_MS'] = 0
+        with self.assertLogs('shared.instrumentation', level='WARNING') as logs:
+            self.client.get('/api/products')
+        self.assertTrue(any('slow query' in message for message in logs.output))
+
+    def test_failed_statement_keeps_no_start_time(self):
+        """
+        Test that a failing statement leaves nothing behind on its connection.
+        """
+        with db.engine.connect() as connection:
+            with self.assertRaises(OperationalError):
+                connection.execute(text('SELECT * FROM missing_table'))
+            self.assertNotIn('query_start_time', connection.info)
+            self.assertEqual(connection.execute(text('SELECT 1')).scalar(), 1)
+        response = self.client.get('/api/products')
+        self.assertRegex(response.headers['Server-Timing'], r'db;dur=[\d.]+;')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import datetime
+import json
+import unittest
+from flask.json.provider import DefaultJSONProvider
+from app import create_app
+from config import TestConfig
+from shared.json_provider import OrjsonProvider, orjson
+
+@unittest.skipIf(orjson is None, 'orjson is not installed')
+class JSONProviderTestCase(unittest.TestCase):
+    """
+    Test cases for the orjson JSON provider.
+    """
+
+    def setUp(self):
+        """
+        Set up the test environment before each test.
+        """
+        self.app = create_app(TestConfig)
+
+    def test_provider_selection(self):
+        """
+        Test that JSON_PROVIDER selects the provider installed on the app.
+        """
+        self.assertIsInstance(self.app.json, OrjsonProvider)
+
+        class DefaultJSONConfig(TestConfig):
+            """Configuration using the stdlib provider."""
+            JSON_PROVIDER = 'default'
+
+        app = create_app(DefaultJSONConfig)
+        self.assertNotIsInstance(app.json, OrjsonProvider)
+        self.assertIsInstance(app.json, DefaultJSONProvider)
+
+    def test_matches_default_provider(self):
+        """
+        Test that the output decodes to the same value as the stdlib provider.
+        """
+        value = {'b': [1, 2.5, None], 'a': 'café', 'when': datetime.date(2024, 1, 2)}
+        expected = DefaultJSONProvider(self.app).dumps(value)
+        dumped = self.app.json.dumps(value)
+        self.assertEqual(json.loads(dumped), json.loads(expected))
+        self.assertLess(dumped.index('"a"'), dumped.index('"b"'))
+
+        with self.app.app_context():
+            response = self.app.json.response(value)
+        self.assertEqual(response.mimetype, 'application/json')
+        self.assertEqual(response.get_json(), json.loads(expected))
+
+
+if __name__ == '__main__':
+    unittest.main()
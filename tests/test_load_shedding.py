@@ -0,0 +1,94 @@
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from app import create_app
+from database.db import db
+from config import TestConfig
+
+class LoadSheddingTestCase(unittest.TestCase):
+    """
+    Test cases for load shedding and the readiness probe.
+    """
+
+    def setUp(self):
+        """
+        Set up an application backed by a SQLite file, which uses a QueuePool.
+        """
+        self.tmpdir = tempfile.mkdtemp()
+
+        class SheddingConfig(TestConfig):
+            """Configuration shedding above one request in flight."""
+            SQLALCHEMY_DATABASE_URI = f'sqlite:///{self.tmpdir}/shedding.db'
+            LOAD_SHED_MAX_IN_FLIGHT = 1
+            LOAD_SHED_MAX_POOL_WAIT_MS = 500
+
+        self.app = create_app(SheddingConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+        self.state = self.app.extensions['load_shedding']
+
+    def tearDown(self):
+        """
+        Clean up the test environment after each test.
+        """
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def test_sheds_above_max_in_flight(self):
+        """
+        Test that requests are shed while too many are in flight.
+        """
+        self.assertEqual(self.client.get('/api/products').status_code, 200)
+        self.assertEqual(self.client.get('/probes/ready').status_code, 200)
+
+        self.state.enter()
+        response = self.client.get('/api/products')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers['Retry-After'], '1')
+        ready = self.client.get('/probes/ready')
+        self.assertEqual(ready.status_code, 503)
+        self.assertEqual(ready.get_json()['status'], 'overloaded')
+        self.assertEqual(self.client.get('/probes/health').status_code, 200)
+
+        self.state.leave()
+        self.assertEqual(self.client.get('/api/products').status_code, 200)
+        stats = self.client.get('/probes/traffic').get_json()['load_shedding']
+        self.assertEqual((stats['in_flight'], stats['shed']), (0, 1))
+
+    def test_sheds_on_slow_pool_checkouts(self):
+        """
+        Test that slow pool checkouts shed requests until the latency decays.
+        """
+        metrics = db.engine.pool.metrics
+        with mock.patch('database.pool.time.monotonic', return_value=1000.0):
+            for _ in range(10):
+                metrics.record(2.0, True)
+            self.assertEqual(self.client.get('/probes/ready').status_code, 503)
+            self.assertEqual(self.client.get('/api/products').status_code, 503)
+        with mock.patch('database.pool.time.monotonic', return_value=1030.0):
+            self.assertEqual(self.client.get('/probes/ready').status_code, 200)
+
+    def test_disabled(self):
+        """
+        Test that LOAD_SHEDDING_ENABLED turns load shedding off.
+        """
+        class UnprotectedConfig(TestConfig):
+            """Configuration without load shedding."""
+            LOAD_SHEDDING_ENABLED = False
+            LOAD_SHED_MAX_IN_FLIGHT = 0
+
+        app = create_app(UnprotectedConfig)
+        with app.app_context():
+            db.create_all()
+            self.assertEqual(app.test_client().get('/api/products').status_code, 200)
+            db.session.remove()
+            db.drop_all()
+
+
+if __name__ == '__main__':
+    unittest.main()
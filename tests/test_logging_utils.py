@@ -0,0 +1,92 @@
+import io
+import json
+import logging
+import queue
+import unittest
+from app import create_app
+from config import TestConfig
+from shared import logging_utils
+from shared.logging_utils import (BoundedQueueHandler, JSONFormatter, LogfmtFormatter,
+                                  SamplingFilter, _parse_rates, _Pipeline)
+
+def _record(msg='request completed', args=(), level=logging.INFO, **extra):
+    record = logging.LogRecord('products', level, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+class LoggingUtilsTestCase(unittest.TestCase):
+    """
+    Test cases for the structured and queued logging pipeline.
+    """
+
+    def test_json_formatter(self):
+        """
+        Test that records are formatted as JSON with their extra fields.
+        """
+        line = JSONFormatter().format(_record('took %d ms', (12,), duration_ms=12.5))
+        fields = json.loads(line)
+        self.assertEqual(fields['msg'], 'took 12 ms')
+        self.assertEqual(fields['level'], 'INFO')
+        self.assertEqual(fields['logger'], 'products')
+        self.assertEqual(fields['duration_ms'], 12.5)
+        self.assertTrue(fields['time'].endswith('Z'))
+        self.assertNotIn('file', fields)
+        self.assertIn('file', json.loads(JSONFormatter(verbose=True).format(_record())))
+
+    def test_logfmt_formatter(self):
+        """
+        Test that logfmt values are quoted only when needed.
+        """
+        line = LogfmtFormatter().format(_record(status=200, endpoint='get_products'))
+        self.assertIn('level=INFO logger=products msg="request completed"', line)
+        self.assertTrue(line.endswith('status=200 endpoint=get_products'))
+
+    def test_full_queue_drops_records(self):
+        """
+        Test that a full queue drops records instead of blocking.
+        """
+        handler = BoundedQueueHandler(queue.Queue(1))
+        dropped = logging_utils.stats.dropped
+        for number in range(3):
+            handler.handle(_record('record %d', (number,)))
+        self.assertEqual(logging_utils.stats.dropped - dropped, 2)
+        record = handler.queue.get_nowait()
+        self.assertEqual((record.msg, record.args), ('record 0', None))
+
+    def test_sampling_of_hot_endpoints(self):
+        """
+        Test that sampling only applies to its levels and endpoints.
+        """
+        sampling = SamplingFilter(_parse_rates('DEBUG=0,INFO=0'), ['product_blueprint.get_products'])
+        app = create_app(TestConfig)
+        sampled_out = logging_utils.stats.sampled_out
+        with app.test_request_context('/api/products'):
+            self.assertFalse(sampling.filter(_record()))
+            self.assertFalse(sampling.filter(_record(level=logging.DEBUG)))
+            self.assertTrue(sampling.filter(_record(level=logging.WARNING)))
+        with app.test_request_context('/api/product/1'):
+            self.assertTrue(sampling.filter(_record()))
+        self.assertTrue(sampling.filter(_record()))
+        self.assertEqual(logging_utils.stats.sampled_out - sampled_out, 2)
+
+    def test_queue_pipeline(self):
+        """
+        Test that queued records are written by the listener, all of them by stop.
+        """
+        stream = io.StringIO()
+        output = logging.StreamHandler(stream)
+        output.setFormatter(JSONFormatter())
+        pipeline = _Pipeline(output, 'queue', 100, None)
+        logger = logging.getLogger('tests.queue_pipeline')
+        logger.propagate = False
+        logger.addHandler(pipeline.handler)
+        for number in range(50):
+            logger.warning('record %d', number, extra={'number': number})
+        pipeline.stop()
+        lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual([line['number'] for line in lines], list(range(50)))
+        self.assertEqual(lines[-1]['msg'], 'record 49')
+
+
+if __name__ == '__main__':
+    unittest.main()
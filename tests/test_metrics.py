@@ -0,0 +1,49 @@
+import unittest
+from app import create_app
+from database.db import db
+from config import TestConfig
+from shared.metrics import metrics
+
+@unittest.skipUnless(metrics.available, 'metrics require prometheus_client')
+class MetricsTestCase(unittest.TestCase):
+    """
+    Test cases for the Prometheus metrics endpoint.
+    """
+
+    def setUp(self):
+        """
+        Set up the test environment before each test.
+        """
+        self.app = create_app(TestConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        """
+        Clean up the test environment after each test.
+        """
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_request_metrics(self):
+        """
+        Test that requests are counted per endpoint and status.
+        """
+        self.client.get('/api/products')
+        self.client.get('/api/does-not-exist')
+        body = self.client.get('/metrics').get_data(as_text=True)
+        self.assertIn('http_requests_total{endpoint="product_blueprint.get_products",'
+                      'method="GET",status="200"}', body)
+        self.assertIn('endpoint="unmatched",method="GET",status="404"', body)
+        self.assertIn('http_request_duration_seconds_bucket{endpoint="product_blueprint.get_products"',
+                      body)
+        self.assertIn('http_requests_in_progress', body)
+        self.assertIn('db_pool_checked_out_connections', body)
+        self.assertIn('product_cache_hits_total', body)
+
+
+if __name__ == '__main__':
+    unittest.main()
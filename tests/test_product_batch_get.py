@@ -0,0 +1,98 @@
+import unittest
+from sqlalchemy import event
+from app import create_app
+from database.db import db
+from config import TestConfig
+from services.product_service import ProductService
+from shared.cache import product_cache
+
+class ProductBatchGetTestCase(unittest.TestCase):
+    """
+    Test cases for retrieving several products by id.
+    """
+
+    def setUp(self):
+        """
+        Set up the test environment before each test.
+        """
+        class BatchGetConfig(TestConfig):
+            """Configuration with the in-process product cache."""
+            CACHE_BACKEND = 'local'
+            PRODUCTS_BATCH_GET_MAX_IDS = 5
+
+        self.app = create_app(BatchGetConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+        self.ids = [ProductService.add_product({'name': f'Product {index}', 'description': 'D',
+                                                'price': 1.0, 'inventory': 1})['id']
+                    for index in range(4)]
+        db.session.expunge_all()
+
+    def tearDown(self):
+        """
+        Clean up the test environment after each test.
+        """
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _count_selects(self):
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, *args):
+            if statement.lstrip().upper().startswith('SELECT'):
+                statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        self.addCleanup(event.remove, db.engine, 'before_cursor_execute', before_cursor_execute)
+        return statements
+
+    def test_products_in_request_order_with_missing_ids(self):
+        """
+        Test that products keep the order of the ids and unknown ids are reported.
+        """
+        statements = self._count_selects()
+        wanted = [self.ids[2], 999, self.ids[0], self.ids[2]]
+        response = self.client.get(f'/api/products?ids={",".join(map(str, wanted))}')
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertEqual([product['id'] for product in data['products']],
+                         [self.ids[2], self.ids[0]])
+        self.assertEqual(data['missing'], [999])
+        # The catalog version (ETag) and a single IN query for the products
+        self.assertEqual(len(statements), 2)
+
+    def test_cached_products_are_not_selected(self):
+        """
+        Test that cached products are served without querying them again.
+        """
+        ProductService.get_products_by_ids(self.ids[:2])
+        statements = self._count_selects()
+        products, missing = ProductService.get_products_by_ids(self.ids[:2])
+        self.assertEqual([product['id'] for product in products], self.ids[:2])
+        self.assertEqual((missing, statements), ([], []))
+        self.assertEqual(product_cache.stats()['hits'], 2)
+
+        ProductService.update_product(self.ids[0], {'price': 3.0})
+        products, _ = ProductService.get_products_by_ids(self.ids[:2])
+        self.assertEqual(products[0]['price'], 3.0)
+
+    def test_post_batch_get(self):
+        """
+        Test the POST variant and the validation of the ids.
+        """
+        response = self.client.post('/api/products/batch-get', json={'ids': self.ids[::-1]})
+        self.assertEqual([product['id'] for product in response.get_json()['products']],
+                         self.ids[::-1])
+        response = self.client.post('/api/products/batch-get', json=[self.ids[1]])
+        self.assertEqual(len(response.get_json()['products']), 1)
+
+        for body in ({'ids': 'x'}, ['a'], list(range(6))):
+            response = self.client.post('/api/products/batch-get', json=body)
+            self.assertEqual(response.status_code, 400, body)
+        self.assertEqual(self.client.get('/api/products?ids=1,x').status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+import json
+import unittest
+from app import create_app
+from database.db import db
+from config import TestConfig
+from models.product import Product
+from services.product_service import ProductService
+
+class ProductBulkTestCase(unittest.TestCase):
+    """
+    Test cases for the bulk create, update and delete endpoints.
+    """
+
+    def setUp(self):
+        """
+        Set up the test environment before each test.
+        """
+        self.app = create_app(TestConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        """
+        Clean up the test environment after each test.
+        """
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    @staticmethod
+    def _product(index):
+        """
+        Build the payload of a sample product.
+        """
+        return {'name': f'Product {index}', 'description': 'Sample',
+                'price': 1.5, 'inventory': index}
+
+    def test_bulk_create(self):
+        """
+        Test that valid items are created in batches and invalid ones are reported.
+        """
+        items = [self._product(index) for index in range(5)]
+        items.insert(2, {'name': 'Incomplete'})
+        items.append(self._product(0))
+        response = self.client.post('/api/products/bulk?batch_size=2', json=items)
+        self.assertEqual(response.status_code, 200)
+        report = response.get_json()
+        self.assertEqual(report['succeeded'], 5)
+        self.assertEqual(report['failed'], 2)
+        self.assertEqual(report['results'][2]['status'], 'error')
+        self.assertEqual(report['results'][-1]['status'], 'error')
+        self.assertEqual(Product.query.count(), 5)
+
+    def test_bulk_create_ndjson(self):
+        """
+        Test that an NDJSON body is accepted.
+        """
+        body = '\n'.join(json.dumps(self._product(index)) for index in range(3)) + '\nnot json\n'
+        response = self.client.post('/api/products/bulk', data=body,
+                                    content_type='application/x-ndjson')
+        report = response.get_json()
+        self.assertEqual(report['succeeded'], 3)
+        self.assertEqual(report['failed'], 1)
+
+    def test_bulk_update_and_delete(self):
+        """
+        Test that bulk updates and deletes report unknown ids.
+        """
+        self.client.post('/api/products/bulk', json=[self._product(index) for index in range(3)])
+        response = self.client.patch('/api/products/bulk', json=[
+            {'id': 1, 'price': 9.99},
+            {'id': 42, 'price': 1.0}
+        ])
+        report = response.get_json()
+        self.assertEqual([result['status'] for result in report['results']], ['updated', 'error'])
+        self.assertEqual(db.session.get(Product, 1).price, 9.99)
+
+        response = self.client.delete('/api/products/bulk', json=[1, {'id': 2}, 42])
+        report = response.get_json()
+        self.assertEqual(report['succeeded'], 2)
+        self.assertEqual(Product.query.count(), 1)
+
+    def test_bulk_reports_invalid_items(self):
+        """
+        Test that ids and fields of the wrong type fail their item, not the request.
+        """
+        response = self.client.post('/api/products/bulk', json=[
+            dict(self._product(0), name=['x']),
+            dict(self._product(1), price='abc'),
+            dict(self._product(2), inventory=True),
+            self._product(3)
+        ])
+        self.assertEqual(response.status_code, 200)
+        report = response.get_json()
+        self.assertEqual([result['status'] for result in report['results']],
+                         ['error', 'error', 'error', 'created'])
+        self.assertEqual(report['results'][0]['error'], 'name must be a string')
+        product_id = report['results'][3]['id']
+
+        response = self.client.patch('/api/products/bulk', json=[
+            {'id': {'a': 1}, 'price': 1.0},
+            {'id': product_id, 'price': 'abc'},
+            {'id': True, 'price': 2.0},
+            {'id': product_id, 'price': 3.0}
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([result['status'] for result in response.get_json()['results']],
+                         ['error', 'error', 'error', 'updated'])
+        self.assertEqual(db.session.get(Product, product_id).price, 3.0)
+
+    def test_bulk_delete_rejects_booleans(self):
+        """
+        Test that `true` is not taken for the product id 1.
+        """
+        self.client.post('/api/products/bulk', json=[self._product(0)])
+        response = self.client.delete('/api/products/bulk', json=[True, {'id': True}])
+        self.assertEqual(response.get_json()['failed'], 2)
+        self.assertEqual(Product.query.count(), 1)
+
+    def test_failed_bulk_keeps_the_catalog_version(self):
+        """
+        Test that a bulk request writing nothing changes neither the version nor the feed.
+        """
+        self.client.post('/api/products/bulk', json=[self._product(0)])
+        version = ProductService.get_catalog_version()
+        # The batch insert fails on the duplicate names, then every item does
+        response = self.client.post('/api/products/bulk', json=[self._product(0)] * 2)
+        self.assertEqual(response.get_json()['failed'], 2)
+        self.client.patch('/api/products/bulk', json=[{'id': 999, 'price': 1.0}])
+        self.client.delete('/api/products/bulk', json=[999])
+        self.assertEqual(ProductService.get_catalog_version(), version)
+        changes = self.client.get('/api/products/changes').get_data(as_text=True)
+        self.assertEqual(len(changes.splitlines()), 1)
+
+    def test_bulk_rejects_non_array(self):
+        """
+        Test that a JSON body that is not an array is rejected.
+        """
+        response = self.client.post('/api/products/bulk', json={'name': 'x'})
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
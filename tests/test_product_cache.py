@@ -0,0 +1,186 @@
+import threading
+import time
+import unittest
+from app import create_app
+from database.db import db
+from config import TestConfig
+from models.product import Product
+from services.product_service import ProductService
+from shared.cache import LocalCacheBackend, RedisCacheBackend, product_cache
+
+class FakeRedis:
+    """
+    Minimal in-memory stand-in for a Redis client.
+    """
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, name):
+        """
+        Return the raw value stored under `name`.
+        """
+        return self.data.get(name)
+
+    def mget(self, names):
+        """
+        Return the raw values stored under `names`.
+        """
+        return [self.data.get(name) for name in names]
+
+    def set(self, name, value, ex=None, nx=False):
+        """
+        Store `value` under `name`, ignoring the expiry.
+        """
+        if nx and name in self.data:
+            return None
+        self.data[name] = value.encode()
+        return True
+
+    def delete(self, name):
+        """
+        Remove `name`.
+        """
+        self.data.pop(name, None)
+
+class LocalCacheBackendTestCase(unittest.TestCase):
+    """
+    Test cases for the in-process LRU/TTL cache backend.
+    """
+
+    def test_lru_eviction(self):
+        """
+        Test that the least recently used entry is evicted first.
+        """
+        backend = LocalCacheBackend(max_entries=2)
+        backend.set('a', 1)
+        backend.set('b', 2)
+        backend.get('a')
+        backend.set('c', 3)
+        self.assertEqual(backend.get('a'), 1)
+        self.assertIsNone(backend.get('b'))
+
+    def test_ttl_expiry(self):
+        """
+        Test that entries expire after their TTL.
+        """
+        backend = LocalCacheBackend()
+        backend.set('a', 1, ttl=0)
+        self.assertIsNone(backend.get('a'))
+
+class ProductCacheTestCase(unittest.TestCase):
+    """
+    Test cases for the read-through product cache.
+    """
+
+    def setUp(self):
+        """
+        Set up the test environment before each test.
+        """
+        self.app = create_app(TestConfig)
+        product_cache.init_app(self.app, backend=LocalCacheBackend())
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+        db.session.add(Product(name='Hot Product', description='Sample', price=5.0, inventory=10))
+        db.session.commit()
+
+    def tearDown(self):
+        """
+        Clean up the test environment after each test.
+        """
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_read_through_and_invalidation(self):
+        """
+        Test that reads are served from the cache until the product changes.
+        """
+        ProductService.get_product(1)
+        ProductService.get_product(1)
+        self.assertEqual(product_cache.stats()['hits'], 1)
+        self.assertEqual(product_cache.stats()['misses'], 1)
+
+        self.client.put('/api/product/1', json={'price': 7.5})
+        self.assertEqual(self.client.get('/api/product/1').get_json()['price'], 7.5)
+
+        self.client.delete('/api/product/1')
+        self.assertIsNone(ProductService.get_product(1))
+
+    def test_stampede_protection(self):
+        """
+        Test that concurrent misses on the same key only load it once.
+        """
+        calls = []
+
+        def loader():
+            calls.append(1)
+            time.sleep(0.05)
+            return {'id': 1}
+
+        def read():
+            with self.app.app_context():
+                product_cache.get_or_load('product:1', loader)
+
+        threads = [threading.Thread(target=read) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+
+    def test_invalidation_during_a_load(self):
+        """
+        Test that a value loaded before a write is not cached after its invalidation.
+        """
+        loading = threading.Event()
+
+        def loader():
+            loading.set()
+            time.sleep(0.05)
+            return {'id': 1, 'price': 5.0}
+
+        def write():
+            loading.wait()
+            with self.app.app_context():
+                product_cache.invalidate('product:1')
+
+        writer = threading.Thread(target=write)
+        writer.start()
+        self.assertEqual(product_cache.get_or_load('product:1', loader)['price'], 5.0)
+        writer.join()
+        self.assertIsNone(product_cache.peek('product:1'))
+
+        # A fill stored by the caller after its key was invalidated is dropped
+        generation = product_cache.generation('product:1')
+        product_cache.invalidate('product:1')
+        product_cache.set('product:1', {'id': 1, 'price': 5.0}, generation=generation)
+        self.assertIsNone(product_cache.peek('product:1'))
+        product_cache.set('product:1', {'id': 1, 'price': 7.5},
+                          generation=product_cache.generation('product:1'))
+        self.assertEqual(product_cache.peek('product:1')['price'], 7.5)
+
+    def test_redis_backend(self):
+        """
+        Test the Redis-protocol backend against a fake client.
+        """
+        client = FakeRedis()
+        product_cache.init_app(self.app, backend=RedisCacheBackend(client))
+        self.assertEqual(ProductService.get_product(1)['name'], 'Hot Product')
+        self.assertIn(b'Hot Product', client.data['product-cache:product:1'])
+        self.assertEqual(ProductService.get_product(1)['name'], 'Hot Product')
+        self.assertEqual(self.client.get('/probes/cache').get_json()['hits'], 1)
+
+        ProductService.update_product(1, {'name': 'Renamed'})
+        self.assertNotIn('product-cache:product:1', client.data)
+
+        backend = RedisCacheBackend(client)
+        self.assertTrue(backend.add('claim', 1))
+        self.assertFalse(backend.add('claim', 2))
+        self.assertEqual(backend.get('claim'), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
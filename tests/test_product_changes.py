@@ -0,0 +1,135 @@
+import json
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from app import create_app
+from database.db import db
+from config import TestConfig
+from services.product_service import ProductService
+
+class ProductChangesTestCase(unittest.TestCase):
+    """
+    Test cases for the product change outbox and the change feed.
+    """
+
+    def setUp(self):
+        """
+        Set up the test environment before each test.
+        """
+        # A database file, so a writer thread can commit during a long poll
+        self.tmpdir = tempfile.mkdtemp()
+
+        class ChangesConfig(TestConfig):
+            """Configuration backed by a temporary SQLite file."""
+            SQLALCHEMY_DATABASE_URI = f'sqlite:///{self.tmpdir}/changes.db'
+            CHANGES_POLL_INTERVAL = 0.05
+
+        self.app = create_app(ChangesConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        """
+        Clean up the test environment after each test.
+        """
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    @staticmethod
+    def _product(name):
+        return {'name': name, 'description': 'Sample', 'price': 1.0, 'inventory': 5}
+
+    def _changes(self, query=''):
+        response = self.client.get(f'/api/products/changes{query}')
+        self.assertEqual(response.status_code, 200)
+        lines = response.get_data(as_text=True).splitlines()
+        return [json.loads(line) for line in lines], response.headers['X-Last-Seq']
+
+    def test_writes_are_recorded_in_order(self):
+        """
+        Test that every write is recorded with the product after the change.
+        """
+        product_id = self.client.post('/api/product', json=self._product('A')).get_json()['id']
+        self.client.put(f'/api/product/{product_id}', json={'price': 2.5})
+        self.client.post(f'/api/product/{product_id}/inventory', json={'delta': -1})
+        self.client.delete(f'/api/product/{product_id}')
+
+        changes, last_seq = self._changes()
+        self.assertEqual([(change['seq'], change['op']) for change in changes],
+                         [(1, 'created'), (2, 'updated'), (3, 'updated'), (4, 'deleted')])
+        self.assertEqual(changes[1]['product']['price'], 2.5)
+        self.assertEqual(changes[2]['product']['inventory'], 4)
+        self.assertEqual(changes[2]['version'], 3)
+        self.assertIsNone(changes[3]['product'])
+        self.assertEqual(last_seq, '4')
+
+        changes, last_seq = self._changes('?since=3')
+        self.assertEqual([change['seq'] for change in changes], [4])
+        changes, last_seq = self._changes('?since=4')
+        self.assertEqual((changes, last_seq), ([], '4'))
+
+    def test_bulk_writes_are_recorded(self):
+        """
+        Test that bulk writes record a change per written product.
+        """
+        ProductService.bulk_add_products([self._product('A'), self._product('B'),
+                                          self._product('A')])
+        ProductService.bulk_delete_products([1, 2])
+        changes, _ = self._changes()
+        self.assertEqual([(change['op'], change['product_id']) for change in changes],
+                         [('created', 1), ('created', 2), ('deleted', 1), ('deleted', 2)])
+
+    def test_long_poll_returns_new_change(self):
+        """
+        Test that a long poll is answered as soon as a change is committed.
+        """
+        def write():
+            time.sleep(0.2)
+            with self.app.app_context():
+                ProductService.add_product(self._product('Late'))
+
+        writer = threading.Thread(target=write)
+        start = time.monotonic()
+        writer.start()
+        changes, last_seq = self._changes('?since=0&wait=10')
+        writer.join()
+        self.assertLess(time.monotonic() - start, 5)
+        self.assertEqual([change['product']['name'] for change in changes], ['Late'])
+        self.assertEqual(last_seq, '1')
+
+    def test_feed_is_served_without_an_app_context(self):
+        """
+        Test that the NDJSON body is produced like under a WSGI server, after the view returned.
+        """
+        ProductService.add_product(self._product('A'))
+        self.app_context.pop()
+        try:
+            response = self.client.get('/api/products/changes')
+            lines = response.get_data(as_text=True).splitlines()
+        finally:
+            self.app_context.push()
+        self.assertEqual([json.loads(line)['seq'] for line in lines], [1])
+
+    def test_server_sent_events(self):
+        """
+        Test that changes are streamed as events resumable by their id.
+        """
+        ProductService.add_product(self._product('A'))
+        ProductService.add_product(self._product('B'))
+        response = self.client.get('/api/products/changes?wait=0',
+                                   headers={'Accept': 'text/event-stream',
+                                            'Last-Event-ID': '1'})
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        body = response.get_data(as_text=True)
+        self.assertIn('id: 2\nevent: created\ndata: ', body)
+        self.assertNotIn('id: 1\n', body)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import unittest
+from app import create_app
+from database.db import db
+from config import TestConfig
+from models.product import Product
+from services.product_service import ProductService, VersionConflictError
+
+class ProductETagTestCase(unittest.TestCase):
+    """
+    Test cases for ETags, conditional GETs and optimistic concurrency.
+    """
+
+    def setUp(self):
+        """
+        Set up the test environment before each test.
+        """
+        self.app = create_app(TestConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+        self.client.post('/api/product', json={
+            'name': 'Test Product',
+            'description': 'This is a test product',
+            'price': 10.99,
+            'inventory': 100
+        })
+
+    def tearDown(self):
+        """
+        Clean up the test environment after each test.
+        """
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_conditional_get_product(self):
+        """
+        Test that an unchanged product returns 304 until it is updated.
+        """
+        response = self.client.get('/api/product/1')
+        etag = response.headers['ETag']
+        self.assertEqual(etag, '"product-1-v1"')
+
+        response = self.client.get('/api/product/1', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.get_data(), b'')
+
+        self.client.put('/api/product/1', json={'price': 11.99})
+        response = self.client.get('/api/product/1', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['version'], 2)
+
+    def test_conditional_get_listing(self):
+        """
+        Test that the listing ETag changes with any product write and per variant.
+        """
+        etag = self.client.get('/api/products').headers['ETag']
+        response = self.client.get('/api/products', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+
+        paged_etag = self.client.get('/api/products?limit=1').headers['ETag']
+        self.assertNotEqual(paged_etag, etag)
+
+        ProductService.add_product({'name': 'Other', 'description': '', 'price': 1.0,
+                                    'inventory': 1})
+        response = self.client.get('/api/products', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.get_json()), 2)
+
+    def test_if_match(self):
+        """
+        Test that writes with a stale If-Match are rejected with 412.
+        """
+        response = self.client.put('/api/product/1', json={'price': 1.0},
+                                   headers={'If-Match': '"product-1-v1"'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['ETag'], '"product-1-v2"')
+
+        response = self.client.put('/api/product/1', json={'price': 2.0},
+                                   headers={'If-Match': '"product-1-v1"'})
+        self.assertEqual(response.status_code, 412)
+        response = self.client.delete('/api/product/1', headers={'If-Match': '"product-1-v1"'})
+        self.assertEqual(response.status_code, 412)
+        response = self.client.delete('/api/product/1', headers={'If-Match': '"product-1-v2"'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_concurrent_update_detected(self):
+        """
+        Test that an update based on a stale read raises a version conflict.
+        """
+        product = db.session.get(Product, 1)
+        product.price = 5.0
+        db.session.flush()
+        db.session.execute(Product.__table__.update().values(version=Product.version + 1))
+        with self.assertRaises(VersionConflictError):
+            ProductService.update_product(1, {'price': 6.0})
+
+
+if __name__ == '__main__':
+    unittest.main()
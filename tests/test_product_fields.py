@@ -0,0 +1,129 @@
+import json
+import unittest
+from sqlalchemy import event
+from app import create_app
+from database.db import db
+from config import TestConfig
+from services.product_service import ProductService
+
+class ProductFieldsTestCase(unittest.TestCase):
+    """
+    Test cases for sparse fieldsets on the product read endpoints.
+    """
+
+    def setUp(self):
+        """
+        Set up the test environment before each test.
+        """
+        class FieldsConfig(TestConfig):
+            """Configuration with the in-process product cache."""
+            CACHE_BACKEND = 'local'
+
+        self.app = create_app(FieldsConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+        for index in range(3):
+            ProductService.add_product({'name': f'Product {index}', 'description': 'x' * 1000,
+                                        'price': 3.0 - index, 'inventory': index})
+
+        self.statements = []
+
+        def before_cursor_execute(conn, cursor, statement, *args):
+            if 'FROM product' in statement:
+                self.statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        self.addCleanup(event.remove, db.engine, 'before_cursor_execute', before_cursor_execute)
+
+    def tearDown(self):
+        """
+        Clean up the test environment after each test.
+        """
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _assert_description_not_selected(self):
+        self.assertTrue(self.statements)
+        for statement in self.statements:
+            self.assertNotIn('description', statement.split('FROM')[0])
+
+    def test_listings(self):
+        """
+        Test that listings, streams and pages only select the requested fields.
+        """
+        expected = [{'id': 1, 'name': 'Product 0', 'price': 3.0},
+                    {'id': 2, 'name': 'Product 1', 'price': 2.0},
+                    {'id': 3, 'name': 'Product 2', 'price': 1.0}]
+        self.assertEqual(self.client.get('/api/products?fields=name,price').get_json(), expected)
+        self.assertEqual(
+            self.client.get('/api/products?limit=2&after_id=1&fields=name,price').get_json(),
+            expected[1:])
+        lines = self.client.get('/api/products?stream=ndjson&fields=price,name') \
+            .get_data(as_text=True).splitlines()
+        self.assertEqual([json.loads(line) for line in lines], expected)
+        self._assert_description_not_selected()
+
+    def test_search_with_sort_cursor(self):
+        """
+        Test that search pages keep their cursor when the sort field is not returned.
+        """
+        response = self.client.get('/api/products/search?sort=price&limit=2&fields=name')
+        self.assertEqual(response.get_json(), [{'id': 3, 'name': 'Product 2'},
+                                               {'id': 2, 'name': 'Product 1'}])
+        next_url = response.headers['Link'].split(';')[0].strip('<>')
+        self.assertEqual(self.client.get(next_url).get_json(), [{'id': 1, 'name': 'Product 0'}])
+        self._assert_description_not_selected()
+
+    def test_next_page_keeps_the_fields(self):
+        """
+        Test that the next page of a listing has the fields of the first one.
+        """
+        response = self.client.get('/api/products?limit=2&fields=name')
+        self.assertEqual(response.get_json(), [{'id': 1, 'name': 'Product 0'},
+                                               {'id': 2, 'name': 'Product 1'}])
+        next_url = response.headers['Link'].split(';')[0].strip('<>')
+        self.assertEqual(self.client.get(next_url).get_json(), [{'id': 3, 'name': 'Product 2'}])
+        self._assert_description_not_selected()
+
+    def test_single_product(self):
+        """
+        Test a sparse product, with its ETag, from the database and from the cache.
+        """
+        response = self.client.get('/api/product/2?fields=name')
+        self.assertEqual(response.get_json(), {'id': 2, 'name': 'Product 1'})
+        self.assertEqual(response.headers['ETag'], '"product-2-v1"')
+        self._assert_description_not_selected()
+
+        ProductService.get_product(2)
+        self.statements.clear()
+        response = self.client.get('/api/product/2?fields=version,price')
+        self.assertEqual(response.get_json(), {'id': 2, 'price': 2.0, 'version': 1})
+        self.assertEqual(self.statements, [])
+
+    def test_batch_get_and_export(self):
+        """
+        Test sparse batch gets and exports.
+        """
+        response = self.client.get('/api/products?ids=3,1&fields=inventory')
+        self.assertEqual(response.get_json()['products'],
+                         [{'id': 3, 'inventory': 2}, {'id': 1, 'inventory': 0}])
+        response = self.client.get('/api/products/export?format=csv&fields=name')
+        self.assertEqual(response.get_data(as_text=True).splitlines()[:2],
+                         ['id,name', '1,Product 0'])
+        self._assert_description_not_selected()
+
+    def test_unknown_fields(self):
+        """
+        Test that unknown fields are rejected.
+        """
+        for url in ('/api/products?fields=name,weight', '/api/product/1?fields=weight',
+                    '/api/products/search?fields=weight', '/api/products/export?fields=weight'):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 400, url)
+            self.assertIn('weight', response.get_json()['error'])
+
+if __name__ == '__main__':
+    unittest.main()
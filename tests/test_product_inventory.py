@@ -0,0 +1,167 @@
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from app import create_app
+from database.db import db
+from config import TestConfig
+from models.product import Product
+from shared.coalescer import DeltaCoalescer
+
+class ProductInventoryTestCase(unittest.TestCase):
+    """
+    Test cases for the atomic inventory adjustment and reservation endpoints.
+    """
+
+    def setUp(self):
+        """
+        Set up the test environment before each test.
+        """
+        # A database file, so concurrent requests use their own connections
+        self.tmpdir = tempfile.mkdtemp()
+
+        class InventoryConfig(TestConfig):
+            """Configuration backed by a temporary SQLite file."""
+            SQLALCHEMY_DATABASE_URI = f'sqlite:///{self.tmpdir}/inventory.db'
+
+        self.app = create_app(InventoryConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+        db.session.add_all([
+            Product(name='Widget', description='Sample', price=1.0, inventory=30),
+            Product(name='Gadget', description='Sample', price=2.0, inventory=2)
+        ])
+        db.session.commit()
+
+    def tearDown(self):
+        """
+        Clean up the test environment after each test.
+        """
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def _inventory(self, product_id):
+        db.session.expire_all()
+        return db.session.get(Product, product_id).inventory
+
+    def test_adjust_inventory(self):
+        """
+        Test increments, decrements and the rejection of negative inventory.
+        """
+        response = self.client.post('/api/product/2/inventory', json={'delta': -2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['inventory'], 0)
+        self.assertEqual(response.get_json()['version'], 2)
+
+        response = self.client.post('/api/product/2/inventory', json={'delta': -1})
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(self.client.post('/api/product/2/inventory',
+                                          json={'delta': 5}).get_json()['inventory'], 5)
+        self.assertEqual(self.client.post('/api/product/9/inventory',
+                                          json={'delta': 1}).status_code, 404)
+        self.assertEqual(self.client.post('/api/product/2/inventory',
+                                          json={'delta': 'x'}).status_code, 400)
+
+    def test_reserve_all_or_nothing(self):
+        """
+        Test that a reservation is applied to every product or to none.
+        """
+        response = self.client.post('/api/products/reserve', json=[
+            {'id': 1, 'quantity': 5}, {'id': 2, 'quantity': 3}])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.get_json()['id'], 2)
+        self.assertEqual(self._inventory(1), 30)
+
+        response = self.client.post('/api/products/reserve', json=[
+            {'id': 2, 'quantity': 1}, {'id': 1, 'quantity': 5}, {'id': 2, 'quantity': 1}])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([(state['id'], state['inventory']) for state in response.get_json()],
+                         [(1, 25), (2, 0)])
+        self.assertEqual(self.client.post('/api/products/reserve',
+                                          json=[{'id': 1, 'quantity': 0}]).status_code, 400)
+
+    def _contend(self, coalesce):
+        """Take one item at a time from 8 threads, 40 times in total."""
+        self.app.config['INVENTORY_COALESCING'] = coalesce
+        statuses = []
+
+        def worker():
+            client = self.app.test_client()
+            for _ in range(5):
+                statuses.append(client.post('/api/product/1/inventory',
+                                            json={'delta': -1}).status_code)
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(statuses.count(200), 30)
+        self.assertEqual(statuses.count(409), 10)
+        self.assertEqual(self._inventory(1), 0)
+
+    def test_concurrent_decrements(self):
+        """
+        Test that concurrent decrements neither lose updates nor oversell.
+        """
+        self._contend(coalesce=False)
+
+    def test_concurrent_coalesced_decrements(self):
+        """
+        Test that coalesced decrements neither lose updates nor oversell.
+        """
+        self._contend(coalesce=True)
+
+class DeltaCoalescerTestCase(unittest.TestCase):
+    """
+    Test cases for the delta coalescer.
+    """
+
+    def test_batches_concurrent_deltas(self):
+        """
+        Test that deltas submitted while a batch is applied form the next batch.
+        """
+        coalescer = DeltaCoalescer()
+        release = threading.Event()
+        batches = []
+
+        def apply_batch(key, deltas):
+            batches.append(list(deltas))
+            if len(batches) == 1:
+                release.wait(5)
+            return [key * delta for delta in deltas]
+
+        results = []
+        first = threading.Thread(target=lambda: results.append(coalescer.submit(10, 1, apply_batch)))
+        first.start()
+        while not batches:
+            time.sleep(0.001)
+        followers = [threading.Thread(target=lambda delta=delta: results.append(
+            coalescer.submit(10, delta, apply_batch))) for delta in (2, 3, 4)]
+        for thread in followers:
+            thread.start()
+        while len(coalescer._pending.get(10, ())) < 3:  # pylint: disable=protected-access
+            time.sleep(0.001)
+        release.set()
+        for thread in [first] + followers:
+            thread.join()
+        self.assertEqual(batches[0], [1])
+        self.assertEqual(sorted(batches[1]), [2, 3, 4])
+        self.assertEqual(sorted(results), [10, 20, 30, 40])
+
+    def test_errors_are_raised_in_every_caller(self):
+        """
+        Test that an exception result is raised in the submitting thread.
+        """
+        coalescer = DeltaCoalescer()
+        with self.assertRaises(ValueError):
+            coalescer.submit(1, 1, lambda key, deltas: [ValueError('boom')])
+
+
+if __name__ == '__main__':
+    unittest.main()
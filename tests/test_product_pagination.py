@@ -0,0 +1,79 @@
+import json
+import unittest
+from app import create_app
+from database.db import db
+from config import TestConfig
+from models.product import Product
+from services.product_service import ProductService
+
+class ProductPaginationTestCase(unittest.TestCase):
+    """
+    Test cases for keyset pagination and streaming of the product listing.
+    """
+
+    def setUp(self):
+        """
+        Set up the test environment before each test.
+        """
+        self.app = create_app(TestConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+        for index in range(5):
+            db.session.add(Product(name=f'Product {index}', description='Sample',
+                                   price=1.0 + index, inventory=index))
+        db.session.commit()
+
+    def tearDown(self):
+        """
+        Clean up the test environment after each test.
+        """
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_get_products_page_service(self):
+        """
+        Test that pages are ordered by id and start after the cursor.
+        """
+        page = ProductService.get_products_page(after_id=2, limit=2)
+        self.assertEqual([product['id'] for product in page], [3, 4])
+
+    def test_paginated_listing(self):
+        """
+        Test that a full page advertises the next page in the Link header.
+        """
+        response = self.client.get('/api/products?limit=2')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([product['id'] for product in response.get_json()], [1, 2])
+        self.assertIn('after_id=2', response.headers['Link'])
+
+        response = self.client.get('/api/products?after_id=4&limit=2')
+        self.assertEqual([product['id'] for product in response.get_json()], [5])
+        self.assertNotIn('Link', response.headers)
+
+    def test_invalid_pagination_parameters(self):
+        """
+        Test that malformed cursors are rejected.
+        """
+        self.assertEqual(self.client.get('/api/products?limit=abc').status_code, 400)
+        self.assertEqual(self.client.get('/api/products?limit=0').status_code, 400)
+        self.assertEqual(self.client.get('/api/products?stream=xml').status_code, 400)
+
+    def test_streaming_listing(self):
+        """
+        Test that the streamed JSON array and NDJSON contain every product.
+        """
+        response = self.client.get('/api/products?stream=json')
+        self.assertEqual(len(json.loads(response.get_data(as_text=True))), 5)
+
+        response = self.client.get('/api/products',
+                                   headers={'Accept': 'application/x-ndjson'})
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        lines = response.get_data(as_text=True).splitlines()
+        self.assertEqual([json.loads(line)['id'] for line in lines], [1, 2, 3, 4, 5])
+
+
+if __name__ == '__main__':
+    unittest.main()
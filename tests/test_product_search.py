@@ -0,0 +1,92 @@
+import unittest
+from app import create_app
+from database.db import db
+from config import TestConfig
+from models.product import Product
+from services.product_service import ProductService
+
+class ProductSearchTestCase(unittest.TestCase):
+    """
+    Test cases for the product search endpoint.
+    """
+
+    def setUp(self):
+        """
+        Set up the test environment before each test.
+        """
+        self.app = create_app(TestConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+        db.session.add_all([
+            Product(name='Red Apple', description='Crisp fruit', price=1.5, inventory=10),
+            Product(name='Green Apple', description='Sour fruit', price=1.0, inventory=0),
+            Product(name='Banana', description='Yellow fruit', price=0.5, inventory=3),
+            Product(name='Apple Pie', description='Baked dessert', price=7.0, inventory=2),
+            Product(name='Hammer', description='Steel tool', price=15.0, inventory=1)
+        ])
+        db.session.commit()
+
+    def tearDown(self):
+        """
+        Clean up the test environment after each test.
+        """
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _names(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [product['name'] for product in response.get_json()]
+
+    def test_full_text_and_filters(self):
+        """
+        Test text matching (including prefixes) combined with filters and sorting.
+        """
+        self.assertEqual(set(self._names('/api/products/search?q=apple')),
+                         {'Red Apple', 'Green Apple', 'Apple Pie'})
+        self.assertEqual(self._names('/api/products/search?q=fru&sort=price'),
+                         ['Banana', 'Green Apple', 'Red Apple'])
+        self.assertEqual(self._names('/api/products/search?q=apple&in_stock=true&max_price=5'),
+                         ['Red Apple'])
+        self.assertEqual(self._names('/api/products/search?min_price=7&sort=-price'),
+                         ['Hammer', 'Apple Pie'])
+
+    def test_index_follows_writes(self):
+        """
+        Test that the full-text index is updated on product updates and deletes.
+        """
+        banana = db.session.scalar(db.select(Product).where(Product.name == 'Banana'))
+        ProductService.update_product(banana.id, {'description': 'Tropical snack'})
+        self.assertEqual(self._names('/api/products/search?q=tropical'), ['Banana'])
+        self.assertNotIn('Banana', self._names('/api/products/search?q=yellow'))
+        ProductService.delete_product(banana.id)
+        self.assertEqual(self._names('/api/products/search?q=tropical'), [])
+
+    def test_cursor_pagination(self):
+        """
+        Test that following the Link header walks every result once.
+        """
+        url = '/api/products/search?sort=-price&limit=2'
+        names = []
+        while url:
+            response = self.client.get(url)
+            names.extend(product['name'] for product in response.get_json())
+            link = response.headers.get('Link')
+            url = link[1:link.index('>')] if link else None
+        self.assertEqual(names, ['Hammer', 'Apple Pie', 'Red Apple', 'Green Apple', 'Banana'])
+
+    def test_invalid_parameters(self):
+        """
+        Test that malformed search parameters are rejected.
+        """
+        for query in ('min_price=abc', 'in_stock=maybe', 'sort=colour',
+                      'sort=relevance', 'cursor=not-a-cursor'):
+            response = self.client.get(f'/api/products/search?{query}')
+            self.assertEqual(response.status_code, 400, query)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -38,6 +38,7 @@ class AppConfigTestCase(unittest.TestCase):
         variables or other cleanup tasks.
         """
         self.app_context.pop()
+        os.environ.pop('FLASK_ENV', None)
 
     def test_development_config(self):
         """
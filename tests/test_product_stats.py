@@ -0,0 +1,167 @@
+import math
+import random
+import unittest
+from types import SimpleNamespace
+from sqlalchemy.exc import OperationalError
+from app import create_app
+from database.db import db
+from config import TestConfig
+from models.catalog import check_stats_trigger_support
+from services.product_service import ProductService
+from shared.sketch import DDSketch
+
+class ProductStatsTestCase(unittest.TestCase):
+    """
+    Test cases for the catalog stats maintained by triggers.
+    """
+
+    def setUp(self):
+        """
+        Set up the test environment before each test.
+        """
+        self.app = create_app(TestConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        """
+        Clean up the test environment after each test.
+        """
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _assert_stats_match_products(self):
+        products = ProductService.get_all_products()
+        stats = ProductService.get_catalog_stats()
+        prices = [product['price'] for product in products]
+        self.assertEqual(stats['product_count'], len(products))
+        self.assertEqual(stats['in_stock_count'],
+                         sum(product['inventory'] > 0 for product in products))
+        self.assertEqual(stats['total_inventory'], sum(product['inventory'] for product in products))
+        self.assertAlmostEqual(stats['inventory_value'],
+                               sum(product['price'] * product['inventory'] for product in products))
+        self.assertEqual(stats['price']['count'], len(prices))
+        if prices:
+            self.assertAlmostEqual(stats['price']['mean'], sum(prices) / len(prices))
+        return stats
+
+    def test_empty_catalog(self):
+        """
+        Test the stats of a catalog without products.
+        """
+        stats = self.client.get('/api/products/stats').get_json()
+        self.assertEqual(stats['product_count'], 0)
+        self.assertIsNone(stats['price']['mean'])
+        self.assertEqual(stats['price']['quantiles'],
+                         {'0.5': None, '0.9': None, '0.95': None, '0.99': None})
+
+    def test_writes_update_the_stats(self):
+        """
+        Test that adds, updates, inventory changes and deletes are aggregated.
+        """
+        first = ProductService.add_product(
+            {'name': 'A', 'description': 'A', 'price': 10.0, 'inventory': 3})
+        second = ProductService.add_product(
+            {'name': 'B', 'description': 'B', 'price': 0.0, 'inventory': 0})
+        self._assert_stats_match_products()
+
+        ProductService.update_product(first['id'], {'price': 12.5})
+        ProductService.adjust_inventory(second['id'], 4)
+        ProductService.update_product(second['id'], {'description': 'Renamed'})
+        stats = self._assert_stats_match_products()
+        self.assertEqual(stats['in_stock_count'], 2)
+        self.assertEqual(stats['price']['min'], 0.0)
+
+        ProductService.delete_product(first['id'])
+        stats = self._assert_stats_match_products()
+        self.assertEqual(stats['price']['max'], 0.0)
+
+    def test_bulk_writes_update_the_stats(self):
+        """
+        Test that bulk inserts, upserts and bulk deletes are aggregated.
+        """
+        ProductService.bulk_add_products(
+            [{'name': f'P{index}', 'description': '', 'price': index, 'inventory': index % 3}
+             for index in range(1, 51)], batch_size=20)
+        ProductService.import_products(
+            [{'name': 'P1', 'price': 99.0, 'inventory': 9}, {'name': 'New', 'price': 1.0,
+                                                            'inventory': 1}])
+        ProductService.bulk_delete_products(range(10, 20))
+        self._assert_stats_match_products()
+
+    def test_price_quantiles_are_within_the_relative_accuracy(self):
+        """
+        Test that the price quantiles are within 1% of the exact quantiles.
+        """
+        generator = random.Random(7)
+        prices = [round(generator.lognormvariate(3, 1.5), 2) for _ in range(500)]
+        ProductService.bulk_add_products(
+            [{'name': f'P{index}', 'description': '', 'price': price, 'inventory': 1}
+             for index, price in enumerate(prices)])
+
+        stats = ProductService.get_catalog_stats((0.0, 0.25, 0.5, 0.9, 0.99, 1.0))
+        prices.sort()
+        for quantile, estimate in stats['price']['quantiles'].items():
+            exact = prices[math.floor(float(quantile) * (len(prices) - 1))]
+            self.assertLessEqual(abs(estimate - exact), 0.01 * exact, quantile)
+
+    def test_stats_etag_and_validation(self):
+        """
+        Test conditional requests and the validation of the quantiles.
+        """
+        response = self.client.get('/api/products/stats?quantiles=0.5')
+        self.assertEqual(list(response.get_json()['price']['quantiles']), ['0.5'])
+        etag = response.headers['ETag']
+        response = self.client.get('/api/products/stats?quantiles=0.5',
+                                   headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+
+        ProductService.add_product({'name': 'A', 'description': 'A', 'price': 1.0, 'inventory': 1})
+        response = self.client.get('/api/products/stats?quantiles=0.5',
+                                   headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+
+        for quantiles in ('1.5', 'median', ','):
+            response = self.client.get(f'/api/products/stats?quantiles={quantiles}')
+            self.assertEqual(response.status_code, 400, quantiles)
+
+    def test_unsupported_databases_are_reported(self):
+        """
+        Test that databases unable to run the stats triggers fail with a clear error.
+        """
+        def missing_function(statement):
+            raise OperationalError(statement, (), Exception('no such function: LN'))
+
+        sqlite = SimpleNamespace(dialect=SimpleNamespace(name='sqlite'),
+                                 exec_driver_sql=missing_function)
+        with self.assertRaisesRegex(RuntimeError, 'SQLITE_ENABLE_MATH_FUNCTIONS'):
+            check_stats_trigger_support(sqlite)
+
+        for version, supported in (((8, 0, 28), False), ((8, 0, 29), True)):
+            mysql = SimpleNamespace(dialect=SimpleNamespace(
+                name='mysql', is_mariadb=False, server_version_info=version))
+            if supported:
+                check_stats_trigger_support(mysql)
+            else:
+                with self.assertRaisesRegex(RuntimeError, 'MySQL 8.0.29'):
+                    check_stats_trigger_support(mysql)
+
+        with db.engine.connect() as connection:
+            check_stats_trigger_support(connection)
+
+    def test_sketch_buckets(self):
+        """
+        Test that every value is estimated within the relative accuracy.
+        """
+        sketch = DDSketch(0.02)
+        for value in (0.01, 0.5, 1.0, 3.7, 1234.5, 1e6):
+            estimate = sketch.bucket_value(sketch.bucket(value))
+            self.assertLessEqual(abs(estimate - value) / value, 0.02 + 1e-9)
+        with self.assertRaises(ValueError):
+            DDSketch(1.0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import json
+import unittest
+from app import create_app
+from database.db import db
+from config import TestConfig
+from services.product_service import ProductService
+from shared.formats import FORMATS
+
+class ProductTransferTestCase(unittest.TestCase):
+    """
+    Test cases for the catalog export and import endpoints.
+    """
+
+    def setUp(self):
+        """
+        Set up the test environment before each test.
+        """
+        self.app = create_app(TestConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        """
+        Clean up the test environment after each test.
+        """
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _add_products(self, count):
+        for index in range(count):
+            ProductService.add_product({'name': f'Product {index}', 'description': 'Sample',
+                                        'price': index + 0.5, 'inventory': index})
+
+    def _import(self, body, name):
+        response = self.client.post(f'/api/products/import?format={name}&batch_size=2',
+                                    data=body, content_type=FORMATS[name][0])
+        self.assertEqual(response.status_code, 200)
+        return response.get_json()
+
+    def test_round_trip_in_every_format(self):
+        """
+        Test that an export imported into an empty catalog recreates it.
+        """
+        self._add_products(5)
+        expected = ProductService.get_all_products()
+        for name in FORMATS:
+            with self.subTest(format=name):
+                response = self.client.get(f'/api/products/export?format={name}&chunk_size=2')
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.mimetype, FORMATS[name][0])
+                self.assertIn(f'products.{FORMATS[name][1]}',
+                              response.headers['Content-Disposition'])
+                body = response.get_data()
+
+                db.drop_all()
+                db.create_all()
+                summary = self._import(body, name)
+                self.assertEqual(summary, {'created': 5, 'updated': 0, 'failed': 0, 'errors': []})
+                self.assertEqual(ProductService.get_all_products(), expected)
+
+    def test_export_format_from_accept_header(self):
+        """
+        Test that the format of an export defaults to the Accept header.
+        """
+        self._add_products(3)
+        response = self.client.get('/api/products/export', headers={'Accept': 'text/csv'})
+        lines = response.get_data(as_text=True).splitlines()
+        self.assertEqual(lines[0], 'id,name,description,price,inventory,version')
+        self.assertEqual(len(lines), 4)
+        self.assertEqual(self.client.get('/api/products/export?format=xml').status_code, 400)
+
+    def test_import_updates_products_by_name(self):
+        """
+        Test that imported rows update the products with the same name.
+        """
+        self._add_products(2)
+        rows = [{'name': 'Product 1', 'price': 9.0, 'inventory': 7},
+                {'name': 'New', 'description': 'Fresh', 'price': 1.0, 'inventory': 1}]
+        summary = self._import(''.join(json.dumps(row) + '\n' for row in rows), 'ndjson')
+        self.assertEqual((summary['created'], summary['updated']), (1, 1))
+
+        updated = ProductService.get_product(2)
+        self.assertEqual((updated['price'], updated['inventory'], updated['version']),
+                         (9.0, 7, 2))
+        self.assertIsNone(updated['description'])
+        changes = self.client.get('/api/products/changes?since=2').get_data(as_text=True)
+        self.assertEqual(sorted(json.loads(line)['op'] for line in changes.splitlines()),
+                         ['created', 'updated'])
+
+    def test_import_reports_invalid_rows(self):
+        """
+        Test that invalid rows are counted without stopping the import.
+        """
+        body = ('id,name,description,price,inventory,version\n'
+                ',A,,1.5,3,\n'
+                ',B,,cheap,3,\n'
+                ',C,,2.5,,\n'
+                ',D,,3.5,1,\n')
+        summary = self._import(body, 'csv')
+        self.assertEqual((summary['created'], summary['failed']), (2, 2))
+        self.assertEqual([error['index'] for error in summary['errors']], [1, 2])
+        self.assertEqual([product['name'] for product in ProductService.get_all_products()],
+                         ['A', 'D'])
+
+    def test_import_requires_a_known_content_type(self):
+        """
+        Test that a body of an unknown media type is rejected.
+        """
+        response = self.client.post('/api/products/import', data='{}',
+                                    content_type='application/xml')
+        self.assertEqual(response.status_code, 415)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import unittest
+from unittest import mock
+from app import create_app
+from database.db import db
+from config import TestConfig
+from shared.rate_limit import LocalRateLimitBackend, RedisRateLimitBackend, rate_limiter
+
+class FakeScriptRedis:
+    """
+    Minimal stand-in for a Redis client running the token bucket script.
+    """
+
+    def __init__(self, result):
+        self.result = result
+        self.calls = []
+
+    def register_script(self, script):
+        def run(keys, args):
+            self.calls.append((keys, args))
+            return self.result
+        return run
+
+class RateLimitTestCase(unittest.TestCase):
+    """
+    Test cases for per-client rate limiting.
+    """
+
+    def setUp(self):
+        """
+        Set up the test environment before each test.
+        """
+        class RateLimitConfig(TestConfig):
+            """Configuration with a small token bucket."""
+            RATE_LIMIT_ENABLED = True
+            RATE_LIMIT_RATE = 1
+            RATE_LIMIT_BURST = 3
+            RATE_LIMIT_CLIENT_HEADER = 'X-Forwarded-For'
+
+        self.app = create_app(RateLimitConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        """
+        Clean up the test environment after each test.
+        """
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _get(self, client='10.0.0.1'):
+        return self.client.get('/api/products', headers={'X-Forwarded-For': f'{client}, 10.0.0.9'})
+
+    def test_limit_per_client(self):
+        """
+        Test that a client is limited after its burst, independently of others.
+        """
+        for _ in range(3):
+            self.assertEqual(self._get().status_code, 200)
+        response = self._get()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.headers['Retry-After'], '1')
+        self.assertEqual(self._get('10.0.0.2').status_code, 200)
+        # Probes are not limited
+        self.assertEqual(self.client.get('/probes/health').status_code, 200)
+        stats = self.client.get('/probes/traffic').get_json()['rate_limit']
+        self.assertEqual((stats['backend'], stats['limited']), ('local', 1))
+
+    def test_bucket_refills(self):
+        """
+        Test that tokens are added back at the configured rate, up to the burst.
+        """
+        backend = LocalRateLimitBackend()
+        with mock.patch('shared.rate_limit.time.monotonic', return_value=100.0):
+            self.assertTrue(backend.acquire('client', 2, 2)[0])
+            self.assertTrue(backend.acquire('client', 2, 2)[0])
+            allowed, tokens, wait = backend.acquire('client', 2, 2)
+            self.assertEqual((allowed, tokens, wait), (False, 0, 0.5))
+        with mock.patch('shared.rate_limit.time.monotonic', return_value=100.5):
+            self.assertTrue(backend.acquire('client', 2, 2)[0])
+        with mock.patch('shared.rate_limit.time.monotonic', return_value=200.0):
+            self.assertEqual(backend.acquire('client', 2, 2)[:2], (True, 1))
+
+    def test_redis_backend(self):
+        """
+        Test that the Redis backend runs the script on the prefixed client key.
+        """
+        client = FakeScriptRedis([0, 250, 750])
+        backend = RedisRateLimitBackend(client)
+        self.assertEqual(backend.acquire('10.0.0.1', 5, 10), (False, 0.25, 0.75))
+        self.assertEqual(client.calls, [(['rate-limit:10.0.0.1'], [5, 10])])
+
+    def test_backend_failure_lets_requests_through(self):
+        """
+        Test that requests are served when the backend fails.
+        """
+        backend = mock.Mock(name='backend')
+        backend.acquire.side_effect = ConnectionError('down')
+        rate_limiter.init_app(self.app, backend=backend)
+        for _ in range(5):
+            self.assertEqual(self._get().status_code, 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,202 @@
+import asyncio
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+from app import create_app
+from database.db import db
+from config import TestConfig
+from services import product_service
+from services.product_service import ProductService
+from shared.singleflight import AsyncSingleFlight, SingleFlight, product_reads
+
+def _run_threads(target, count):
+    threads = [threading.Thread(target=target) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+class SingleFlightTestCase(unittest.TestCase):
+    """
+    Test cases for coalescing concurrent calls of threads.
+    """
+
+    def test_concurrent_calls_share_one_execution(self):
+        """
+        Test that calls arriving while the first one runs share its result.
+        """
+        flight = SingleFlight()
+        calls = []
+        results = []
+
+        def load():
+            calls.append(1)
+            time.sleep(0.2)
+            return {'id': 1}
+
+        _run_threads(lambda: results.append(flight.do('get', 1, load)), 5)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{'id': 1}] * 5)
+        self.assertEqual(flight.stats(), {'get': {'executed': 1, 'shared': 4}})
+
+        # The key is forgotten once the call returned
+        flight.do('get', 1, load)
+        self.assertEqual(len(calls), 2)
+
+    def test_error_is_shared(self):
+        """
+        Test that an exception of the shared call is raised in every caller.
+        """
+        flight = SingleFlight()
+        errors = []
+
+        def fail():
+            time.sleep(0.2)
+            raise RuntimeError('down')
+
+        def call():
+            try:
+                flight.do('get', 1, fail)
+            except RuntimeError as err:
+                errors.append(err)
+
+        _run_threads(call, 3)
+        self.assertEqual(len(errors), 3)
+        self.assertEqual(flight.stats()['get']['executed'], 1)
+
+class AsyncSingleFlightTestCase(unittest.IsolatedAsyncioTestCase):
+    """
+    Test cases for coalescing concurrent calls of asyncio tasks.
+    """
+
+    async def test_concurrent_calls_share_one_execution(self):
+        """
+        Test that concurrent tasks share one execution.
+        """
+        flight = AsyncSingleFlight()
+        calls = []
+
+        async def load():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return {'id': 1}
+
+        results = await asyncio.gather(*(flight.do('get', 1, load) for _ in range(5)))
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{'id': 1}] * 5)
+        self.assertEqual(flight.stats(), {'get': {'executed': 1, 'shared': 4}})
+
+    async def test_cancelled_leader(self):
+        """
+        Test that waiting tasks run the call again when its runner is cancelled.
+        """
+        flight = AsyncSingleFlight()
+        calls = []
+
+        async def load():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return len(calls)
+
+        leader = asyncio.create_task(flight.do('get', 1, load))
+        await asyncio.sleep(0.01)
+        follower = asyncio.create_task(flight.do('get', 1, load))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        self.assertEqual(await follower, 2)
+        with self.assertRaises(asyncio.CancelledError):
+            await leader
+
+class ProductReadsTestCase(unittest.TestCase):
+    """
+    Test cases for request coalescing in the product service.
+    """
+
+    def setUp(self):
+        """
+        Set up an application backed by a SQLite file, for concurrent reads.
+        """
+        self.tmpdir = tempfile.mkdtemp()
+
+        class FileConfig(TestConfig):
+            """Configuration using a SQLite file."""
+            SQLALCHEMY_DATABASE_URI = f'sqlite:///{self.tmpdir}/reads.db'
+
+        self.app = create_app(FileConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        ProductService.add_product({'name': 'Hot Product', 'description': 'Flash sale',
+                                    'price': 1.0, 'inventory': 5})
+        db.session.remove()
+
+    def tearDown(self):
+        """
+        Clean up the test environment after each test.
+        """
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def _concurrent_reads(self, count=5):
+        load_product = ProductService._load_product
+        loads = []
+        names = []
+
+        def slow_load(product_id):
+            loads.append(product_id)
+            time.sleep(0.2)
+            return load_product(product_id)
+
+        def read():
+            with self.app.app_context():
+                names.append(ProductService.get_product(1)['name'])
+
+        with mock.patch.object(ProductService, '_load_product', side_effect=slow_load):
+            _run_threads(read, count)
+        self.assertEqual(names, ['Hot Product'] * count)
+        return len(loads)
+
+    def test_concurrent_reads_share_one_query(self):
+        """
+        Test that concurrent reads of a product run one query, and report the saved ones.
+        """
+        before = product_reads.stats().get('get_product', {'executed': 0, 'shared': 0})
+        self.assertEqual(self._concurrent_reads(), 1)
+        stats = self.app.test_client().get('/probes/singleflight').get_json()['get_product']
+        self.assertEqual(stats['executed'] - before['executed'], 1)
+        self.assertEqual(stats['shared'] - before['shared'], 4)
+
+    def test_concurrent_sparse_reads(self):
+        """
+        Test that concurrent sparse reads sharing a query each get their fields.
+        """
+        row_dict = product_service._row_dict
+        responses = []
+
+        def slow_row_dict(columns, row):
+            time.sleep(0.2)
+            return row_dict(columns, row)
+
+        def read():
+            response = self.app.test_client().get('/api/product/1?fields=name')
+            responses.append((response.status_code, response.get_json()))
+
+        with mock.patch.object(product_service, '_row_dict', side_effect=slow_row_dict):
+            _run_threads(read, 8)
+        self.assertEqual(responses, [(200, {'id': 1, 'name': 'Hot Product'})] * 8)
+
+    def test_method_not_configured(self):
+        """
+        Test that SINGLE_FLIGHT_METHODS selects the coalesced methods.
+        """
+        self.app.config['SINGLE_FLIGHT_METHODS'] = ('get_catalog_version',)
+        self.assertEqual(self._concurrent_reads(), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
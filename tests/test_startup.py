@@ -0,0 +1,65 @@
+import os
+import shutil
+import tempfile
+import unittest
+from sqlalchemy import inspect
+from app import create_app
+from database.db import db
+from config import TestConfig
+from shared.swagger import SWAGGER_YAML, load_swagger_template
+
+class StartupTestCase(unittest.TestCase):
+    """
+    Test cases for the startup options of the application.
+    """
+
+    def test_skip_create_all(self):
+        """
+        Test that DB_CREATE_ALL=False leaves the schema to migrations.
+        """
+
+        class MigratedConfig(TestConfig):
+            """Configuration of a database managed with migrations."""
+            DB_CREATE_ALL = False
+
+        app = create_app(MigratedConfig)
+        with app.app_context():
+            self.assertEqual(inspect(db.engine).get_table_names(), [])
+            db.session.remove()
+
+    def test_swagger_template_is_loaded_lazily(self):
+        """
+        Test that the Swagger template is only loaded when the spec is requested.
+        """
+        app = create_app(TestConfig)
+        self.assertIsNone(app.swag.template)
+        client = app.test_client()
+        client.get('/probes/health')
+        self.assertIsNone(app.swag.template)
+        spec = client.get('/apispec_1.json').get_json()
+        self.assertIn('Product', spec['definitions'])
+
+    def test_swagger_json_cache(self):
+        """
+        Test that the JSON cache is written and reused while it is up to date.
+        """
+        tmpdir = tempfile.mkdtemp()
+        try:
+            yaml_path = os.path.join(tmpdir, 'swagger.yaml')
+            json_path = os.path.join(tmpdir, 'swagger.json')
+            shutil.copy(SWAGGER_YAML, yaml_path)
+            template = load_swagger_template(yaml_path, json_path)
+            self.assertTrue(os.path.exists(json_path))
+
+            with open(json_path, 'w', encoding='utf8') as f:
+                f.write('{"cached": true}')
+            self.assertEqual(load_swagger_template(yaml_path, json_path), {'cached': True})
+
+            os.utime(yaml_path, (os.path.getmtime(json_path) + 10,) * 2)
+            self.assertEqual(load_swagger_template(yaml_path, json_path), template)
+        finally:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import os
+import runpy
+import unittest
+from unittest import mock
+from app import create_app
+from database.db import db
+from config import TestConfig
+
+class GunicornConfigTestCase(unittest.TestCase):
+    """
+    Test cases for the gunicorn configuration module.
+    """
+
+    def load_config(self, **environ):
+        """
+        Execute gunicorn.conf.py with the given environment variables.
+        """
+        with mock.patch.dict(os.environ, environ):
+            return runpy.run_path(os.path.join(os.path.dirname(__file__), '..', 'gunicorn.conf.py'))
+
+    def test_environment_overrides(self):
+        """
+        Test that workers and threads can be set from the environment.
+        """
+        settings = self.load_config(GUNICORN_WORKERS='3', GUNICORN_THREADS='1')
+        self.assertEqual(settings['workers'], 3)
+        self.assertEqual(settings['worker_class'], 'sync')
+        self.assertTrue(settings['preload_app'])
+
+    def test_post_fork_disposes_engine(self):
+        """
+        Test that the post_fork hook replaces the inherited connection pool.
+        """
+        app = create_app(TestConfig)
+        with app.app_context():
+            pool = db.engine.pool
+        server = mock.Mock()
+        server.app.wsgi.return_value = app
+        self.load_config()['post_fork'](server, mock.Mock(pid=1))
+        with app.app_context():
+            self.assertIsNot(db.engine.pool, pool)
+
+
+if __name__ == '__main__':
+    unittest.main()
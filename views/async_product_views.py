@@ -0,0 +1,108 @@
+"""
+Async product views.
+
+The same product routes as `views.product_views`, served by the ASGI
+application through `AsyncProductService`. Each handler awaits its database
+round trips, so a worker keeps serving other requests while a query runs.
+"""
+
+from quart import Blueprint, current_app, jsonify, request, stream_with_context
+from services.async_product_service import AsyncProductService
+from services.product_service import VersionConflictError
+from shared.logging_utils import get_logger
+from shared.query_args import fields_arg, int_arg
+
+# Get an instance of a logger
+logger = get_logger(__name__)
+
+# Initialize Blueprint
+async_product_blueprint = Blueprint('async_product_blueprint', __name__)
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+@async_product_blueprint.route('/products', methods=['GET'])
+async def get_products():
+    """
+    Retrieve products, optionally paginated with `after_id`/`limit` or streamed as NDJSON.
+    """
+    try:
+        after_id = int_arg(request.args, 'after_id', minimum=0)
+        limit = int_arg(request.args, 'limit', minimum=1)
+        fields = fields_arg(request.args)
+    except ValueError as err:
+        return jsonify({'error': str(err)}), 400
+    if limit is not None:
+        limit = min(limit, current_app.config['PRODUCTS_MAX_PAGE_SIZE'])
+
+    if request.args.get('stream') == 'ndjson' or request.accept_mimetypes.best == NDJSON_MIMETYPE:
+        logger.info('streaming products as ndjson')
+        rows = AsyncProductService.iter_products(
+            after_id=after_id,
+            limit=limit,
+            batch_size=current_app.config['PRODUCTS_STREAM_BATCH_SIZE'],
+            fields=fields
+        )
+
+        @stream_with_context
+        async def lines():
+            dumps = current_app.json.dumps
+            async for row in rows:
+                yield dumps(row) + '\n'
+
+        return lines(), 200, {'Content-Type': NDJSON_MIMETYPE}
+
+    logger.info('retrieving products after_id=%s limit=%s', after_id, limit)
+    return jsonify(await AsyncProductService.get_products_page(
+        after_id=after_id, limit=limit, fields=fields))
+
+@async_product_blueprint.route('/product/<int:product_id>', methods=['GET'])
+async def get_product(product_id):
+    """
+    Retrieve a specific product by ID.
+    """
+    try:
+        fields = fields_arg(request.args)
+    except ValueError as err:
+        return jsonify({'error': str(err)}), 400
+    logger.info('retrieving details for product id=%s', product_id)
+    return jsonify(await AsyncProductService.get_product(product_id, fields=fields)), 200
+
+@async_product_blueprint.route('/product', methods=['POST'])
+async def create_product():
+    """
+    Create a new product.
+    """
+    logger.info('creating a new product')
+    data = await request.get_json()
+    return jsonify(await AsyncProductService.add_product(data)), 201
+
+@async_product_blueprint.route('/product/<int:product_id>', methods=['PUT'])
+async def update_product(product_id):
+    """
+    Update a specific product by ID.
+    """
+    data = await request.get_json()
+    try:
+        product = await AsyncProductService.update_product(product_id, data)
+        logger.info('updating product details for product id=%s', product_id)
+        return jsonify(product), 200
+    except VersionConflictError as err:
+        return jsonify({'error': str(err)}), 409
+    except ValueError as err:
+        logger.error('could not update the product with product id %s: %s', product_id, err)
+        return jsonify({'error': str(err)}), 404
+
+@async_product_blueprint.route('/product/<int:product_id>', methods=['DELETE'])
+async def delete_product(product_id):
+    """
+    Delete a product by ID.
+    """
+    try:
+        await AsyncProductService.delete_product(product_id)
+        logger.info('product was deleted: product_id=%s', product_id)
+        return jsonify({'message': 'Product deleted'}), 200
+    except VersionConflictError as err:
+        return jsonify({'error': str(err)}), 409
+    except ValueError as err:
+        logger.error('product could not be deleted: product_id=%s, error=%s', product_id, err)
+        return jsonify({'error': str(err)}), 404
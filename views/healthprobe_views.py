@@ -8,12 +8,24 @@ lifecycle in a containerized setup.
 Routes:
 - '/health': Endpoint to check the health of the application.
 - '/ready': Endpoint to check if the application is ready to serve traffic.
+- '/cache': Endpoint exposing the hit/miss counters of the product cache.
+- '/pool': Endpoint exposing the statistics of the database connection pool.
+- '/replicas': Endpoint exposing the health of the read replicas.
+- '/compression': Endpoint exposing the encodings and compressed body cache counters.
+- '/traffic': Endpoint exposing the load shedding and rate limiting counters.
+- '/singleflight': Endpoint exposing the product reads saved by request coalescing.
 """
 
-from flask import Blueprint, jsonify
+from flask import Blueprint, current_app, jsonify
 from sqlalchemy import text
 from sqlalchemy.exc import SQLAlchemyError
 from database.db import db
+from database.pool import pool_status
+from shared.cache import product_cache
+from shared.compression import response_compression
+from shared.load_shedding import load_shedder
+from shared.rate_limit import rate_limiter
+from shared.singleflight import product_reads
 
 healthprobe_blueprint = Blueprint('healthprobe', __name__)
 
@@ -34,7 +46,12 @@ def readiness_check():
 
     Used by Kubernetes for readiness probes. Checks additional factors like
     database connectivity to determine if the application is ready to serve traffic.
+    An overloaded worker answers 503 until it recovers, so it stops receiving
+    new traffic.
     """
+    overload = load_shedder.overload_reason()
+    if overload is not None:
+        return jsonify({"status": "overloaded", "reason": overload}), 503
     try:
         # Using the text function to safely execute a raw SQL query
         db.session.execute(text('SELECT 1'))
@@ -42,3 +59,68 @@ def readiness_check():
     except SQLAlchemyError as error:
         # Log the exception details for debugging purposes
         return jsonify({"status": "not ready", "reason": str(error)}), 500
+
+@healthprobe_blueprint.route('/cache')
+def cache_stats():
+    """
+    Product cache statistics endpoint.
+
+    Returns the configured cache backend with its hit, miss and invalidation
+    counters for this worker process.
+    """
+    return jsonify(product_cache.stats()), 200
+
+@healthprobe_blueprint.route('/pool')
+def pool_stats():
+    """
+    Database connection pool statistics endpoint.
+
+    Returns the occupancy of the connection pool of this worker process
+    (checked out and overflow connections) together with the number of
+    checkouts that had to wait and the checkout latency.
+    """
+    return jsonify(pool_status(db.engine)), 200
+
+@healthprobe_blueprint.route('/replicas')
+def replica_stats():
+    """
+    Read replica statistics endpoint.
+
+    Returns every configured read replica with its health (ejected replicas
+    are unhealthy), the number of reads routed to it and its failures.
+    """
+    replicas = current_app.extensions['replicas'].replicas
+    return jsonify([replica.to_dict() for replica in replicas]), 200
+
+@healthprobe_blueprint.route('/compression')
+def compression_stats():
+    """
+    Response compression statistics endpoint.
+
+    Returns the encodings offered to clients, most preferred first, with the
+    hit and miss counters of the compressed body cache of this worker process.
+    """
+    return jsonify(response_compression.stats()), 200
+
+@healthprobe_blueprint.route('/traffic')
+def traffic_stats():
+    """
+    Load shedding and rate limiting statistics endpoint.
+
+    Returns the requests in flight and shed by this worker process with the
+    shedding thresholds, and the rate limit with the requests it rejected.
+    """
+    return jsonify({
+        'load_shedding': load_shedder.stats(),
+        'rate_limit': rate_limiter.stats()
+    }), 200
+
+@healthprobe_blueprint.route('/singleflight')
+def single_flight_stats():
+    """
+    Request coalescing statistics endpoint.
+
+    Returns, per service method, the queries executed by this worker process
+    and the reads that shared the query of a concurrent identical read.
+    """
+    return jsonify(product_reads.stats()), 200
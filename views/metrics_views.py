@@ -0,0 +1,27 @@
+"""
+Metrics views.
+
+Exposes the Prometheus metrics of the application for scraping.
+
+Routes:
+- '/metrics': Request, latency, connection pool and cache metrics in the
+  Prometheus text format, aggregated across worker processes.
+"""
+
+from flask import Blueprint, Response, jsonify
+from shared.metrics import metrics
+
+metrics_blueprint = Blueprint('metrics', __name__)
+
+@metrics_blueprint.route('/metrics')
+def prometheus_metrics():
+    """
+    Prometheus scrape endpoint.
+
+    Returns request counts and latency histograms per endpoint, in-flight
+    requests, database pool usage and product cache counters.
+    """
+    if not metrics.available:
+        return jsonify({'error': 'prometheus_client is not installed'}), 501
+    body, content_type = metrics.render()
+    return Response(body, content_type=content_type)
@@ -1,7 +1,15 @@
-from flask import Blueprint, jsonify, request
-from flasgger import Swagger
-from services.product_service import ProductService
+import base64
+import json
+import time
+import zlib
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context, url_for
+from models.product import PRODUCT_COLUMN_TYPES, product_columns
+from services.product_service import (InsufficientInventoryError, ProductService,
+                                      VersionConflictError)
+from shared.formats import FORMATS, decode_rows, encode_rows, format_for_mimetype, iter_ndjson
+from shared.idempotency import idempotent
 from shared.logging_utils import get_logger
+from shared.query_args import bool_arg, fields_arg, float_arg, int_arg
 
 # Get an instance of a logger
 logger = get_logger(__name__)
@@ -9,8 +17,159 @@ logger = get_logger(__name__)
 # Initialize Blueprint
 product_blueprint = Blueprint('product_blueprint', __name__)
 
-# Initialize Swagger
-swagger = Swagger()
+NDJSON_MIMETYPE = 'application/x-ndjson'
+SSE_MIMETYPE = 'text/event-stream'
+
+def _encode_cursor(cursor):
+    """Encode a search cursor as an opaque URL-safe token."""
+    return base64.urlsafe_b64encode(json.dumps(list(cursor)).encode()).decode().rstrip('=')
+
+def _decode_cursor(token):
+    """
+    Decode a search cursor token, returning None when there is none.
+
+    Raises:
+        ValueError: If the token was not produced by `_encode_cursor`.
+    """
+    if not token:
+        return None
+    try:
+        value, product_id = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+    except (ValueError, TypeError) as err:
+        raise ValueError('cursor is invalid') from err
+    if not isinstance(product_id, int) or not isinstance(value, (str, int, float, type(None))):
+        raise ValueError('cursor is invalid')
+    return value, product_id
+
+def _ndjson_lines(rows):
+    """Serialize rows as newline delimited JSON, one chunk per row."""
+    dumps = current_app.json.dumps
+    for row in rows:
+        yield dumps(row) + '\n'
+
+def _bulk_items():
+    """
+    Read the items of a bulk request from a JSON array or an NDJSON body.
+
+    Raises:
+        ValueError: If a JSON body is not an array.
+    """
+    if request.mimetype == NDJSON_MIMETYPE:
+        return iter_ndjson(request.stream)
+    items = request.get_json(silent=True)
+    if not isinstance(items, list):
+        raise ValueError('Request body must be a JSON array or NDJSON')
+    return items
+
+def _bulk_batch_size():
+    """Read the `batch_size` query parameter, capped by BULK_MAX_BATCH_SIZE."""
+    batch_size = (int_arg(request.args, 'batch_size', minimum=1)
+                  or current_app.config['BULK_BATCH_SIZE'])
+    return min(batch_size, current_app.config['BULK_MAX_BATCH_SIZE'])
+
+def _bulk_response(results):
+    """Build the per-item report returned by the bulk endpoints."""
+    failed = sum(1 for result in results if result['status'] == 'error')
+    return jsonify({
+        'succeeded': len(results) - failed,
+        'failed': failed,
+        'results': results
+    }), 200
+
+def _product_ids(values):
+    """
+    Validate the product ids of a batch get.
+
+    Raises:
+        ValueError: If an id is not an integer, or there are too many ids.
+    """
+    try:
+        product_ids = [int(value) for value in values]
+    except (TypeError, ValueError) as err:
+        raise ValueError('ids must be integers') from err
+    max_ids = current_app.config['PRODUCTS_BATCH_GET_MAX_IDS']
+    if len(product_ids) > max_ids:
+        raise ValueError(f'At most {max_ids} ids can be requested at once')
+    return product_ids
+
+def _batch_get_response(product_ids, fields):
+    """Build the response of a batch get: the found products and the missing ids."""
+    logger.info('retrieving %s products by id', len(product_ids))
+    products, missing = ProductService.get_products_by_ids(product_ids, fields=fields)
+    return jsonify({'products': products, 'missing': missing})
+
+def _product_etag(product_id, version):
+    """Return the strong ETag of a product at `version`."""
+    return f'product-{product_id}-v{version}'
+
+def _listing_etag(variant):
+    """
+    Return the ETag of a listing.
+
+    The ETag combines the catalog version, which changes on every product
+    write, with a checksum of the listing `variant` (query string and format).
+    """
+    version = ProductService.get_catalog_version()
+    return f'products-v{version}-{zlib.crc32(variant.encode()):08x}'
+
+def _not_modified(etag):
+    """Return a 304 response if the request's If-None-Match matches `etag`, else None."""
+    if request.if_none_match.contains_weak(etag):
+        response = current_app.response_class(status=304)
+        response.set_etag(etag)
+        return response
+    return None
+
+def _expected_version(product_id):
+    """
+    Read the product version required by the If-Match header.
+
+    Returns None when the header is absent or `*`.
+
+    Raises:
+        VersionConflictError: If the header names no version of this product.
+    """
+    if not request.if_match or request.if_match.star_tag:
+        return None
+    prefix = f'product-{product_id}-v'
+    for etag in request.if_match.as_set():
+        if etag.startswith(prefix) and etag[len(prefix):].isdigit():
+            return int(etag[len(prefix):])
+    raise VersionConflictError('If-Match does not match the product')
+
+def _sse_changes(since, limit, duration):
+    """
+    Stream product changes as Server-Sent Events for `duration` seconds.
+
+    Each change is an event named after its operation, with the sequence
+    number as event id. A comment is sent while no change arrives, so proxies
+    keep the connection open.
+    """
+    dumps = current_app.json.dumps
+    poll_interval = current_app.config['CHANGES_POLL_INTERVAL']
+    heartbeat = current_app.config['CHANGES_HEARTBEAT_INTERVAL']
+    deadline = time.monotonic() + duration
+    yield 'retry: 1000\n\n'
+    while True:
+        remaining = deadline - time.monotonic()
+        changes = ProductService.wait_for_changes(
+            since, limit, timeout=max(0, min(heartbeat, remaining)), poll_interval=poll_interval)
+        for change in changes:
+            yield f"id: {change['seq']}\nevent: {change['op']}\ndata: {dumps(change)}\n\n"
+            since = change['seq']
+        if not changes:
+            yield ': keepalive\n\n'
+        if time.monotonic() >= deadline:
+            return
+
+def _json_array(rows):
+    """Serialize rows as a JSON array without materializing the whole list."""
+    dumps = current_app.json.dumps
+    separator = '['
+    for row in rows:
+        yield separator + dumps(row)
+        separator = ','
+    yield ']' if separator == ',' else '[]'
 
 """
 Blueprint for managing product-related routes.
@@ -24,7 +183,49 @@ def get_products():
     ---
     tags:
       - Products
-    description: Retrieve all products.
+    description: >
+      Retrieve products ordered by id. Pass `limit` (and `after_id` for the
+      following pages) for keyset pagination; the next page is advertised in
+      the `Link` header. Pass `stream=json` or `stream=ndjson` (or send
+      `Accept: application/x-ndjson`) to stream the rows from a server-side
+      cursor instead of building the whole listing in memory. Responses carry
+      an ETag derived from the catalog version; send it back in
+      `If-None-Match` to get a 304 while no product changed. Pass
+      `ids=1,2,3` instead to retrieve those products in one query; the
+      response is then an object with the found `products`, in the order of
+      `ids`, and the `missing` ids.
+    parameters:
+      - name: ids
+        in: query
+        type: string
+        required: false
+        description: Comma-separated ids of the products to retrieve.
+      - name: fields
+        in: query
+        type: string
+        required: false
+        description: Comma-separated product fields to return (the id is always included).
+      - name: after_id
+        in: query
+        type: integer
+        required: false
+        description: Only return products with an id greater than this cursor.
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        description: Maximum number of products to return.
+      - name: stream
+        in: query
+        type: string
+        enum: [json, ndjson]
+        required: false
+        description: Stream the listing as a JSON array or as NDJSON.
+      - name: If-None-Match
+        in: header
+        type: string
+        required: false
+        description: ETag of a previously retrieved listing.
     responses:
       200:
         description: List of products
@@ -32,9 +233,359 @@ def get_products():
           type: array
           items:
             $ref: '#/definitions/Product'
+      304:
+        description: The listing did not change since the given ETag.
+      400:
+        description: Invalid pagination parameters.
+    """
+    try:
+        fields = fields_arg(request.args)
+    except ValueError as err:
+        return jsonify({'error': str(err)}), 400
+    ids = request.args.get('ids')
+    if ids is not None:
+        try:
+            product_ids = _product_ids(ids.split(',') if ids else [])
+        except ValueError as err:
+            return jsonify({'error': str(err)}), 400
+        etag = _listing_etag(f'{request.query_string.decode()}|ids')
+        not_modified = _not_modified(etag)
+        if not_modified is not None:
+            return not_modified
+        response = _batch_get_response(product_ids, fields)
+        response.set_etag(etag)
+        return response
+
+    try:
+        after_id = int_arg(request.args, 'after_id', minimum=0)
+        limit = int_arg(request.args, 'limit', minimum=1)
+    except ValueError as err:
+        return jsonify({'error': str(err)}), 400
+    if limit is not None:
+        limit = min(limit, current_app.config['PRODUCTS_MAX_PAGE_SIZE'])
+
+    stream = request.args.get('stream')
+    if stream is None and request.accept_mimetypes.best == NDJSON_MIMETYPE:
+        stream = 'ndjson'
+    if stream not in (None, 'json', 'ndjson'):
+        return jsonify({'error': 'stream must be one of: json, ndjson'}), 400
+
+    etag = _listing_etag(f'{request.query_string.decode()}|{stream}')
+    not_modified = _not_modified(etag)
+    if not_modified is not None:
+        return not_modified
+
+    if stream is not None:
+        logger.info('streaming products as %s', stream)
+        rows = ProductService.iter_products(
+            after_id=after_id,
+            limit=limit,
+            batch_size=current_app.config['PRODUCTS_STREAM_BATCH_SIZE'],
+            fields=fields
+        )
+        if stream == 'ndjson':
+            response = Response(stream_with_context(_ndjson_lines(rows)), mimetype=NDJSON_MIMETYPE)
+        else:
+            response = Response(stream_with_context(_json_array(rows)), mimetype='application/json')
+        response.set_etag(etag)
+        return response
+
+    if after_id is None and limit is None:
+        logger.info('retrieving all products')
+        response = jsonify(ProductService.get_all_products(fields=fields))
+        response.set_etag(etag)
+        return response
+
+    logger.info('retrieving products after_id=%s limit=%s', after_id, limit)
+    products = ProductService.get_products_page(after_id=after_id, limit=limit, fields=fields)
+    response = jsonify(products)
+    response.set_etag(etag)
+    if limit is not None and len(products) == limit:
+        args = dict(request.args.items(), after_id=products[-1]['id'])
+        response.headers['Link'] = f'<{url_for(".get_products", **args)}>; rel="next"'
+    return response
+
+@product_blueprint.route('/products/search', methods=['GET'])
+def search_products():
+    """
+    Search products.
+
+    ---
+    tags:
+      - Products
+    description: >
+      Search products by words of their name and description, price range and
+      stock. Results are paginated with a cursor: when more results follow,
+      the `Link` header points to the next page. Searches sorted by relevance
+      return a single page of `limit` results.
+    parameters:
+      - name: q
+        in: query
+        type: string
+        required: false
+        description: Words (or word prefixes) that must all appear in the name or description.
+      - name: min_price
+        in: query
+        type: number
+        required: false
+        description: Minimum price.
+      - name: max_price
+        in: query
+        type: number
+        required: false
+        description: Maximum price.
+      - name: in_stock
+        in: query
+        type: boolean
+        required: false
+        description: Only products in stock (true) or out of stock (false).
+      - name: sort
+        in: query
+        type: string
+        enum: [relevance, id, price, -price, name, -name]
+        required: false
+        description: Sort order, relevance by default when `q` is given, else id.
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        description: Maximum number of products to return.
+      - name: cursor
+        in: query
+        type: string
+        required: false
+        description: Cursor of the next page, taken from the `Link` header.
+      - name: fields
+        in: query
+        type: string
+        required: false
+        description: Comma-separated product fields to return (the id is always included).
+    responses:
+      200:
+        description: Matching products
+        schema:
+          type: array
+          items:
+            $ref: '#/definitions/Product'
+      304:
+        description: The results did not change since the given ETag.
+      400:
+        description: Invalid search parameters.
     """
-    logger.info('retrieving all products')
-    return ProductService.get_all_products()
+    try:
+        min_price = float_arg(request.args, 'min_price')
+        max_price = float_arg(request.args, 'max_price')
+        in_stock = bool_arg(request.args, 'in_stock')
+        limit = (int_arg(request.args, 'limit', minimum=1)
+                 or current_app.config['PRODUCTS_SEARCH_PAGE_SIZE'])
+        after = _decode_cursor(request.args.get('cursor'))
+        fields = fields_arg(request.args)
+    except ValueError as err:
+        return jsonify({'error': str(err)}), 400
+    limit = min(limit, current_app.config['PRODUCTS_MAX_PAGE_SIZE'])
+
+    etag = _listing_etag(f'search|{request.query_string.decode()}')
+    not_modified = _not_modified(etag)
+    if not_modified is not None:
+        return not_modified
+
+    logger.info('searching products q=%s sort=%s', request.args.get('q'), request.args.get('sort'))
+    try:
+        products, cursor = ProductService.search_products(
+            query=request.args.get('q'),
+            min_price=min_price,
+            max_price=max_price,
+            in_stock=in_stock,
+            sort=request.args.get('sort'),
+            after=after,
+            limit=limit,
+            fields=fields
+        )
+    except ValueError as err:
+        return jsonify({'error': str(err)}), 400
+    response = jsonify(products)
+    response.set_etag(etag)
+    if cursor is not None:
+        args = dict(request.args.items(), cursor=_encode_cursor(cursor))
+        response.headers['Link'] = f'<{url_for(".search_products", **args)}>; rel="next"'
+    return response
+
+@product_blueprint.route('/products/changes', methods=['GET'])
+def get_product_changes():
+    """
+    Retrieve the feed of product changes.
+
+    ---
+    tags:
+      - Products
+    description: >
+      Every product creation, update and deletion is recorded with an
+      increasing sequence number in the same transaction as the write.
+      Consumers keep the sequence number of the last change they processed
+      and ask for the changes `since` it, instead of re-reading the listing.
+      Changes are returned as NDJSON; with `wait` the request is held until a
+      change arrives (long polling), and the sequence number to resume from is
+      returned in the `X-Last-Seq` header. With `Accept: text/event-stream`
+      (or `format=sse`) changes are pushed as Server-Sent Events for `wait`
+      seconds; reconnecting clients resume from their `Last-Event-ID`.
+    parameters:
+      - name: since
+        in: query
+        type: integer
+        required: false
+        description: Sequence number of the last change already seen (default 0).
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        description: Maximum number of changes per response (or per SSE batch).
+      - name: wait
+        in: query
+        type: integer
+        required: false
+        description: Seconds to wait for changes when there are none (capped).
+      - name: format
+        in: query
+        type: string
+        enum: [ndjson, sse]
+        required: false
+        description: Response format, NDJSON by default.
+    responses:
+      200:
+        description: >
+          Changes as NDJSON objects (`seq`, `product_id`, `op`, `version`,
+          `product`, `created_at`) or as a text/event-stream.
+      400:
+        description: Invalid parameters.
+    """
+    try:
+        since = int_arg(request.args, 'since', minimum=0)
+        if since is None and request.headers.get('Last-Event-ID', '').isdigit():
+            since = int(request.headers['Last-Event-ID'])
+        limit = (int_arg(request.args, 'limit', minimum=1)
+                 or current_app.config['CHANGES_PAGE_SIZE'])
+        wait = int_arg(request.args, 'wait', minimum=0)
+    except ValueError as err:
+        return jsonify({'error': str(err)}), 400
+    since = since or 0
+    limit = min(limit, current_app.config['CHANGES_PAGE_SIZE'])
+    max_wait = current_app.config['CHANGES_MAX_WAIT']
+    sse = request.args.get('format') == 'sse' or request.accept_mimetypes.best == SSE_MIMETYPE
+    wait = min(max_wait if wait is None and sse else wait or 0, max_wait)
+
+    if sse:
+        logger.info('streaming product changes since=%s for %ss', since, wait)
+        response = Response(stream_with_context(_sse_changes(since, limit, wait)),
+                             mimetype=SSE_MIMETYPE)
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Accel-Buffering'] = 'no'
+        return response
+
+    changes = ProductService.wait_for_changes(
+        since, limit, timeout=wait, poll_interval=current_app.config['CHANGES_POLL_INTERVAL'])
+    response = Response(stream_with_context(_ndjson_lines(changes)), mimetype=NDJSON_MIMETYPE)
+    response.headers['X-Last-Seq'] = str(changes[-1]['seq'] if changes else since)
+    return response
+
+@product_blueprint.route('/products/batch-get', methods=['POST'])
+def batch_get_products():
+    """
+    Retrieve several products by id.
+
+    ---
+    tags:
+      - Products
+    description: >
+      Retrieve the products of a JSON array of ids (or of an object with an
+      `ids` array) in one query, checking the cache first. Products are
+      returned in the order of the ids, and the ids of unknown products are
+      listed in `missing`.
+    parameters:
+      - in: body
+        name: ids
+        required: true
+        schema:
+          type: object
+          properties:
+            ids:
+              type: array
+              items:
+                type: integer
+      - name: fields
+        in: query
+        type: string
+        required: false
+        description: Comma-separated product fields to return (the id is always included).
+    responses:
+      200:
+        description: The found products and the missing ids.
+      400:
+        description: Malformed request body.
+    """
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get('ids')
+    if not isinstance(data, list):
+        return jsonify(
+            {'error': 'Body must be an array of ids or an object with an ids array'}), 400
+    try:
+        product_ids = _product_ids(data)
+        fields = fields_arg(request.args)
+    except ValueError as err:
+        return jsonify({'error': str(err)}), 400
+    return _batch_get_response(product_ids, fields)
+
+@product_blueprint.route('/products/stats', methods=['GET'])
+def get_product_stats():
+    """
+    Retrieve aggregates of the catalog.
+
+    ---
+    tags:
+      - Products
+    description: >
+      Return the number of products, the inventory totals and the price
+      distribution (mean, approximate min, max and quantiles, within 1%).
+      The aggregates are maintained incrementally on every product write, so
+      they are served in constant time whatever the size of the catalog.
+      Responses carry an ETag derived from the catalog version.
+    parameters:
+      - name: quantiles
+        in: query
+        type: string
+        required: false
+        description: Comma-separated price quantiles, between 0 and 1 (default 0.5,0.9,0.95,0.99).
+      - name: If-None-Match
+        in: header
+        type: string
+        required: false
+        description: ETag of previously retrieved stats.
+    responses:
+      200:
+        description: The catalog aggregates.
+      304:
+        description: No product changed since the given ETag.
+      400:
+        description: Invalid quantiles.
+    """
+    quantiles = request.args.get('quantiles')
+    if quantiles:
+        try:
+            quantiles = tuple(float(quantile) for quantile in quantiles.split(','))
+        except ValueError:
+            quantiles = None
+        if not quantiles or not all(0 <= quantile <= 1 for quantile in quantiles):
+            return jsonify({'error': 'quantiles must be numbers between 0 and 1'}), 400
+    else:
+        quantiles = (0.5, 0.9, 0.95, 0.99)
+
+    etag = _listing_etag(f'stats|{quantiles}')
+    not_modified = _not_modified(etag)
+    if not_modified is not None:
+        return not_modified
+    response = jsonify(ProductService.get_catalog_stats(quantiles))
+    response.set_etag(etag)
+    return response
 
 @product_blueprint.route('/product/<int:product_id>', methods=['GET'])
 def get_product(product_id):
@@ -51,11 +602,23 @@ def get_product(product_id):
         type: integer
         required: true
         description: The ID of the product to retrieve.
+      - name: fields
+        in: query
+        type: string
+        required: false
+        description: Comma-separated product fields to return (the id is always included).
+      - name: If-None-Match
+        in: header
+        type: string
+        required: false
+        description: ETag of a previously retrieved version of the product.
     responses:
       200:
         description: Product successfully retrieved.
         schema:
           $ref: '#/definitions/Product'
+      304:
+        description: The product did not change since the given ETag.
       404:
         description: Product not found.
         schema:
@@ -65,11 +628,31 @@ def get_product(product_id):
               type: string
               example: "Product not found"
     """
+    try:
+        fields = fields_arg(request.args)
+    except ValueError as err:
+        return jsonify({'error': str(err)}), 400
     logger.info('retrieving details for product id=%s', product_id)
-    response = ProductService.get_product(product_id)
-    return jsonify(response), 200
+    if request.if_none_match:
+        version = ProductService.get_product_version(product_id)
+        if version is not None:
+            not_modified = _not_modified(_product_etag(product_id, version))
+            if not_modified is not None:
+                return not_modified
+    # The version is selected for the ETag, and only returned when requested
+    product = ProductService.get_product(
+        product_id, fields=fields if fields is None else fields + ['version'])
+    etag = _product_etag(product_id, product['version']) if product else None
+    if product and fields is not None and 'version' not in fields:
+        # A new dictionary: the product may be shared with concurrent requests
+        product = {key: value for key, value in product.items() if key != 'version'}
+    response = jsonify(product)
+    if etag is not None:
+        response.set_etag(etag)
+    return response, 200
 
 @product_blueprint.route('/product', methods=['POST'])
+@idempotent
 def create_product():
     """
     Create a new product.
@@ -101,6 +684,11 @@ def create_product():
             inventory:
               type: integer
               example: 10
+      - name: Idempotency-Key
+        in: header
+        type: string
+        required: false
+        description: Key of a retried request; repeats get the first response back.
     responses:
       201:
         description: Product created
@@ -110,9 +698,12 @@ def create_product():
     logger.info('creating a new product')
     data = request.get_json()
     product = ProductService.add_product(data)
-    return jsonify(product), 201
+    response = jsonify(product)
+    response.set_etag(_product_etag(product['id'], product['version']))
+    return response, 201
 
 @product_blueprint.route('/product/<int:product_id>', methods=['PUT'])
+@idempotent
 def update_product(product_id):
     """
     Update a specific product by ID.
@@ -127,12 +718,22 @@ def update_product(product_id):
         type: integer
         required: true
         description: The ID of the product to update.
+      - name: If-Match
+        in: header
+        type: string
+        required: false
+        description: Only update the product if it is still at this ETag.
       - in: body
         name: body
         required: true
         description: Object containing the updated product details.
         schema:
           $ref: '#/definitions/Product'
+      - name: Idempotency-Key
+        in: header
+        type: string
+        required: false
+        description: Key of a retried request; repeats get the first response back.
     responses:
       200:
         description: Product successfully updated.
@@ -146,17 +747,27 @@ def update_product(product_id):
             error:
               type: string
               example: "Product not found or update failed"
+      409:
+        description: The product was modified concurrently.
+      412:
+        description: The product no longer matches the If-Match ETag.
     """
     data = request.get_json()
     try:
-        product = ProductService.update_product(product_id, data)
+        product = ProductService.update_product(product_id, data, _expected_version(product_id))
         logger.info('updating product details for product id=%s', product_id)
-        return jsonify(product), 200
+        response = jsonify(product)
+        response.set_etag(_product_etag(product_id, product['version']))
+        return response, 200
+    except VersionConflictError as err:
+        logger.warning('version conflict updating product id=%s: %s', product_id, err)
+        return jsonify({'error': str(err)}), 412 if request.if_match else 409
     except ValueError as err:
         logger.error('could not update the product with product id %s: %s', product_id, err)
         return jsonify({'error': str(err)}), 404
 
 @product_blueprint.route('/product/<int:product_id>', methods=['DELETE'])
+@idempotent
 def delete_product(product_id):
     """
     Delete a product by ID.
@@ -171,6 +782,16 @@ def delete_product(product_id):
         type: integer
         required: true
         description: The ID of the product to delete.
+      - name: If-Match
+        in: header
+        type: string
+        required: false
+        description: Only delete the product if it is still at this ETag.
+      - name: Idempotency-Key
+        in: header
+        type: string
+        required: false
+        description: Key of a retried request; repeats get the first response back.
     responses:
       200:
         description: Product successfully deleted.
@@ -188,12 +809,386 @@ def delete_product(product_id):
             error:
               type: string
               example: "Product not found"
+      409:
+        description: The product was modified concurrently.
+      412:
+        description: The product no longer matches the If-Match ETag.
     """
     try:
-        success = ProductService.delete_product(product_id)
+        success = ProductService.delete_product(product_id, _expected_version(product_id))
         if success:
             logger.info('product was deleted: product_id=%s', product_id)
             return jsonify({'message': 'Product deleted'}), 200
+    except VersionConflictError as err:
+        logger.warning('version conflict deleting product id=%s: %s', product_id, err)
+        return jsonify({'error': str(err)}), 412 if request.if_match else 409
     except ValueError as err:
         logger.error('product could not be deleted deleted: product_id=%s, error=', err)
         return jsonify({'error': str(err)}), 404
+
+@product_blueprint.route('/product/<int:product_id>/inventory', methods=['POST'])
+@idempotent
+def adjust_inventory(product_id):
+    """
+    Atomically change the inventory of a product.
+
+    ---
+    tags:
+      - Products
+    description: >
+      Add `delta` to the inventory of a product (a negative delta takes
+      stock) in a single conditional UPDATE. Concurrent adjustments never
+      lose updates, and the inventory never goes below zero.
+    parameters:
+      - name: product_id
+        in: path
+        type: integer
+        required: true
+        description: The ID of the product.
+      - in: body
+        name: adjustment
+        schema:
+          type: object
+          required:
+            - delta
+          properties:
+            delta:
+              type: integer
+              example: -2
+      - name: Idempotency-Key
+        in: header
+        type: string
+        required: false
+        description: Key of a retried request; repeats get the first response back.
+    responses:
+      200:
+        description: The new inventory of the product.
+        schema:
+          $ref: '#/definitions/InventoryLevel'
+      400:
+        description: The delta is missing or not an integer.
+      404:
+        description: Product not found.
+      409:
+        description: Not enough inventory.
+    """
+    data = request.get_json(silent=True)
+    delta = data.get('delta') if isinstance(data, dict) else None
+    if not isinstance(delta, int) or isinstance(delta, bool):
+        return jsonify({'error': 'delta must be an integer'}), 400
+    try:
+        state = ProductService.adjust_inventory(
+            product_id, delta, coalesce=current_app.config['INVENTORY_COALESCING'])
+    except InsufficientInventoryError as err:
+        return jsonify({'error': str(err), 'id': product_id}), 409
+    except ValueError as err:
+        return jsonify({'error': str(err)}), 404
+    logger.info('adjusted inventory of product id=%s by %s', product_id, delta)
+    return jsonify(state), 200
+
+@product_blueprint.route('/products/reserve', methods=['POST'])
+@idempotent
+def reserve_inventory():
+    """
+    Reserve the inventory of several products, all or nothing.
+
+    ---
+    tags:
+      - Products
+    description: >
+      Take `quantity` items of every product in one transaction. If any
+      product is missing or has not enough inventory nothing is reserved.
+      Quantities of repeated ids are added up.
+    parameters:
+      - in: body
+        name: items
+        schema:
+          type: array
+          items:
+            type: object
+            required:
+              - id
+              - quantity
+            properties:
+              id:
+                type: integer
+              quantity:
+                type: integer
+                minimum: 1
+      - name: Idempotency-Key
+        in: header
+        type: string
+        required: false
+        description: Key of a retried request; repeats get the first response back.
+    responses:
+      200:
+        description: The new inventory of every reserved product.
+        schema:
+          type: array
+          items:
+            $ref: '#/definitions/InventoryLevel'
+      400:
+        description: Malformed items.
+      404:
+        description: A product was not found.
+      409:
+        description: A product has not enough inventory.
+    """
+    items = request.get_json(silent=True)
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'Request body must be a non-empty JSON array'}), 400
+    quantities = {}
+    for item in items:
+        product_id = item.get('id') if isinstance(item, dict) else None
+        quantity = item.get('quantity') if isinstance(item, dict) else None
+        if not isinstance(product_id, int) or not isinstance(quantity, int) or quantity < 1:
+            return jsonify({'error': 'Items must have an integer id and a positive quantity'}), 400
+        quantities[product_id] = quantities.get(product_id, 0) + quantity
+    try:
+        states = ProductService.reserve_inventory(quantities)
+    except InsufficientInventoryError as err:
+        return jsonify({'error': str(err), 'id': err.product_id}), 409
+    except ValueError as err:
+        return jsonify({'error': str(err)}), 404
+    logger.info('reserved inventory of %d products', len(states))
+    return jsonify(states), 200
+
+@product_blueprint.route('/products/bulk', methods=['POST'])
+def bulk_create_products():
+    """
+    Create many products.
+
+    ---
+    tags:
+      - Products
+    description: >
+      Create products from a JSON array, or from an NDJSON body sent with
+      `Content-Type: application/x-ndjson`. Products are written with bulk
+      inserts, one transaction per batch.
+    parameters:
+      - name: batch_size
+        in: query
+        type: integer
+        required: false
+        description: Number of products written per transaction.
+      - in: body
+        name: products
+        required: true
+        schema:
+          type: array
+          items:
+            $ref: '#/definitions/Product'
+    responses:
+      200:
+        description: Per-item result report.
+        schema:
+          $ref: '#/definitions/BulkReport'
+      400:
+        description: Malformed request body.
+    """
+    try:
+        items = _bulk_items()
+        batch_size = _bulk_batch_size()
+    except ValueError as err:
+        return jsonify({'error': str(err)}), 400
+    logger.info('bulk creating products batch_size=%s', batch_size)
+    return _bulk_response(ProductService.bulk_add_products(items, batch_size=batch_size))
+
+@product_blueprint.route('/products/bulk', methods=['PATCH'])
+def bulk_update_products():
+    """
+    Update many products.
+
+    ---
+    tags:
+      - Products
+    description: >
+      Update products from a JSON array (or NDJSON) of objects that contain
+      the product `id` and the fields to change. Updates are written with
+      bulk updates, one transaction per batch.
+    parameters:
+      - name: batch_size
+        in: query
+        type: integer
+        required: false
+        description: Number of products written per transaction.
+      - in: body
+        name: products
+        required: true
+        schema:
+          type: array
+          items:
+            $ref: '#/definitions/Product'
+    responses:
+      200:
+        description: Per-item result report.
+        schema:
+          $ref: '#/definitions/BulkReport'
+      400:
+        description: Malformed request body.
+    """
+    try:
+        items = _bulk_items()
+        batch_size = _bulk_batch_size()
+    except ValueError as err:
+        return jsonify({'error': str(err)}), 400
+    logger.info('bulk updating products batch_size=%s', batch_size)
+    return _bulk_response(ProductService.bulk_update_products(items, batch_size=batch_size))
+
+@product_blueprint.route('/products/bulk', methods=['DELETE'])
+def bulk_delete_products():
+    """
+    Delete many products.
+
+    ---
+    tags:
+      - Products
+    description: >
+      Delete products from a JSON array (or NDJSON) of ids, or of objects
+      containing an `id`. Deletes are issued per batch with a single query.
+    parameters:
+      - name: batch_size
+        in: query
+        type: integer
+        required: false
+        description: Number of products deleted per transaction.
+      - in: body
+        name: ids
+        required: true
+        schema:
+          type: array
+          items:
+            type: integer
+    responses:
+      200:
+        description: Per-item result report.
+        schema:
+          $ref: '#/definitions/BulkReport'
+      400:
+        description: Malformed request body.
+    """
+    try:
+        items = _bulk_items()
+        batch_size = _bulk_batch_size()
+    except ValueError as err:
+        return jsonify({'error': str(err)}), 400
+    product_ids = (item.get('id') if isinstance(item, dict) else item for item in items)
+    logger.info('bulk deleting products batch_size=%s', batch_size)
+    return _bulk_response(ProductService.bulk_delete_products(product_ids, batch_size=batch_size))
+
+@product_blueprint.route('/products/export', methods=['GET'])
+def export_products():
+    """
+    Export the catalog.
+
+    ---
+    tags:
+      - Products
+    description: >
+      Stream every product, ordered by id, as NDJSON, CSV or (when pyarrow
+      is installed) Arrow IPC or Parquet. Rows are read from a server-side
+      cursor and encoded `chunk_size` at a time, so the export never holds
+      the catalog in memory. The format is chosen with `format`, or from the
+      Accept header.
+    parameters:
+      - name: format
+        in: query
+        type: string
+        enum: [ndjson, csv, arrow, parquet]
+        required: false
+        description: Format of the export, NDJSON by default.
+      - name: chunk_size
+        in: query
+        type: integer
+        required: false
+        description: Rows encoded per chunk (and per Arrow batch or Parquet row group).
+      - name: fields
+        in: query
+        type: string
+        required: false
+        description: Comma-separated product fields to return (the id is always included).
+    responses:
+      200:
+        description: The products, in the requested format.
+      400:
+        description: Unknown format or invalid chunk size.
+    """
+    name = request.args.get('format') or format_for_mimetype(request.accept_mimetypes.best) \
+        or 'ndjson'
+    if name not in FORMATS:
+        return jsonify({'error': 'format must be one of: ' + ', '.join(FORMATS)}), 400
+    try:
+        chunk_size = (int_arg(request.args, 'chunk_size', minimum=1)
+                      or current_app.config['EXPORT_CHUNK_SIZE'])
+        fields = fields_arg(request.args)
+    except ValueError as err:
+        return jsonify({'error': str(err)}), 400
+    chunk_size = min(chunk_size, current_app.config['BULK_MAX_BATCH_SIZE'])
+
+    mimetype, extension, *_ = FORMATS[name]
+    logger.info('exporting products as %s chunk_size=%s', name, chunk_size)
+    catalog_version = ProductService.get_catalog_version()
+    rows = ProductService.iter_products(batch_size=chunk_size, fields=fields)
+    columns = product_columns(fields)
+    column_types = [(column, kind) for column, kind in PRODUCT_COLUMN_TYPES if column in columns]
+    body = encode_rows(name, rows, column_types, chunk_size, current_app.json.dumps)
+    response = Response(stream_with_context(body), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename=products.{extension}'
+    response.headers['X-Catalog-Version'] = str(catalog_version)
+    return response
+
+@product_blueprint.route('/products/import', methods=['POST'])
+def import_products():
+    """
+    Import products, creating or updating them by name.
+
+    ---
+    tags:
+      - Products
+    description: >
+      Read products from an NDJSON, CSV, Arrow IPC or Parquet body (chosen
+      with `format`, or from the Content-Type) as it is received. A product
+      whose name already exists is updated, other products are created, with
+      one upsert statement and one transaction per batch. Invalid rows are
+      counted and reported without stopping the import; the batches written
+      before a malformed body was detected stay imported.
+    parameters:
+      - name: format
+        in: query
+        type: string
+        enum: [ndjson, csv, arrow, parquet]
+        required: false
+        description: Format of the body, by default that of its Content-Type.
+      - name: batch_size
+        in: query
+        type: integer
+        required: false
+        description: Number of products written per transaction.
+    responses:
+      200:
+        description: The numbers of created, updated and failed rows, and the first errors.
+      400:
+        description: Unknown format or malformed body.
+      415:
+        description: The Content-Type is not a supported format.
+    """
+    name = request.args.get('format')
+    if name is None:
+        name = format_for_mimetype(request.mimetype)
+        if name is None:
+            return jsonify({'error': 'Content-Type must be one of: ' + ', '.join(
+                mimetype for mimetype, *_ in FORMATS.values())}), 415
+    if name not in FORMATS:
+        return jsonify({'error': 'format must be one of: ' + ', '.join(FORMATS)}), 400
+    try:
+        batch_size = _bulk_batch_size()
+    except ValueError as err:
+        return jsonify({'error': str(err)}), 400
+
+    logger.info('importing products as %s batch_size=%s', name, batch_size)
+    rows = decode_rows(name, request.stream, PRODUCT_COLUMN_TYPES, batch_size)
+    try:
+        summary = ProductService.import_products(rows, batch_size=batch_size)
+    except ValueError as err:
+        return jsonify({'error': f'Malformed {name} body: {err}'}), 400
+    return jsonify(summary)
@@ -0,0 +1,10 @@
+"""
+WSGI entry point.
+
+Used by the production server, e.g.:
+
+    gunicorn --config gunicorn.conf.py wsgi:app
+"""
+from app import create_app
+
+app = create_app()